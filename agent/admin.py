@@ -1,3 +1,31 @@
 from django.contrib import admin
+from .models import AnalysisJob, AnalysisRun, DeveloperRecommendation, ExtractedDocument
 
 # Register your models here.
+
+@admin.register(ExtractedDocument)
+class ExtractedDocumentAdmin(admin.ModelAdmin):
+    list_display = ['content_hash', 'file_type', 'text_length', 'truncated', 'hit_count', 'last_used_at']
+    list_filter = ['file_type', 'truncated']
+    search_fields = ['content_hash']
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'project_name', 'status', 'attempts', 'user', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['project_name']
+    exclude = ['file_content']
+
+
+@admin.register(DeveloperRecommendation)
+class DeveloperRecommendationAdmin(admin.ModelAdmin):
+    list_display = ['project_name', 'rank', 'developer', 'score', 'model', 'created_at']
+    search_fields = ['project_name', 'analysis_key']
+
+
+@admin.register(AnalysisRun)
+class AnalysisRunAdmin(admin.ModelAdmin):
+    list_display = ['id', 'project_name', 'output_format', 'model', 'total_tokens', 'latency_ms', 'user', 'created_at']
+    list_filter = ['output_format', 'model']
+    search_fields = ['project_name', 'prompt_hash']
@@ -0,0 +1,180 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from developers.skill_index import normalize_skill_name
+
+
+class LocalMemoryLRUBackend:
+    """
+    Process-local cache backend with LRU eviction and a per-entry TTL.
+    """
+
+    def __init__(self, max_entries=256, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DjangoCacheBackend:
+    """
+    Cache backend storing entries in one of the caches configured in CACHES, so
+    entries are shared between processes when that cache is.
+    """
+
+    def __init__(self, alias='default', ttl=3600, key_prefix='agent:analysis:'):
+        self.alias = alias
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(self.key_prefix + key)
+
+    def set(self, key, value):
+        self.cache.set(self.key_prefix + key, value, timeout=self.ttl)
+
+    def clear(self):
+        # Entries of a shared cache expire through their TTL or a roster version bump
+        pass
+
+
+class AnalysisCache:
+    """
+    Cache of project analysis results.
+
+    Entries are keyed on a hash of the normalized project description, required
+    skills, project categories, shortlist size, output format, model name and
+    roster version, so any roster change makes older entries unreachable.
+    """
+
+    BACKENDS = {
+        'locmem': LocalMemoryLRUBackend,
+        'django': DjangoCacheBackend,
+    }
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Create the cache configured by the AGENT_RESPONSE_CACHE setting.
+        """
+        options = dict(settings.AGENT_RESPONSE_CACHE)
+        backend_class = cls.BACKENDS[options.pop('BACKEND')]
+        return cls(backend_class(**{key.lower(): value for key, value in options.items()}))
+
+    @staticmethod
+    def make_key(project_description, required_skills, project_categories, model, roster_version, shortlist_size=None, output_format='markdown'):
+        """
+        Build the cache key of an analysis.
+
+        Descriptions are compared ignoring case and whitespace differences, and
+        skills and categories ignoring order, duplicates, case and whitespace.
+
+        Returns:
+            str: SHA-256 hex digest
+        """
+        payload = {
+            'description': normalize_skill_name(project_description or ''),
+            'required_skills': sorted({normalize_skill_name(skill) for skill in required_skills or []}),
+            'project_categories': sorted({normalize_skill_name(category) for category in project_categories or []}),
+            'shortlist_size': shortlist_size,
+            'output_format': output_format,
+            # The prompt budget decides which developer data Gemini sees
+            'prompt_budget': [settings.AGENT_PROMPT_TOKEN_BUDGET, settings.AGENT_PROMPT_DESCRIPTION_CHARS],
+            'model': model,
+            'roster_version': roster_version,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        self.backend.set(key, copy.deepcopy(value))
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+
+    def stats(self):
+        """
+        Get the hit and miss counters of this process.
+
+        Returns:
+            dict: Backend name, hits, misses and hit ratio
+        """
+        with self._lock:
+            hits, misses = self._hits, self._misses
+        lookups = hits + misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0,
+        }
+
+
+_analysis_cache = None
+_analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_cache():
+    """
+    Get the process-wide analysis cache, creating it on first use.
+    """
+    global _analysis_cache
+    if _analysis_cache is None:
+        with _analysis_cache_lock:
+            if _analysis_cache is None:
+                _analysis_cache = AnalysisCache.from_settings()
+    return _analysis_cache
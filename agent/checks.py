@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+LOCAL_MEMORY_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    """
+    Warn when the caches that have to be shared by all processes are kept in the
+    memory of each process, unless DEBUG is on (a single development server).
+    """
+    if settings.DEBUG:
+        return []
+
+    uses = {'default': ["roster and profile versions"]}
+    if settings.AGENT_RATE_LIMIT['ENABLED']:
+        uses.setdefault(settings.AGENT_RATE_LIMIT['ALIAS'], []).append("Gemini rate limits and concurrency slots")
+
+    warnings = []
+    for alias, alias_uses in uses.items():
+        if settings.CACHES.get(alias, {}).get('BACKEND') == LOCAL_MEMORY_BACKEND:
+            warnings.append(Warning(
+                f"The '{alias}' cache holding the {' and the '.join(alias_uses)} is local to each process.",
+                hint=(
+                    "Every process then enforces its own limits and misses the changes made through "
+                    "the others. Set REDIS_URL, or point the alias to another cache shared by all processes."
+                ),
+                obj=alias,
+                id='agent.W001',
+            ))
+    return warnings
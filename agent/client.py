@@ -0,0 +1,121 @@
+import asyncio
+import os
+import threading
+import weakref
+
+import httpx
+from django.conf import settings
+from google import genai
+from google.genai import types
+
+
+def build_gemini_client():
+    """
+    Build a Gemini client configured by the GEMINI_BASE_URL and GEMINI_CLIENT settings.
+
+    Building a client creates its HTTP connection pools and loads the TLS
+    certificates, which costs tens of milliseconds, so use get_gemini_client to
+    reuse one instead.
+
+    Returns:
+        genai.Client: New client
+    """
+    options = settings.GEMINI_CLIENT
+    limits = httpx.Limits(
+        max_connections=options['POOL_SIZE'],
+        max_keepalive_connections=options['POOL_SIZE'],
+        keepalive_expiry=options['KEEPALIVE_EXPIRY'],
+    )
+    http_options = types.HttpOptions(
+        base_url=settings.GEMINI_BASE_URL or None,
+        timeout=int(options['TIMEOUT'] * 1000),
+        client_args={'limits': limits},
+        async_client_args={'limits': limits},
+        # GeminiService retries within the call's deadline and circuit breaker, so the SDK must not
+        retry_options=types.HttpRetryOptions(attempts=1),
+    )
+    return genai.Client(api_key=os.getenv("GEMINI_API_KEY"), http_options=http_options)
+
+
+_client = None
+# Async connections belong to the event loop that opened them, so async callers get a client per loop
+_loop_clients = weakref.WeakKeyDictionary()
+_client_lock = threading.Lock()
+
+
+def get_gemini_client():
+    """
+    Get the Gemini client shared by this process, creating it on first use.
+
+    The client keeps its connections alive between requests. Its async
+    connections are tied to an event loop, so code running in an event loop gets
+    the client of that loop: one per process under an ASGI server, but a new one
+    for every async request served through WSGI.
+
+    Returns:
+        genai.Client: Shared client
+    """
+    global _client
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if loop is not None:
+        client = _loop_clients.get(loop)
+        if client is None:
+            with _client_lock:
+                client = _loop_clients.get(loop)
+                if client is None:
+                    client = _loop_clients[loop] = build_gemini_client()
+        return client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = build_gemini_client()
+    return _client
+
+
+def reset_gemini_client():
+    """
+    Drop the shared clients, so the next call to get_gemini_client builds new ones
+    (e.g. after the settings changed).
+    """
+    global _client
+    with _client_lock:
+        _client = None
+        _loop_clients.clear()
+
+
+_gemini_loop = None
+_gemini_loop_lock = threading.Lock()
+
+
+def _get_gemini_loop():
+    global _gemini_loop
+    if _gemini_loop is None:
+        with _gemini_loop_lock:
+            if _gemini_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='gemini-loop', daemon=True).start()
+                _gemini_loop = loop
+    return _gemini_loop
+
+
+def run_in_gemini_loop(coroutine):
+    """
+    Run a coroutine making Gemini calls from sync code, and wait for its result.
+
+    async_to_sync would run every call in a new event loop, building a client for
+    it whose async connections are never reused nor closed. Instead the
+    coroutine runs on an event loop kept by this process in a background thread,
+    so its client and connections are shared by every call.
+
+    Args:
+        coroutine: Coroutine to run; it must not use the database
+
+    Returns:
+        The result of the coroutine
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_gemini_loop()).result()
@@ -0,0 +1,118 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import ExtractedDocument
+
+
+class ExtractedTextCache:
+    """
+    Content-addressed store of text extracted from uploaded documents.
+
+    Entries are keyed on the SHA-256 of the uploaded bytes, the file type and the
+    current AGENT_DOCUMENT_MAX_PAGES / AGENT_DOCUMENT_MAX_CHARS budget, and live
+    in the database so every process shares them. Once the stored text exceeds
+    AGENT_DOCUMENT_CACHE_MAX_CHARS characters, least recently used entries are
+    evicted; a limit of 0 disables the cache.
+    """
+
+    @staticmethod
+    def enabled():
+        return settings.AGENT_DOCUMENT_CACHE_MAX_CHARS > 0
+
+    @staticmethod
+    def hash_upload(file):
+        """
+        Hash the bytes of an uploaded file chunk by chunk.
+
+        Returns:
+            str: SHA-256 hex digest
+        """
+        digest = hashlib.sha256()
+        for chunk in file.chunks():
+            digest.update(chunk)
+        file.seek(0)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _key(content_hash, file_type):
+        return {
+            'content_hash': content_hash,
+            'file_type': file_type,
+            'max_pages': settings.AGENT_DOCUMENT_MAX_PAGES,
+            'max_chars': settings.AGENT_DOCUMENT_MAX_CHARS,
+        }
+
+    @classmethod
+    def get(cls, content_hash, file_type):
+        """
+        Get the cached extraction of a document and mark it as recently used.
+
+        Returns:
+            dict: The extracted "text", "pages_read", "total_pages" and "truncated",
+            or None when the document is not cached
+        """
+        entry = ExtractedDocument.objects.filter(**cls._key(content_hash, file_type)).values(
+            'id', 'text', 'pages_read', 'total_pages', 'truncated'
+        ).first()
+        if entry is None:
+            return None
+
+        ExtractedDocument.objects.filter(id=entry.pop('id')).update(
+            hit_count=F('hit_count') + 1, last_used_at=timezone.now()
+        )
+        if entry['pages_read'] is None:
+            # Only PDFs have pages
+            del entry['pages_read'], entry['total_pages']
+        return entry
+
+    @classmethod
+    def store(cls, content_hash, file_type, extracted):
+        """
+        Store the extraction of a document, then evict entries over the size limit.
+
+        Args:
+            content_hash (str): SHA-256 of the document
+            file_type (str): File extension without the dot
+            extracted (dict): Successful result of an extract_text_from_* method
+        """
+        ExtractedDocument.objects.update_or_create(
+            **cls._key(content_hash, file_type),
+            defaults={
+                'text': extracted['text'],
+                'text_length': len(extracted['text']),
+                'pages_read': extracted.get('pages_read'),
+                'total_pages': extracted.get('total_pages'),
+                'truncated': extracted.get('truncated', False),
+                'last_used_at': timezone.now(),
+            }
+        )
+        cls.evict()
+
+    @staticmethod
+    def evict(max_chars=None):
+        """
+        Delete least recently used entries until the stored text fits the size limit.
+
+        Args:
+            max_chars (int): Size limit, defaults to AGENT_DOCUMENT_CACHE_MAX_CHARS
+
+        Returns:
+            int: Number of deleted entries
+        """
+        max_chars = settings.AGENT_DOCUMENT_CACHE_MAX_CHARS if max_chars is None else max_chars
+        excess = (ExtractedDocument.objects.aggregate(total=Sum('text_length'))['total'] or 0) - max_chars
+        if excess <= 0:
+            return 0
+
+        evicted_ids = []
+        for entry_id, text_length in ExtractedDocument.objects.order_by('last_used_at', 'id').values_list('id', 'text_length').iterator():
+            if excess <= 0:
+                break
+            evicted_ids.append(entry_id)
+            excess -= text_length
+
+        deleted, _ = ExtractedDocument.objects.filter(id__in=evicted_ids).delete()
+        return deleted
@@ -0,0 +1,254 @@
+import io
+import math
+import mmap
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, contextmanager
+
+from django.conf import settings
+
+# File processing imports
+try:
+    import PyPDF2
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+try:
+    from docx import Document
+    DOCX_AVAILABLE = True
+except ImportError:
+    DOCX_AVAILABLE = False
+
+
+@contextmanager
+def open_upload(file):
+    """
+    Open an uploaded file as a seekable binary stream without copying it to disk.
+
+    Small uploads are already in memory and are read directly. Uploads Django
+    spooled to a temporary file are memory-mapped instead of being read whole.
+
+    Args:
+        file: UploadedFile object
+
+    Yields:
+        Binary stream positioned at the start of the upload
+    """
+    if hasattr(file, 'temporary_file_path'):
+        with open(file.temporary_file_path(), 'rb') as handle:
+            # An empty file cannot be mapped
+            if not handle.seek(0, 2):
+                yield handle
+                return
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+    else:
+        file.seek(0)
+        yield file.file if hasattr(file, 'file') else file
+
+
+def iter_pdf_pages(reader):
+    """
+    Yield the text of each page of a PDF, extracting pages only as they are consumed.
+    """
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def get_pdf_pool():
+    """
+    Get the process pool extracting PDF pages, starting it on first use.
+
+    Workers are spawned rather than forked, so they do not inherit the threads
+    and database connections of the web process.
+    """
+    global _pdf_pool
+    if _pdf_pool is None:
+        with _pdf_pool_lock:
+            if _pdf_pool is None:
+                _pdf_pool = ProcessPoolExecutor(
+                    max_workers=settings.AGENT_PDF_WORKERS, mp_context=multiprocessing.get_context('spawn')
+                )
+    return _pdf_pool
+
+
+def shutdown_pdf_pool():
+    """
+    Stop the PDF extraction workers; the next parallel extraction starts a new pool
+    (e.g. after AGENT_PDF_WORKERS changed).
+    """
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(cancel_futures=True)
+            _pdf_pool = None
+
+
+def _extract_page_range(source, start, stop):
+    """
+    Extract the text of pages [start, stop) in a worker process.
+
+    Args:
+        source (bytes or str): The PDF itself, or the path of the file holding it
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return _extract_page_range(mapped, start, stop)
+
+    reader = PyPDF2.PdfReader(source if isinstance(source, mmap.mmap) else io.BytesIO(source))
+    return [reader.pages[index].extract_text() or "" for index in range(start, stop)]
+
+
+def iter_pdf_pages_parallel(source, page_count, workers):
+    """
+    Yield the text of the first `page_count` pages of a PDF, extracted by the process pool.
+
+    The pages are split into one contiguous range per worker and yielded in
+    document order. Ranges not yet started are cancelled when the consumer stops
+    early (e.g. at the character budget) and closes the generator.
+
+    Args:
+        source (bytes or str): The PDF itself, or the path of the file holding it
+        page_count (int): Number of pages to extract
+        workers (int): Number of ranges to split the pages into
+    """
+    chunk_size = math.ceil(page_count / workers)
+    pool = get_pdf_pool()
+    futures = [
+        pool.submit(_extract_page_range, source, start, min(start + chunk_size, page_count))
+        for start in range(0, page_count, chunk_size)
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _pdf_source(file):
+    """
+    Get what the worker processes need to open an uploaded PDF: the path of the
+    file Django spooled it to, or its content.
+    """
+    if hasattr(file, 'temporary_file_path'):
+        return file.temporary_file_path()
+    file.seek(0)
+    return file.read()
+
+
+def iter_docx_paragraphs(stream):
+    """
+    Yield the text of each paragraph of a DOCX document.
+    """
+    for paragraph in Document(stream).paragraphs:
+        yield paragraph.text
+
+
+def collect_text(segments, max_segments=None, max_chars=None):
+    """
+    Join text segments (pages or paragraphs) until a segment or character budget is reached.
+
+    Segments past the budget are never requested, so with lazy segments the rest
+    of the document is not parsed. A budget of 0 or None means no limit.
+
+    Args:
+        segments (iterable): Text segments, in document order
+        max_segments (int): Maximum number of segments to read
+        max_chars (int): Maximum number of characters to keep
+
+    Returns:
+        dict: Joined "text", number of "segments_read" and whether the text was cut
+        at the character budget ("truncated")
+    """
+    parts = []
+    length = 0
+    segments_read = 0
+    truncated = False
+
+    for segment in segments:
+        segments_read += 1
+        if max_chars:
+            remaining = max(max_chars - length, 0)
+            if len(segment) > remaining:
+                parts.append(segment[:remaining])
+                truncated = True
+                break
+        parts.append(segment)
+        # Account for the newline the segment is joined with
+        length += len(segment) + 1
+        if max_segments and segments_read >= max_segments:
+            break
+
+    return {
+        "text": "\n".join(parts).strip(),
+        "segments_read": segments_read,
+        "truncated": truncated,
+    }
+
+
+def extract_pdf_text(file, max_pages=None, max_chars=None):
+    """
+    Extract the text of an uploaded PDF within the page and character budget.
+
+    When at least AGENT_PDF_PARALLEL_MIN_PAGES pages have to be read and
+    AGENT_PDF_WORKERS is above 1, the pages are extracted in parallel by a
+    process pool; smaller documents are extracted serially, where the pool's
+    overhead would outweigh the gain.
+
+    Args:
+        file: UploadedFile object
+        max_pages (int): Maximum number of pages to parse, defaults to AGENT_DOCUMENT_MAX_PAGES
+        max_chars (int): Maximum number of characters to keep, defaults to AGENT_DOCUMENT_MAX_CHARS
+
+    Returns:
+        dict: Extracted "text", number of "pages_read" and "total_pages", whether
+        the text was "truncated" by either budget and whether it was extracted in "parallel"
+    """
+    max_pages = settings.AGENT_DOCUMENT_MAX_PAGES if max_pages is None else max_pages
+    max_chars = settings.AGENT_DOCUMENT_MAX_CHARS if max_chars is None else max_chars
+    with open_upload(file) as stream:
+        reader = PyPDF2.PdfReader(stream)
+        total_pages = len(reader.pages)
+        pages_to_read = min(total_pages, max_pages) if max_pages else total_pages
+        parallel = (
+            settings.AGENT_PDF_WORKERS > 1
+            and settings.AGENT_PDF_PARALLEL_MIN_PAGES > 0
+            and pages_to_read >= settings.AGENT_PDF_PARALLEL_MIN_PAGES
+        )
+        if parallel:
+            pages = iter_pdf_pages_parallel(_pdf_source(file), pages_to_read, settings.AGENT_PDF_WORKERS)
+        else:
+            pages = iter_pdf_pages(reader)
+        with closing(pages):
+            result = collect_text(pages, max_pages, max_chars)
+    return {
+        "text": result["text"],
+        "pages_read": result["segments_read"],
+        "total_pages": total_pages,
+        "truncated": result["truncated"] or result["segments_read"] < total_pages,
+        "parallel": parallel,
+    }
+
+
+def extract_docx_text(file, max_chars=None):
+    """
+    Extract the text of an uploaded DOCX document within the character budget.
+
+    Args:
+        file: UploadedFile object
+        max_chars (int): Maximum number of characters to keep, defaults to AGENT_DOCUMENT_MAX_CHARS
+
+    Returns:
+        dict: Extracted "text" and whether it was "truncated"
+    """
+    max_chars = settings.AGENT_DOCUMENT_MAX_CHARS if max_chars is None else max_chars
+    with open_upload(file) as stream:
+        result = collect_text(iter_docx_paragraphs(stream), max_chars=max_chars)
+    return {"text": result["text"], "truncated": result["truncated"]}
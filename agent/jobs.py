@@ -0,0 +1,235 @@
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .limits import GateBusyError
+from .local_recommender import ENGINE_GEMINI
+from .models import AnalysisJob
+from .prompts import OUTPUT_MARKDOWN
+from .services import GeminiService
+
+logger = logging.getLogger(__name__)
+
+
+def submit_analysis_job(analysis_kwargs, user=None):
+    """
+    Queue a project analysis and hand it to the in-process workers once the
+    surrounding transaction commits.
+
+    Args:
+        analysis_kwargs (dict): Keyword arguments for analyze_project_and_suggest_developers
+        user: UserAuth who submitted the job, if any
+
+    Returns:
+        AnalysisJob: The queued job
+    """
+    project_file = analysis_kwargs.get("project_file")
+    job = AnalysisJob.objects.create(
+        user=user,
+        project_name=analysis_kwargs["project_name"],
+        project_description=analysis_kwargs.get("project_description"),
+        required_skills=analysis_kwargs.get("required_skills"),
+        project_categories=analysis_kwargs.get("project_categories"),
+        shortlist_size=analysis_kwargs.get("shortlist_size"),
+        use_cache=analysis_kwargs.get("use_cache", True),
+        output_format=analysis_kwargs.get("output_format", OUTPUT_MARKDOWN),
+        reuse_run=analysis_kwargs.get("reuse_run", False),
+        engine=analysis_kwargs.get("engine", ENGINE_GEMINI),
+        file_name=project_file.name if project_file else None,
+        file_content=b"".join(project_file.chunks()) if project_file else None,
+    )
+    transaction.on_commit(dispatch_jobs)
+    return job
+
+
+def claim_next_job(worker_name):
+    """
+    Claim the oldest queued job for a worker.
+
+    Rows locked by other workers are skipped, so concurrent workers never wait on
+    each other. On databases without SKIP LOCKED (SQLite) workers race for the
+    oldest job instead, and the conditional status update lets only one win.
+
+    Returns:
+        AnalysisJob: The claimed job, now running, or None when the queue is empty
+    """
+    queued = AnalysisJob.objects.filter(status=AnalysisJob.STATUS_QUEUED).order_by('created_at')
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = queued.select_for_update(skip_locked=True).first()
+            claimed = job is not None and _mark_running(job, worker_name)
+    else:
+        # Upgrading a read transaction to a write fails under concurrency on SQLite
+        job = queued.first()
+        claimed = job is not None and _mark_running(job, worker_name)
+    if job is None:
+        return None
+    if not claimed:
+        # Another worker won the race, try the next job
+        return claim_next_job(worker_name)
+
+    job.refresh_from_db()
+    return job
+
+
+def _mark_running(job, worker_name):
+    return AnalysisJob.objects.filter(id=job.id, status=AnalysisJob.STATUS_QUEUED).update(
+        status=AnalysisJob.STATUS_RUNNING,
+        started_at=timezone.now(),
+        worker=worker_name,
+        attempts=F('attempts') + 1,
+    )
+
+
+def run_job(job):
+    """
+    Run a claimed job and store its outcome.
+
+    The uploaded file is dropped once the job finishes; its extracted text stays
+    in the extracted text cache. The Gemini call waits for a ConcurrencyGate slot
+    for at most AGENT_JOB_SLOT_WAIT seconds; when none became free, the job goes
+    back to the queue without using up an attempt. The outcome is only stored
+    while the job is still running on this worker: a job requeued as stale in
+    the meantime belongs to the worker that claimed it next, and this outcome is
+    dropped.
+    """
+    analysis_kwargs = {
+        "project_name": job.project_name,
+        "project_description": job.project_description,
+        "project_file": SimpleUploadedFile(job.file_name, bytes(job.file_content)) if job.file_content is not None else None,
+        "required_skills": job.required_skills,
+        "project_categories": job.project_categories,
+        "shortlist_size": job.shortlist_size,
+        "use_cache": job.use_cache,
+        "output_format": job.output_format,
+        "reuse_run": job.reuse_run,
+        "engine": job.engine,
+    }
+    service = GeminiService(user=job.user, gate_timeout=settings.AGENT_JOB_SLOT_WAIT)
+    try:
+        result = service.analyze_project_and_suggest_developers(**analysis_kwargs)
+    except GateBusyError as e:
+        _requeue_busy_job(job, e)
+        return
+    except Exception as e:
+        logger.exception(f"Analysis job {job.id} crashed")
+        result = {"success": False, "error": f"Internal server error: {str(e)}"}
+
+    result = dict(result)
+    analysis = result.pop("analysis", None)
+    stored = AnalysisJob.objects.filter(id=job.id, worker=job.worker, status=AnalysisJob.STATUS_RUNNING).update(
+        status=AnalysisJob.STATUS_SUCCEEDED if result["success"] else AnalysisJob.STATUS_FAILED,
+        analysis=analysis,
+        result=result,
+        error=result.get("error"),
+        finished_at=timezone.now(),
+        file_content=None,
+    )
+    if not stored:
+        logger.warning(f"Dropped the outcome of analysis job {job.id}: it is no longer running on worker {job.worker}")
+
+
+def _requeue_busy_job(job, error):
+    requeued = AnalysisJob.objects.filter(id=job.id, worker=job.worker, status=AnalysisJob.STATUS_RUNNING).update(
+        status=AnalysisJob.STATUS_QUEUED,
+        started_at=None,
+        worker=None,
+        attempts=F('attempts') - 1,
+    )
+    if requeued:
+        logger.info(f"Analysis job {job.id} queued again: {error}")
+
+
+def requeue_stale_jobs():
+    """
+    Recover jobs whose worker died: jobs running for longer than AGENT_JOB_TIMEOUT
+    are queued again, or failed once they used up AGENT_JOB_MAX_ATTEMPTS.
+
+    Returns:
+        int: Number of recovered jobs
+    """
+    stale = AnalysisJob.objects.filter(
+        status=AnalysisJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - timedelta(seconds=settings.AGENT_JOB_TIMEOUT),
+    )
+    failed = stale.filter(attempts__gte=settings.AGENT_JOB_MAX_ATTEMPTS).update(
+        status=AnalysisJob.STATUS_FAILED,
+        error="Job timed out",
+        finished_at=timezone.now(),
+        file_content=None,
+    )
+    requeued = stale.update(status=AnalysisJob.STATUS_QUEUED, started_at=None, worker=None)
+    return failed + requeued
+
+
+def worker_name():
+    """Name identifying this thread's worker in AnalysisJob.worker."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+def run_pending_jobs(max_jobs=None):
+    """
+    Run queued jobs one after the other until the queue is empty.
+
+    Args:
+        max_jobs (int): Stop after this many jobs
+
+    Returns:
+        int: Number of jobs run
+    """
+    requeue_stale_jobs()
+    name = worker_name()
+    count = 0
+    while max_jobs is None or count < max_jobs:
+        job = claim_next_job(name)
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+_job_executor = None
+_job_executor_lock = threading.Lock()
+
+
+def get_job_executor():
+    """
+    Get the thread pool running analysis jobs in this process, starting it on first use.
+    """
+    global _job_executor
+    if _job_executor is None:
+        with _job_executor_lock:
+            if _job_executor is None:
+                _job_executor = ThreadPoolExecutor(
+                    max_workers=settings.AGENT_JOB_WORKERS, thread_name_prefix='analysis-job'
+                )
+    return _job_executor
+
+
+def _drain_queue():
+    try:
+        run_pending_jobs()
+    except Exception:
+        logger.exception("Analysis job worker failed")
+    finally:
+        # Pool threads outlive requests, so release their connection like a request would
+        close_old_connections()
+
+
+def dispatch_jobs():
+    """
+    Wake an in-process worker to drain the queue. With AGENT_JOB_WORKERS set to 0,
+    jobs are left to the run_analysis_worker command.
+    """
+    if settings.AGENT_JOB_WORKERS > 0:
+        get_job_executor().submit(_drain_queue)
@@ -0,0 +1,379 @@
+import asyncio
+import functools
+import math
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+
+ANONYMOUS_ROLE = 'anonymous'
+
+
+class GateBusyError(Exception):
+    """
+    Raised by ConcurrencyGate.hold when no slot became free within its timeout.
+    """
+
+
+def _cache():
+    return caches[settings.AGENT_RATE_LIMIT['ALIAS']]
+
+
+class TokenBucket:
+    """
+    Token bucket kept in the AGENT_RATE_LIMIT cache, so every process draws from
+    the same bucket.
+
+    The bucket holds up to `burst` tokens and refills at `rate` tokens per
+    minute. Its state is read and written under a short lock taken with
+    cache.add, which is atomic in every Django cache backend shared between
+    processes (Redis, Memcached, the database cache).
+    """
+
+    LOCK_TIMEOUT = 2
+    LOCK_WAIT = 0.25
+
+    def __init__(self, key, rate, burst):
+        self.key = f"agent:rate_limit:{key}"
+        self.rate = rate
+        self.burst = burst
+
+    def _locked(self, update):
+        """
+        Run update(tokens) under the bucket's lock and store the tokens it returns
+
+        Returns:
+            The second value returned by update, or None when the lock could not be taken
+        """
+        cache = _cache()
+        lock_key = f"{self.key}:lock"
+        deadline = time.monotonic() + self.LOCK_WAIT
+        while not cache.add(lock_key, 1, timeout=self.LOCK_TIMEOUT):
+            if time.monotonic() > deadline:
+                return None
+            time.sleep(0.005)
+
+        try:
+            now = time.time()
+            state = cache.get(self.key)
+            if state is None:
+                tokens = float(self.burst)
+            else:
+                tokens = min(float(self.burst), state["tokens"] + (now - state["updated"]) * self.rate / 60)
+            tokens, outcome = update(tokens)
+            # Keep the state until the bucket would be full again anyway
+            timeout = math.ceil((self.burst - tokens) * 60 / self.rate) + 60
+            cache.set(self.key, {"tokens": tokens, "updated": now}, timeout=timeout)
+            return outcome
+        finally:
+            cache.delete(lock_key)
+
+    def consume(self, cost=1):
+        """
+        Take `cost` tokens from the bucket.
+
+        Returns:
+            float: 0 when the tokens were taken, otherwise the seconds until
+            enough tokens are available (nothing is taken then)
+        """
+        def update(tokens):
+            if tokens >= cost:
+                return tokens - cost, 0.0
+            if cost > self.burst:
+                return tokens, math.inf
+            return tokens, (cost - tokens) * 60 / self.rate
+
+        wait = self._locked(update)
+        # Only a flood of requests on this very bucket keeps its lock taken
+        return 1.0 if wait is None else wait
+
+    def refund(self, cost=1):
+        """
+        Put back tokens taken for a request that was not served after all.
+        """
+        self._locked(lambda tokens: (min(float(self.burst), tokens + cost), None))
+
+
+class ConcurrencyGate:
+    """
+    Semaphore capping the Gemini requests in flight across all processes at
+    AGENT_RATE_LIMIT['CONCURRENCY'].
+
+    Each in-flight request holds one of CONCURRENCY slot keys in the
+    AGENT_RATE_LIMIT cache, taken with cache.add. A slot expires after
+    SLOT_TIMEOUT seconds, so slots held by a crashed process are freed again.
+
+    Requests are turned away when every slot is taken (see llm_rate_limit),
+    while the Gemini calls of batches and background jobs wait for a slot with
+    hold and ahold.
+    """
+
+    WAIT_INITIAL_DELAY = 0.05
+    WAIT_MAX_DELAY = 1
+
+    @staticmethod
+    def _slot_key(index):
+        return f"agent:llm_slot:{index}"
+
+    @classmethod
+    def acquire(cls):
+        """
+        Take a free slot.
+
+        Returns:
+            tuple: The slot key and its owner token, or None when every slot is taken
+        """
+        cache = _cache()
+        slots = settings.AGENT_RATE_LIMIT['CONCURRENCY']
+        token = uuid.uuid4().hex
+        # Start at a random slot so processes do not all probe the same keys first
+        offset = random.randrange(slots)
+        for index in range(slots):
+            key = cls._slot_key((offset + index) % slots)
+            if cache.add(key, token, timeout=settings.AGENT_RATE_LIMIT['SLOT_TIMEOUT']):
+                return key, token
+        return None
+
+    @staticmethod
+    def release(slot):
+        """
+        Free a slot taken by acquire, unless it already expired and was taken again.
+        """
+        key, token = slot
+        cache = _cache()
+        if cache.get(key) == token:
+            cache.delete(key)
+
+    @classmethod
+    @contextmanager
+    def hold(cls, timeout=None):
+        """
+        Hold a slot while the block runs, waiting until one is free. Nothing is
+        held when rate limiting is disabled.
+
+        Args:
+            timeout (float): Seconds to wait at most, raising GateBusyError then
+
+        Raises:
+            GateBusyError: No slot became free within the timeout
+        """
+        if not settings.AGENT_RATE_LIMIT['ENABLED']:
+            yield
+            return
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = cls.WAIT_INITIAL_DELAY
+        slot = cls.acquire()
+        while slot is None:
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise GateBusyError(f"No Gemini concurrency slot became free within {timeout} seconds")
+            time.sleep(delay)
+            delay = min(delay * 2, cls.WAIT_MAX_DELAY)
+            slot = cls.acquire()
+        try:
+            yield
+        finally:
+            cls.release(slot)
+
+    @classmethod
+    @asynccontextmanager
+    async def ahold(cls):
+        """
+        Async variant of hold, for coroutines.
+        """
+        if not settings.AGENT_RATE_LIMIT['ENABLED']:
+            yield
+            return
+
+        acquire = sync_to_async(cls.acquire, thread_sensitive=False)
+        delay = cls.WAIT_INITIAL_DELAY
+        slot = await acquire()
+        while slot is None:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, cls.WAIT_MAX_DELAY)
+            slot = await acquire()
+        try:
+            yield
+        finally:
+            await asyncio.shield(sync_to_async(cls.release, thread_sensitive=False)(slot))
+
+
+class LLMRateLimiter:
+    """
+    Rate limiter of the Gemini endpoints.
+
+    A request takes tokens from the bucket of its user (anonymous clients are
+    limited per IP address) and from the bucket shared by all users of their role,
+    with the RATE, BURST, ROLE_RATE and ROLE_BURST of AGENT_RATE_LIMIT['ROLES'].
+    """
+
+    def __init__(self, user=None, client_ip=None):
+        self.role = getattr(user, 'role', None) or ANONYMOUS_ROLE
+        self.client_key = f"user:{user.id}" if user is not None else f"ip:{client_ip}"
+
+    def _buckets(self):
+        roles = settings.AGENT_RATE_LIMIT['ROLES']
+        limits = roles.get(self.role, roles[ANONYMOUS_ROLE])
+        return (
+            TokenBucket(self.client_key, limits['RATE'], limits['BURST']),
+            TokenBucket(f"role:{self.role}", limits['ROLE_RATE'], limits['ROLE_BURST']),
+        )
+
+    def check(self, cost=1):
+        """
+        Take `cost` tokens for a request.
+
+        Returns:
+            float: 0 when the request is allowed, otherwise the seconds to wait before retrying
+        """
+        client_bucket, role_bucket = self._buckets()
+        wait = client_bucket.consume(cost)
+        if wait:
+            return wait
+
+        wait = role_bucket.consume(cost)
+        if wait:
+            client_bucket.refund(cost)
+        return wait
+
+    def refund(self, cost=1):
+        """
+        Put back the tokens of a request that was allowed but not served.
+        """
+        for bucket in self._buckets():
+            bucket.refund(cost)
+
+
+def _retry_after(seconds):
+    return max(1, math.ceil(min(seconds, 24 * 3600)))
+
+
+def _admit(user, client_ip, cost, gate):
+    """
+    Rate limit a request and take a concurrency slot for it
+
+    Returns:
+        tuple: The slot (None without gate) and None, or None and the (body, Retry-After
+        seconds) of the 429 response to send
+    """
+    limiter = LLMRateLimiter(user, client_ip)
+    wait = limiter.check(cost)
+    if wait:
+        if math.isinf(wait):
+            error = f"This request costs {cost} requests, more than your rate limit allows at once"
+        else:
+            error = "Rate limit exceeded, retry later"
+        return None, ({"success": False, "error": error, "model": "gemini-2.5-flash"}, _retry_after(wait))
+
+    if not gate:
+        return None, None
+    slot = ConcurrencyGate.acquire()
+    if slot is None:
+        limiter.refund(cost)
+        return None, ({
+            "success": False,
+            "error": "Too many Gemini requests in progress, retry later",
+            "model": "gemini-2.5-flash"
+        }, settings.AGENT_RATE_LIMIT['BUSY_RETRY_AFTER'])
+    return slot, None
+
+
+def _release_with_response(response, slot):
+    """
+    Free the slot once the response is done, after the whole stream for streaming responses
+    """
+    if slot is None:
+        return response
+    if not isinstance(response, StreamingHttpResponse):
+        ConcurrencyGate.release(slot)
+        return response
+
+    content = response.streaming_content
+
+    def release_after(chunks):
+        try:
+            yield from chunks
+        finally:
+            ConcurrencyGate.release(slot)
+
+    response.streaming_content = release_after(content)
+    return response
+
+
+def llm_rate_limit(cost=1, gate=True):
+    """
+    Decorator rate limiting a view calling Gemini, see LLMRateLimiter, and holding
+    a ConcurrencyGate slot while it runs (unless gate is False).
+
+    Requests over a limit get a 429 response with a Retry-After header. Only
+    unsafe methods are limited. Place it right above the DRF view function, so
+    request.user is authenticated when it runs; async views authenticate
+    themselves and call alimit instead.
+
+    Args:
+        cost: Number of requests the call counts as, or a callable computing it from
+            the request; requests costing 0 are not limited
+        gate (bool): Whether the view has to wait for a concurrency slot
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.AGENT_RATE_LIMIT['ENABLED'] or request.method in ('GET', 'HEAD', 'OPTIONS'):
+                return view(request, *args, **kwargs)
+
+            request_cost = cost(request) if callable(cost) else cost
+            if not request_cost:
+                return view(request, *args, **kwargs)
+
+            user = request.user if hasattr(request.user, 'role') else None
+            slot, rejection = _admit(user, request.META.get('REMOTE_ADDR'), request_cost, gate)
+            if rejection:
+                body, retry_after = rejection
+                return Response(body, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(retry_after)})
+
+            try:
+                response = view(request, *args, **kwargs)
+            except BaseException:
+                if slot is not None:
+                    ConcurrencyGate.release(slot)
+                raise
+            return _release_with_response(response, slot)
+        return wrapper
+    return decorator
+
+
+async def alimit(request, cost=1):
+    """
+    Rate limit a request of an async view and take a concurrency slot for it.
+
+    Returns:
+        tuple: The slot to free with arelease once the response is ready, and
+        the 429 JsonResponse to return instead when the request is over a limit
+    """
+    if not settings.AGENT_RATE_LIMIT['ENABLED'] or not cost:
+        return None, None
+
+    user = request.user if getattr(request, 'auth', None) is not None else None
+    slot, rejection = await sync_to_async(_admit)(user, request.META.get('REMOTE_ADDR'), cost, True)
+    if rejection:
+        body, retry_after = rejection
+        response = JsonResponse(body, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(retry_after)
+        return None, response
+    return slot, None
+
+
+async def arelease(slot):
+    """
+    Free a slot taken by alimit.
+    """
+    if slot is not None:
+        await asyncio.shield(sync_to_async(ConcurrencyGate.release)(slot))
@@ -0,0 +1,159 @@
+from developers.models import DeveloperSkillLevel
+from developers.skill_index import normalize_skill_name as normalize_name
+
+
+ENGINE_GEMINI = "gemini"
+ENGINE_LOCAL = "local"
+ENGINES = [ENGINE_GEMINI, ENGINE_LOCAL]
+
+
+class LocalRecommender:
+    """
+    Deterministic recommender building the top developer recommendations from the
+    local ranking alone, without Gemini: for analyses requested with engine
+    "local" and as the fallback when Gemini fails.
+
+    Recommendations have the shape of Gemini's structured analysis (see
+    StructuredAnalysisService.parse), with reasons and gaps derived from the
+    developers' skill levels (DeveloperSkillLevel), the skills of the requested
+    project categories (ProjectCategorySkills) and their projects.
+    """
+
+    MODEL = "local"
+    TOP = 3
+    LEVEL_NAMES = dict(DeveloperSkillLevel.LEVEL_CHOICES)
+
+    def __init__(self, ranking, required_skills=None, project_categories=None):
+        """
+        Args:
+            ranking (DeveloperRankingService): Service the shortlist was ranked with
+            required_skills (list): Required skill names as requested
+            project_categories (list): Project category names as requested
+        """
+        self.ranking = ranking
+        self.required_skills = list(dict.fromkeys(required_skills or []))
+        self.project_categories = list(dict.fromkeys(project_categories or []))
+
+    def _level(self, skill):
+        return self.LEVEL_NAMES.get(skill['level'], self.LEVEL_NAMES[0])
+
+    def _relevant_projects(self, developer, score):
+        """
+        Names of the developer's projects in the requested categories or using required
+        skills, most relevant first, led by the project most similar to the brief
+        """
+        relevance = {}
+        for project in developer['projects']:
+            matches = (
+                sum(1 for skill in project['skills_used'] if normalize_name(skill) in self.ranking.required_skills)
+                + sum(1 for category in project['project_categories'] if normalize_name(category) in self.ranking.project_categories)
+            )
+            if matches:
+                relevance[project['name']] = matches
+        names = sorted(relevance, key=lambda name: -relevance[name])
+        if score['similar_project']:
+            names = [score['similar_project']] + [name for name in names if name != score['similar_project']]
+        return names[:self.TOP]
+
+    def _reasons(self, developer, score, skills):
+        reasons = []
+        if score['matched_required_skills']:
+            reasons.append("Has the required skills " + ", ".join(
+                f"{name} ({self._level(skills[normalize_name(name)])})" for name in score['matched_required_skills']
+            ))
+        if score['matched_category_skills']:
+            reasons.append("Knows skills of the project categories: " + ", ".join(score['matched_category_skills']))
+        if score['category_projects']:
+            reasons.append(f"Did {score['category_projects']} project(s) in the requested categories")
+        if score['similar_project'] and len(reasons) < self.TOP:
+            reasons.append(f"Project \"{score['similar_project']}\" is similar to the brief")
+        if not reasons:
+            strongest = sorted(developer['skills'], key=lambda skill: -skill['level'])[:self.TOP]
+            if strongest:
+                reasons.append("Strongest skills: " + ", ".join(f"{skill['name']} ({self._level(skill)})" for skill in strongest))
+            reasons.append(f"{developer['industry_experience']} years of industry experience")
+        return reasons[:self.TOP]
+
+    def _gaps(self, skills):
+        gaps = []
+        missing = [name for name in self.required_skills if normalize_name(name) not in skills]
+        if missing:
+            gaps.append("Missing required skills: " + ", ".join(missing))
+        untried = [
+            name for name in self.required_skills
+            if normalize_name(name) in skills and skills[normalize_name(name)]['level'] == 0
+        ]
+        if untried:
+            gaps.append("No project experience with: " + ", ".join(untried))
+        missing_category_skills = [
+            name for normalized, name in sorted(self.ranking.category_skills.items()) if normalized not in skills
+        ]
+        if missing_category_skills and len(gaps) < 2:
+            gaps.append("Missing skills of the project categories: " + ", ".join(missing_category_skills))
+        return gaps
+
+    def recommend(self, shortlist, local_scores):
+        """
+        Recommend the top developers of a ranked shortlist.
+
+        Args:
+            shortlist (list): Developer data in rank order, as returned by DeveloperRankingService.rank
+            local_scores (list): Their scores, in the same order
+
+        Returns:
+            dict: A structured analysis with its "summary", "required_expertise"
+            and ranked "recommendations" (score out of 10)
+        """
+        recommendations = []
+        for rank, (developer, score) in enumerate(zip(shortlist[:self.TOP], local_scores), 1):
+            skills = {normalize_name(skill['name']): skill for skill in developer['skills']}
+            recommendations.append({
+                "rank": rank,
+                "developer_id": developer['id'],
+                "name": developer['name'],
+                "email": developer['email'],
+                "role": developer['role'],
+                "score": round(score['score'] / 10, 1),
+                "reasons": self._reasons(developer, score, skills),
+                "relevant_projects": self._relevant_projects(developer, score),
+                "gaps": self._gaps(skills),
+            })
+
+        summary = [
+            f"Required skills: {', '.join(self.required_skills) or 'not specified'}",
+            f"Project categories: {', '.join(self.project_categories) or 'not specified'}",
+            "Ranked locally from skill levels, project category skills and past projects, without an AI analysis",
+        ]
+        required_expertise = list(dict.fromkeys(
+            self.required_skills + [name for _, name in sorted(self.ranking.category_skills.items())]
+        ))
+        return {
+            "summary": summary,
+            "required_expertise": required_expertise,
+            "recommendations": recommendations,
+            "unresolved_developer_ids": [],
+        }
+
+    @staticmethod
+    def render_markdown(structured_analysis):
+        """
+        Render a structured analysis in the Markdown structure of ANALYSIS_PROMPT_TEMPLATE.
+        """
+        lines = ["#### 1. Brief Analysis of Project"]
+        lines.extend(f"- {point}" for point in structured_analysis["summary"])
+        lines.append("")
+        lines.append("#### 2. Required Skills & Technical Expertise")
+        lines.extend(f"- {skill}" for skill in structured_analysis["required_expertise"] or ["Not specified"])
+        lines.append("")
+        lines.append("#### 3. Top 3 Developer Recommendations")
+        for recommendation in structured_analysis["recommendations"]:
+            lines.append("")
+            lines.append(f"##### {recommendation['rank']}. **{recommendation['name']}**")
+            lines.append(f"- **Score:** {recommendation['score']}/10")
+            lines.append("- **Why Suggested:**")
+            lines.extend(f"    - {reason}" for reason in recommendation["reasons"])
+            lines.append("- **Relevant Projects:**")
+            lines.extend(f"    - **{name}**" for name in recommendation["relevant_projects"] or ["None in the requested categories"])
+            lines.append("- **Potential Concerns / Gaps:**")
+            lines.extend(f"    - {gap}" for gap in recommendation["gaps"] or ["None found in the listed skills"])
+        return "\n".join(lines)
@@ -0,0 +1,64 @@
+import os
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from agent.client import build_gemini_client, get_gemini_client, reset_gemini_client
+from agent.services import GeminiService
+from agent.testing import FakeGeminiServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the per-request overhead of building a Gemini client for every request '
+        'against reusing the shared client, with Gemini replaced by a local stub server'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Number of requests per method')
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds the stub server takes per call')
+
+    def handle(self, *args, **options):
+        # The stub server ignores the key, but the client refuses to start without one
+        os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+
+        with FakeGeminiServer(delay=options['latency']) as server:
+            with override_settings(GEMINI_BASE_URL=server.base_url):
+                reset_gemini_client()
+                # Warm up the shared client, so its one-off setup is not counted
+                GeminiService().generate_content('warm up')
+
+                per_request = [
+                    self._time(lambda: GeminiService(client=build_gemini_client()).generate_content('Hi'))
+                    for _ in range(options['requests'])
+                ]
+                shared = [
+                    self._time(lambda: GeminiService().generate_content('Hi'))
+                    for _ in range(options['requests'])
+                ]
+                assert GeminiService().client is get_gemini_client()
+            reset_gemini_client()
+
+        self._report('Client per request', per_request)
+        self._report('Shared client', shared)
+        self.stdout.write(self.style.SUCCESS(
+            f'Shared client saves {statistics.median(per_request) - statistics.median(shared):.1f} ms per request (median)'
+        ))
+
+    @staticmethod
+    def _time(func):
+        started = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - started) * 1000
+        if not result['success']:
+            raise RuntimeError(result['error'])
+        return elapsed
+
+    def _report(self, label, timings):
+        timings = sorted(timings)
+        self.stdout.write(
+            f'{label}: median {statistics.median(timings):.2f} ms, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, max {timings[-1]:.2f} ms'
+        )
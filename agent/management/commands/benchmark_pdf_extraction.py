@@ -0,0 +1,68 @@
+import os
+import random
+import statistics
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from agent.documents import extract_pdf_text, get_pdf_pool
+from agent.testing import make_pdf
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark serial PDF text extraction against the process pool, '
+        'on synthetic multi-hundred-page PDFs generated locally'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, nargs='+', default=[100, 300, 600], help='Page counts to benchmark')
+        parser.add_argument('--lines', type=int, default=40, help='Lines of text per page')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+        parser.add_argument('--runs', type=int, default=3, help='Runs per page count and mode')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = ['python', 'django', 'react', 'api', 'payments', 'dashboard', 'mobile', 'reporting', 'cloud', 'search']
+
+        # No page or character budget, every page is extracted
+        with override_settings(
+            AGENT_PDF_WORKERS=options['workers'], AGENT_DOCUMENT_MAX_PAGES=0, AGENT_DOCUMENT_MAX_CHARS=0
+        ):
+            started = time.perf_counter()
+            pool = get_pdf_pool()
+            # Start every worker once, so process startup is not counted
+            list(pool.map(abs, range(options['workers'] * 4)))
+            self.stdout.write(f"Pool of {options['workers']} workers started in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+            for page_count in options['pages']:
+                pages = [
+                    '\n'.join(' '.join(rng.choices(words, k=12)) for _ in range(options['lines']))
+                    for _ in range(page_count)
+                ]
+                pdf = make_pdf(pages)
+
+                serial_timings, serial_text = self._run(pdf, options['runs'], min_pages=0)
+                parallel_timings, parallel_text = self._run(pdf, options['runs'], min_pages=1)
+                assert serial_text == parallel_text
+
+                serial, parallel = statistics.median(serial_timings), statistics.median(parallel_timings)
+                self.stdout.write(
+                    f'{page_count} pages ({len(pdf) / 1024:.0f} KiB): serial {serial:.0f} ms, '
+                    f'parallel {parallel:.0f} ms, speedup {serial / parallel:.2f}x'
+                )
+
+    @staticmethod
+    def _run(pdf, runs, min_pages):
+        timings = []
+        with override_settings(AGENT_PDF_PARALLEL_MIN_PAGES=min_pages):
+            for _ in range(runs):
+                upload = SimpleUploadedFile('brief.pdf', pdf, content_type='application/pdf')
+                started = time.perf_counter()
+                result = extract_pdf_text(upload)
+                timings.append((time.perf_counter() - started) * 1000)
+                assert result['parallel'] == bool(min_pages)
+        return timings, result['text']
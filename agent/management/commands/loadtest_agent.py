@@ -0,0 +1,116 @@
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from agent.client import reset_gemini_client
+from agent.testing import FakeGeminiServer
+from developers.models import Developers
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the synchronous agent endpoints, served by a fixed number of worker threads, '
+        'against their async variants on one event loop, with Gemini replaced by a local fake server'
+    )
+
+    ENDPOINTS = {
+        'query': ('agent:query_gemini', 'agent:query_gemini_async'),
+        'analyze-project': ('agent:analyze_project', 'agent:analyze_project_async'),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=sorted(self.ENDPOINTS), default='query', help='Endpoint to load')
+        parser.add_argument('--requests', type=int, default=200, help='Number of requests per run')
+        parser.add_argument('--concurrency', type=int, default=100, help='Requests in flight at once')
+        parser.add_argument('--workers', type=int, default=8, help='Worker threads serving the sync endpoint')
+        parser.add_argument('--latency', type=float, default=0.5, help='Seconds the fake Gemini server takes per call')
+
+    def handle(self, *args, **options):
+        sync_url, async_url = (reverse(name) for name in self.ENDPOINTS[options['endpoint']])
+        payload = self._payload(options['endpoint'])
+        if options['endpoint'] == 'analyze-project' and not Developers.objects.filter(is_available=True).exists():
+            self.stderr.write('No available developers, analyses will be answered without calling Gemini')
+        # The fake server ignores the key, but the client refuses to start without one
+        os.environ.setdefault('GEMINI_API_KEY', 'load-test')
+
+        self.failed = 0
+        with FakeGeminiServer(delay=options['latency']) as server:
+            # The rate limits would turn most of the load away, measuring 429 responses instead
+            with override_settings(
+                GEMINI_BASE_URL=server.base_url,
+                ALLOWED_HOSTS=['*'],
+                AGENT_RATE_LIMIT={**settings.AGENT_RATE_LIMIT, 'ENABLED': False},
+            ):
+                reset_gemini_client()
+                self.stdout.write(
+                    f"{options['requests']} requests to {options['endpoint']}, fake Gemini latency "
+                    f"{options['latency'] * 1000:.0f} ms"
+                )
+                sync_elapsed, sync_timings = self._run_sync(sync_url, payload, options)
+                self._report(f"Sync ({options['workers']} workers)", sync_elapsed, sync_timings)
+
+                async_elapsed, async_timings = asyncio.run(self._run_async(async_url, payload, options))
+                self._report(f"Async (concurrency {options['concurrency']})", async_elapsed, async_timings)
+            reset_gemini_client()
+
+        if self.failed:
+            raise CommandError(f'{self.failed} requests failed, the throughputs are not comparable')
+        self.stdout.write(self.style.SUCCESS(
+            f'Async throughput is {sync_elapsed / async_elapsed:.1f}x the sync throughput'
+        ))
+
+    @staticmethod
+    def _payload(endpoint):
+        if endpoint == 'query':
+            return {'query': 'What is Django?'}
+        return {
+            'project_name': 'Load test',
+            'project_description': 'A web application built with Python and Django',
+            'use_cache': 'false',
+        }
+
+    def _run_sync(self, url, payload, options):
+        def request(_):
+            started = time.perf_counter()
+            response = Client().post(url, payload, content_type='application/json')
+            return response.status_code, (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            results = list(executor.map(request, range(options['requests'])))
+        return time.perf_counter() - started, self._check(results)
+
+    async def _run_async(self, url, payload, options):
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        client = AsyncClient()
+
+        async def request():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(url, payload, content_type='application/json')
+                return response.status_code, (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(request() for _ in range(options['requests'])))
+        return time.perf_counter() - started, self._check(results)
+
+    def _check(self, results):
+        failed = [status_code for status_code, _ in results if status_code != 200]
+        if failed:
+            self.failed += len(failed)
+            self.stderr.write(f'{len(failed)} requests failed (status codes: {sorted(set(failed))})')
+        return [timing for _, timing in results]
+
+    def _report(self, label, elapsed, timings):
+        timings = sorted(timings)
+        self.stdout.write(
+            f'{label}: {len(timings) / elapsed:.1f} req/s, median {statistics.median(timings):.0f} ms, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.0f} ms, total {elapsed:.2f} s'
+        )
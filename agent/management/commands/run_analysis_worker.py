@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from agent.jobs import claim_next_job, requeue_stale_jobs, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued project analysis jobs. Several workers, on any number of hosts, '
+        'can share the database-backed queue'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--stale-check-interval', type=float, default=60.0, help='Seconds between checks for stale jobs')
+
+    def handle(self, *args, **options):
+        name = worker_name()
+        self.stdout.write(f'Analysis worker {name} started')
+        last_stale_check = 0.0
+
+        try:
+            while True:
+                if time.monotonic() - last_stale_check >= options['stale_check_interval']:
+                    recovered = requeue_stale_jobs()
+                    if recovered:
+                        self.stdout.write(self.style.WARNING(f'Recovered {recovered} stale jobs'))
+                    last_stale_check = time.monotonic()
+
+                job = claim_next_job(name)
+                if job is None:
+                    if options['once']:
+                        break
+                    # Do not hold a connection open while idle
+                    close_old_connections()
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                started = time.perf_counter()
+                run_job(job)
+                job.refresh_from_db(fields=['status'])
+                self.stdout.write(
+                    f'Job {job.id} {job.status} in {(time.perf_counter() - started) * 1000:.0f} ms'
+                )
+        except KeyboardInterrupt:
+            self.stdout.write('Analysis worker stopped')
@@ -0,0 +1,363 @@
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .cache import get_analysis_cache
+from .resilience import CircuitBreaker, gemini_breaker
+
+logger = logging.getLogger(__name__)
+
+
+# Upper bounds of the histogram buckets, in seconds and in tokens
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Metric:
+    """
+    Metric of the MetricsRegistry with a value per combination of its label values.
+    """
+
+    TYPE = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {', '.join(self.labelnames) or 'none'}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        """
+        Render the metric in the Prometheus text exposition format.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        with self._lock:
+            samples = list(self._samples())
+        lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in samples)
+        return lines
+
+
+class Counter(Metric):
+    """
+    Monotonic counter; its name ends in _total.
+    """
+
+    TYPE = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        for key, value in sorted(self._values.items()):
+            yield self.name, list(zip(self.labelnames, key)), value
+
+
+class Histogram(Metric):
+    """
+    Histogram counting observations per bucket, with their sum and count.
+    """
+
+    TYPE = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=SECONDS_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], 0.0))
+            return sum(counts)
+
+    def _samples(self):
+        for key, (counts, total) in sorted(self._values.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket", labels + [("le", _format_value(float(bound)))], cumulative
+            yield f"{self.name}_sum", labels, round(total, 6)
+            yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """
+    Metrics of this process, rendered for Prometheus by the admin metrics endpoint.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return lines
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "agent_analysis_stage_seconds",
+    "Duration of the stages of project analyses (extract, cache_lookup, snapshot, rank, prompt, local, gemini, finish)",
+    ["stage"]
+))
+ANALYSIS_SECONDS = registry.register(Histogram(
+    "agent_analysis_seconds", "Duration of project analyses", ["engine", "outcome"]
+))
+ANALYSES = registry.register(Counter(
+    "agent_analyses_total",
+    "Project analyses by engine and outcome (generated, cached, reused, local, fallback, failed)",
+    ["engine", "outcome"]
+))
+GEMINI_CALL_SECONDS = registry.register(Histogram(
+    "agent_gemini_call_seconds", "Duration of Gemini calls including retries", ["operation", "outcome"]
+))
+GEMINI_TOKENS = registry.register(Histogram(
+    "agent_gemini_tokens", "Tokens per Gemini call as reported by Gemini", ["kind"], TOKEN_BUCKETS
+))
+GEMINI_TOKENS_TOTAL = registry.register(Counter(
+    "agent_gemini_tokens_total", "Tokens of all Gemini calls as reported by Gemini", ["kind"]
+))
+GEMINI_COST = registry.register(Counter(
+    "agent_gemini_cost_usd_total", "Estimated cost of the Gemini calls in USD, see GEMINI_PRICING"
+))
+PROMPT_TOKENS_ESTIMATE = registry.register(Histogram(
+    "agent_analysis_prompt_estimated_tokens", "Estimated tokens of the analysis prompts sent to Gemini",
+    buckets=TOKEN_BUCKETS
+))
+
+
+def estimate_cost(usage):
+    """
+    Estimate the cost of a Gemini call from its token usage and GEMINI_PRICING.
+
+    Returns:
+        float: Cost in USD, or None without usage
+    """
+    if not usage or usage.get("prompt_tokens") is None:
+        return None
+    pricing = settings.GEMINI_PRICING
+    return round(
+        usage["prompt_tokens"] * pricing['INPUT_PER_MILLION'] / 1_000_000
+        + (usage.get("response_tokens") or 0) * pricing['OUTPUT_PER_MILLION'] / 1_000_000,
+        8
+    )
+
+
+def call_outcome(result):
+    """
+    Outcome label of a Gemini call result: success, circuit_open, timed_out or error
+    """
+    if result["success"]:
+        return "success"
+    if result.get("circuit_open"):
+        return "circuit_open"
+    return "timed_out" if result.get("timed_out") else "error"
+
+
+def observe_gemini_call(operation, seconds, result, usage=None):
+    """
+    Record the duration, outcome and token usage of a Gemini call.
+
+    Args:
+        operation (str): "generate" or "stream"
+        seconds (float): Duration of the call including retries
+        result (dict): Result of the call, see call_outcome
+        usage (dict): Token counts reported by Gemini, if any
+    """
+    GEMINI_CALL_SECONDS.observe(seconds, operation=operation, outcome=call_outcome(result))
+    for kind, count in (usage or {}).items():
+        if count is not None:
+            kind = kind.removesuffix("_tokens")
+            GEMINI_TOKENS.observe(count, kind=kind)
+            GEMINI_TOKENS_TOTAL.inc(count, kind=kind)
+    cost = estimate_cost(usage)
+    if cost:
+        GEMINI_COST.inc(cost)
+
+
+def analysis_outcome(result):
+    """
+    Outcome label of an analysis result: generated, cached, reused, local, fallback or failed
+    """
+    if not result.get("success"):
+        return "failed"
+    if result.get("fallback"):
+        return "fallback"
+    if result.get("reused_run_id"):
+        return "reused"
+    if result.get("cached"):
+        return "cached"
+    return "local" if result.get("engine") == "local" else "generated"
+
+
+class AnalysisTrace:
+    """
+    Timing spans of one project analysis.
+
+    Each stage's duration is observed in the agent_analysis_stage_seconds
+    histogram as it ends. finish reports the timings in the result, records the
+    analysis in the metrics and logs it as one structured (JSON) record.
+    """
+
+    def __init__(self, operation="analyze"):
+        self.operation = operation
+        self.started = time.perf_counter()
+        self.spans = {}
+
+    def add(self, stage, seconds):
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+    @contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def timings(self):
+        """
+        Returns:
+            dict: Milliseconds of every stage ("<stage>_ms") and the "total_ms" so far
+        """
+        timings = {f"{stage}_ms": round(seconds * 1000, 1) for stage, seconds in self.spans.items()}
+        timings["total_ms"] = round((time.perf_counter() - self.started) * 1000, 1)
+        return timings
+
+    def finish(self, result, gemini_response=None, user=None):
+        """
+        Add the "timings" to an analysis result, record it and log it.
+
+        Args:
+            result (dict): Result of the analysis
+            gemini_response (dict): Result of the Gemini call with its token "usage", if one was made
+            user: UserAuth who asked for the analysis, if any
+
+        Returns:
+            dict: The result
+        """
+        result["timings"] = {**result.get("timings", {}), **self.timings()}
+        engine = result.get("engine") or "gemini"
+        outcome = analysis_outcome(result)
+        ANALYSES.inc(engine=engine, outcome=outcome)
+        ANALYSIS_SECONDS.observe(time.perf_counter() - self.started, engine=engine, outcome=outcome)
+
+        prompt_stats = result.get("prompt_stats") or {}
+        if gemini_response is not None and prompt_stats.get("prompt_tokens") is not None:
+            PROMPT_TOKENS_ESTIMATE.observe(prompt_stats["prompt_tokens"])
+
+        usage = (gemini_response or {}).get("usage")
+        record = {
+            "event": "project_analysis",
+            "operation": self.operation,
+            "project_name": result.get("project_name"),
+            "user_id": getattr(user, 'id', None),
+            "engine": engine,
+            "outcome": outcome,
+            "model": result.get("model"),
+            "output_format": result.get("output_format"),
+            "developers_analyzed": result.get("total_developers_analyzed"),
+            "shortlisted_developers": result.get("shortlisted_developers"),
+            "estimated_prompt_tokens": prompt_stats.get("prompt_tokens"),
+            "usage": usage,
+            "cost_usd": estimate_cost(usage),
+            "timings": result["timings"],
+            "error": None if result.get("success") else result.get("error"),
+        }
+        logger.info(json.dumps(record, default=str), extra={"analysis": record})
+        return result
+
+
+def render_metrics():
+    """
+    Render the metrics of this process in the Prometheus text exposition format,
+    with the Gemini circuit breaker and analysis cache counters.
+
+    Returns:
+        str: The exposition
+    """
+    lines = registry.render()
+
+    breaker = gemini_breaker.stats()
+    lines.extend([
+        "# HELP agent_gemini_circuit_open Whether the Gemini circuit breaker rejects calls (1) or not (0)",
+        "# TYPE agent_gemini_circuit_open gauge",
+        f"agent_gemini_circuit_open {int(breaker['state'] == CircuitBreaker.OPEN)}",
+        "# HELP agent_gemini_breaker_events_total Gemini call events counted by the circuit breaker",
+        "# TYPE agent_gemini_breaker_events_total counter",
+    ])
+    lines.extend(
+        f"agent_gemini_breaker_events_total{_format_labels([('event', event)])} {breaker[event]}"
+        for event in CircuitBreaker.COUNTERS
+    )
+
+    cache_stats = get_analysis_cache().stats()
+    lines.extend([
+        "# HELP agent_analysis_cache_requests_total Analysis cache lookups by result",
+        "# TYPE agent_analysis_cache_requests_total counter",
+        f"agent_analysis_cache_requests_total{_format_labels([('result', 'hit')])} {cache_stats['hits']}",
+        f"agent_analysis_cache_requests_total{_format_labels([('result', 'miss')])} {cache_stats['misses']}",
+    ])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('file_type', models.CharField(max_length=10)),
+                ('max_pages', models.IntegerField()),
+                ('max_chars', models.IntegerField()),
+                ('text', models.TextField()),
+                ('text_length', models.IntegerField()),
+                ('pages_read', models.IntegerField(blank=True, null=True)),
+                ('total_pages', models.IntegerField(blank=True, null=True)),
+                ('truncated', models.BooleanField(default=False)),
+                ('hit_count', models.IntegerField(default=0)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('content_hash', 'file_type', 'max_pages', 'max_chars')},
+            },
+        ),
+    ]
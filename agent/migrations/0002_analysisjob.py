@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:36
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent', '0001_initial'),
+        ('user_auth', '0002_userauth_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('project_name', models.CharField(max_length=255)),
+                ('project_description', models.TextField(blank=True, null=True)),
+                ('required_skills', models.JSONField(blank=True, null=True)),
+                ('project_categories', models.JSONField(blank=True, null=True)),
+                ('shortlist_size', models.IntegerField(blank=True, null=True)),
+                ('use_cache', models.BooleanField(default=True)),
+                ('file_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('file_content', models.BinaryField(blank=True, null=True)),
+                ('analysis', models.TextField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('worker', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='analysis_jobs', to='user_auth.userauth')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='agent_analy_status_08537b_idx'), models.Index(fields=['user', 'created_at'], name='agent_analy_user_id_68dc33_idx')],
+            },
+        ),
+    ]
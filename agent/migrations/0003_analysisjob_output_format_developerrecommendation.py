@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent', '0002_analysisjob'),
+        ('developers', '0006_developers_overall_level'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='output_format',
+            field=models.CharField(default='markdown', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='DeveloperRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('analysis_key', models.CharField(max_length=64)),
+                ('project_name', models.CharField(max_length=255)),
+                ('rank', models.IntegerField()),
+                ('score', models.FloatField()),
+                ('reasons', models.JSONField(default=list)),
+                ('relevant_projects', models.JSONField(default=list)),
+                ('gaps', models.JSONField(default=list)),
+                ('model', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('developer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='developers.developers')),
+            ],
+            options={
+                'ordering': ['analysis_key', 'rank'],
+                'indexes': [models.Index(fields=['developer', 'created_at'], name='agent_devel_develop_856ae6_idx'), models.Index(fields=['created_at'], name='agent_devel_created_b63e4f_idx')],
+                'unique_together': {('analysis_key', 'developer')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:54
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent', '0003_analysisjob_output_format_developerrecommendation'),
+        ('user_auth', '0002_userauth_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='reuse_run',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='AnalysisRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('project_name', models.CharField(max_length=255)),
+                ('project_description', models.TextField(blank=True, null=True)),
+                ('required_skills', models.JSONField(blank=True, null=True)),
+                ('project_categories', models.JSONField(blank=True, null=True)),
+                ('shortlist_size', models.IntegerField(blank=True, null=True)),
+                ('output_format', models.CharField(default='markdown', max_length=20)),
+                ('document', models.JSONField(blank=True, null=True)),
+                ('prompt_hash', models.CharField(max_length=64)),
+                ('analysis_key', models.CharField(max_length=64)),
+                ('roster_version', models.BigIntegerField(blank=True, null=True)),
+                ('model', models.CharField(max_length=100)),
+                ('estimated_prompt_tokens', models.IntegerField(blank=True, null=True)),
+                ('prompt_tokens', models.IntegerField(blank=True, null=True)),
+                ('response_tokens', models.IntegerField(blank=True, null=True)),
+                ('total_tokens', models.IntegerField(blank=True, null=True)),
+                ('latency_ms', models.FloatField(blank=True, null=True)),
+                ('analysis', models.TextField(blank=True, null=True)),
+                ('result', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reused_from', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reuses', to='agent.analysisrun')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='analysis_runs', to='user_auth.userauth')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['prompt_hash', 'created_at'], name='agent_analy_prompt__c22495_idx'), models.Index(fields=['created_at'], name='agent_analy_created_8bedcc_idx'), models.Index(fields=['user', 'created_at'], name='agent_analy_user_id_b32203_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent', '0004_analysisjob_reuse_run_analysisrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='engine',
+            field=models.CharField(default='gemini', max_length=20),
+        ),
+    ]
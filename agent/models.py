@@ -1,3 +1,182 @@
+import uuid
+
 from django.db import models
+from django.utils import timezone
+
+from developers.models import Developers
+from user_auth.models import UserAuth
 
 # Create your models here.
+class ExtractedDocument(models.Model):
+    """
+    Text extracted from an uploaded project document, keyed on the SHA-256 of the
+    file's bytes and the extraction budget it was extracted with, so repeat
+    uploads of the same file skip parsing. Least recently used entries are
+    evicted once the stored text exceeds AGENT_DOCUMENT_CACHE_MAX_CHARS.
+    """
+    content_hash = models.CharField(max_length=64)
+    file_type = models.CharField(max_length=10)
+    max_pages = models.IntegerField()
+    max_chars = models.IntegerField()
+    
+    text = models.TextField()
+    text_length = models.IntegerField()
+    pages_read = models.IntegerField(blank=True, null=True)
+    total_pages = models.IntegerField(blank=True, null=True)
+    truncated = models.BooleanField(default=False)
+    
+    hit_count = models.IntegerField(default=0)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['content_hash', 'file_type', 'max_pages', 'max_chars']
+    
+    def __str__(self):
+        return f"{self.file_type} {self.content_hash[:12]} ({self.text_length} chars)"
+
+
+class AnalysisJob(models.Model):
+    """
+    A project analysis submitted to run in the background, and its outcome.
+    
+    The table doubles as the job queue: workers claim the oldest queued job with
+    SELECT ... FOR UPDATE SKIP LOCKED, so no message broker is needed. The
+    uploaded project file is kept in file_content until the job finishes.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(UserAuth, on_delete=models.SET_NULL, blank=True, null=True, related_name='analysis_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    
+    project_name = models.CharField(max_length=255)
+    project_description = models.TextField(blank=True, null=True)
+    required_skills = models.JSONField(blank=True, null=True)
+    project_categories = models.JSONField(blank=True, null=True)
+    shortlist_size = models.IntegerField(blank=True, null=True)
+    use_cache = models.BooleanField(default=True)
+    output_format = models.CharField(max_length=20, default='markdown')
+    reuse_run = models.BooleanField(default=False)
+    engine = models.CharField(max_length=20, default='gemini')
+    file_name = models.CharField(max_length=255, blank=True, null=True)
+    file_content = models.BinaryField(blank=True, null=True)
+    
+    analysis = models.TextField(blank=True, null=True)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    
+    attempts = models.IntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.project_name} ({self.status})"
+    
+    @property
+    def queued_ms(self):
+        if self.started_at is None:
+            return None
+        return round((self.started_at - self.created_at).total_seconds() * 1000, 1)
+    
+    @property
+    def run_ms(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return round((self.finished_at - self.started_at).total_seconds() * 1000, 1)
+
+
+class DeveloperRecommendation(models.Model):
+    """
+    A developer recommended by a structured (JSON output format) project analysis.
+    
+    Every recommendation is a row, so recommendations can be filtered, counted and
+    aggregated per developer in SQL. The rows of an analysis share its analysis_key
+    (the analysis cache key), and regenerating the analysis replaces them.
+    """
+    analysis_key = models.CharField(max_length=64)
+    project_name = models.CharField(max_length=255)
+    developer = models.ForeignKey(Developers, on_delete=models.CASCADE, related_name='recommendations')
+    rank = models.IntegerField()
+    score = models.FloatField()
+    reasons = models.JSONField(default=list)
+    relevant_projects = models.JSONField(default=list)
+    gaps = models.JSONField(default=list)
+    model = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['analysis_key', 'rank']
+        unique_together = ['analysis_key', 'developer']
+        indexes = [
+            models.Index(fields=['developer', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.project_name}: #{self.rank} {self.developer_id} ({self.score})"
+
+
+class AnalysisRun(models.Model):
+    """
+    A project analysis Gemini generated (or a reuse of one), with its inputs,
+    the prompt hash, roster version, model, token counts, latency and output.
+    
+    Runs are looked up by prompt hash to reuse an earlier analysis of the very same
+    prompt: the prompt holds everything Gemini sees, so an unchanged hash means
+    nothing relevant to the analysis changed.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(UserAuth, on_delete=models.SET_NULL, blank=True, null=True, related_name='analysis_runs')
+    
+    project_name = models.CharField(max_length=255)
+    project_description = models.TextField(blank=True, null=True)
+    required_skills = models.JSONField(blank=True, null=True)
+    project_categories = models.JSONField(blank=True, null=True)
+    shortlist_size = models.IntegerField(blank=True, null=True)
+    output_format = models.CharField(max_length=20, default='markdown')
+    document = models.JSONField(blank=True, null=True)
+    
+    prompt_hash = models.CharField(max_length=64)
+    analysis_key = models.CharField(max_length=64)
+    roster_version = models.BigIntegerField(blank=True, null=True)
+    model = models.CharField(max_length=100)
+    estimated_prompt_tokens = models.IntegerField(blank=True, null=True)
+    prompt_tokens = models.IntegerField(blank=True, null=True)
+    response_tokens = models.IntegerField(blank=True, null=True)
+    total_tokens = models.IntegerField(blank=True, null=True)
+    latency_ms = models.FloatField(blank=True, null=True)
+    
+    analysis = models.TextField(blank=True, null=True)
+    result = models.JSONField(default=dict)
+    reused_from = models.ForeignKey('self', on_delete=models.SET_NULL, blank=True, null=True, related_name='reuses')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['prompt_hash', 'created_at']),
+            models.Index(fields=['created_at']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.project_name} ({self.created_at:%Y-%m-%d %H:%M})"
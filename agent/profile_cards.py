@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from developers.roster import get_profile_versions
+from .prompts import AnalysisPromptCompiler
+
+
+class ProfileCardCache:
+    """
+    Cache of developer profile cards (see AnalysisPromptCompiler.render_card):
+    a developer's snapshot data with their prompt rows and token counts.
+
+    Cards are stored in the AGENT_PROFILE_CARDS cache under the developer's
+    profile version, which the signals in developers/signals.py bump whenever the
+    developer, their skills, skill levels or projects change. A changed developer
+    is thus simply not found and gets a new card; the old one expires.
+    """
+
+    # Bump when the card structure or the row encoding changes
+    FORMAT_VERSION = 2
+
+    @staticmethod
+    def _cache():
+        return caches[settings.AGENT_PROFILE_CARDS['ALIAS']]
+
+    @classmethod
+    def _key(cls, developer_id, version):
+        return (
+            f"agent:profile_card:{cls.FORMAT_VERSION}:{settings.AGENT_PROMPT_DESCRIPTION_CHARS}:"
+            f"{settings.AGENT_PROMPT_CHARS_PER_TOKEN}:{developer_id}:{version}"
+        )
+
+    @classmethod
+    def get_many(cls, developer_ids):
+        """
+        Get the current cards of developers.
+
+        Returns:
+            tuple: Developer id -> card for the developers with a current card, and
+            the profile versions of all developers, to be passed to set_many for
+            the cards rendered for the others
+        """
+        versions = get_profile_versions(developer_ids)
+        keys = {cls._key(developer_id, version): developer_id for developer_id, version in versions.items()}
+        found = cls._cache().get_many(list(keys))
+        return {keys[key]: card for key, card in found.items()}, versions
+
+    @classmethod
+    def set_many(cls, cards, versions):
+        """
+        Store newly rendered cards.
+
+        Args:
+            cards (dict): Developer id -> card
+            versions (dict): Profile versions returned by get_many before the
+                developers were loaded, so a change made meanwhile is not hidden
+        """
+        cls._cache().set_many(
+            {cls._key(developer_id, versions[developer_id]): card for developer_id, card in cards.items()},
+            timeout=settings.AGENT_PROFILE_CARDS['TTL'],
+        )
+
+    @staticmethod
+    def render(developer):
+        """
+        Render the card of a developer loaded by GeminiService._snapshot_query and serialized.
+        """
+        return AnalysisPromptCompiler().render_card(developer)
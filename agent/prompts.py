@@ -0,0 +1,336 @@
+import math
+import textwrap
+
+from django.conf import settings
+
+from developers.skill_index import normalize_skill_name as normalize_name
+
+
+ANALYSIS_PROMPT_TEMPLATE = textwrap.dedent("""
+    You are an expert **Project Manager** and **Technical Salesperson**.
+    Analyze the given project requirements and available developers.
+    Your task is to recommend the most suitable developers ONLY using the information provided (no assumptions).
+
+    ---
+
+    ## PROJECT DETAILS
+    - **Name:** {project_name}
+    - **Description:** {project_description}
+    - **Required Skills:** {required_skills}
+    - **Project Categories:** {project_categories}
+
+    ---
+
+    ## AVAILABLE DEVELOPERS
+    {developers}
+
+    ---
+
+    ## OUTPUT REQUIREMENTS
+    You MUST respond in **clear Markdown** following the exact structure below.
+    Keep it **brief and to the point** (no more than 4–5 bullet points per section).
+    Do **not** invent or infer skills or experience not explicitly listed.
+    Do **not** repeat project details unnecessarily.
+    Use only developer data provided.
+
+    ---
+
+    ### RESPONSE STRUCTURE
+
+    #### 1. Brief Analysis of Project
+    - (2–3 bullet points summarizing key needs)
+
+    #### 2. Required Skills & Technical Expertise
+    - (List key skills & expertise required for the project, bullet format)
+
+    #### 3. Top 3 Developer Recommendations
+    For each developer, create a separate subsection. If less developers are available, then only display the approriate once:
+
+    ##### Developer Rank. **Name**
+    - **Score:** x/10
+    - **Why Suggested:** (1–3 concise bullet points)
+    - **Relevant Projects:**
+        - **Project name**: description.
+        - **Link:** Links of project
+    - **Potential Concerns / Gaps:** (1–2 concise bullet points)
+
+    ---
+
+    ### ADDITIONAL INSTRUCTIONS
+    - Use **Markdown headings**, lists and bold text exactly as shown.
+    - Keep tone **neutral and professional**, avoid filler words.
+    - Do NOT add APIs, libraries, or technologies not listed in developer data.
+    - Always provide exactly 3 developer recommendations (ranked).
+""").strip()
+
+ANALYSIS_JSON_PROMPT_TEMPLATE = textwrap.dedent("""
+    You are an expert **Project Manager** and **Technical Salesperson**.
+    Analyze the given project requirements and available developers.
+    Your task is to recommend the most suitable developers ONLY using the information provided (no assumptions).
+
+    ---
+
+    ## PROJECT DETAILS
+    - **Name:** {project_name}
+    - **Description:** {project_description}
+    - **Required Skills:** {required_skills}
+    - **Project Categories:** {project_categories}
+
+    ---
+
+    ## AVAILABLE DEVELOPERS
+    {developers}
+
+    ---
+
+    ## OUTPUT REQUIREMENTS
+    Respond with JSON only, following the response schema:
+    - "summary": 2–3 short points summarizing the key needs of the project.
+    - "required_expertise": the key skills and expertise the project requires.
+    - "recommendations": the top 3 developers (fewer if fewer are available), best first, each with:
+        - "developer_id": the developer's ID from the first column of AVAILABLE DEVELOPERS.
+        - "score": how well the developer fits the project, from 0 to 10.
+        - "reasons": 1–3 concise reasons for suggesting the developer.
+        - "relevant_projects": names of the developer's projects relevant to this project.
+        - "gaps": 1–2 concise potential concerns or gaps.
+    Do **not** invent or infer skills or experience not explicitly listed, and only use IDs listed above.
+""").strip()
+
+OUTPUT_MARKDOWN = "markdown"
+OUTPUT_JSON = "json"
+OUTPUT_FORMATS = [OUTPUT_MARKDOWN, OUTPUT_JSON]
+
+_STRING_LIST = {"type": "ARRAY", "items": {"type": "STRING"}}
+
+# Schema Gemini's response is constrained to in the JSON output format
+ANALYSIS_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "summary": _STRING_LIST,
+        "required_expertise": _STRING_LIST,
+        "recommendations": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "developer_id": {"type": "INTEGER"},
+                    "score": {"type": "NUMBER", "minimum": 0, "maximum": 10},
+                    "reasons": _STRING_LIST,
+                    "relevant_projects": _STRING_LIST,
+                    "gaps": _STRING_LIST,
+                },
+                "required": ["developer_id", "score", "reasons", "gaps"],
+                "propertyOrdering": ["developer_id", "score", "reasons", "relevant_projects", "gaps"],
+            },
+        },
+    },
+    "required": ["summary", "required_expertise", "recommendations"],
+    "propertyOrdering": ["summary", "required_expertise", "recommendations"],
+}
+
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens Gemini counts for a text.
+
+    Gemini averages about 4 characters per token on English text; counting them
+    exactly would cost an API round-trip per prompt.
+    """
+    return math.ceil(len(text) / settings.AGENT_PROMPT_CHARS_PER_TOKEN)
+
+
+class AnalysisPromptCompiler:
+    """
+    Compiler of the project analysis prompt, packing the ranked shortlist into a
+    token budget.
+
+    Developers are encoded as compact pipe-separated rows, each followed by rows
+    for their projects, most relevant to the requested skills and categories
+    first. The rows are rendered once per developer into a profile card, so
+    assembling a prompt from cached cards only concatenates them.
+
+    Developers are added in rank order while they fit into
+    AGENT_PROMPT_TOKEN_BUDGET; a developer that does not fit whole is added with
+    fewer projects, and packing stops at the first developer that does not fit
+    even without projects, so the prompt always holds the top of the ranking.
+
+    In the JSON output format, developers are numbered by their id instead of
+    their rank, for Gemini to refer to them.
+    """
+
+    DEVELOPER_COLUMNS = "#|Name|Role|Experience (years)|Skills (name:level 0-3)"
+    JSON_DEVELOPER_COLUMNS = "ID|Name|Role|Experience (years)|Skills (name:level 0-3)"
+    PROJECT_COLUMNS = "-|Project|Categories|Tech stack|Skills used|Links|Description"
+
+    def __init__(self, required_skills=None, project_categories=None, token_budget=None, description_chars=None, output_format=OUTPUT_MARKDOWN):
+        self.required_skills = {normalize_name(skill) for skill in required_skills or []}
+        self.project_categories = {normalize_name(category) for category in project_categories or []}
+        self.token_budget = settings.AGENT_PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+        self.description_chars = settings.AGENT_PROMPT_DESCRIPTION_CHARS if description_chars is None else description_chars
+        self.output_format = output_format
+
+    @staticmethod
+    def _field(value):
+        # Keep every row on one line and every field in its column
+        return " ".join(str(value).split()).replace("|", "/") if value else ""
+
+    @classmethod
+    def _list(cls, values):
+        return ";".join(cls._field(value) for value in values if value)
+
+    def _project_relevance(self, project):
+        return (
+            sum(1 for skill in project['skills'] if skill in self.required_skills)
+            + sum(1 for category in project['categories'] if category in self.project_categories)
+        )
+
+    def _developer_row(self, developer):
+        skills = self._list(f"{skill['name']}:{skill['level']}" for skill in developer['skills'])
+        return "|".join([
+            self._field(developer['name']), self._field(developer['role']),
+            str(developer['industry_experience']), skills
+        ])
+
+    def _project_row(self, project):
+        """
+        Encode a project, returning the row and whether its description was shortened
+        """
+        description = self._field(project['description'])
+        shortened = self.description_chars and len(description) > self.description_chars
+        if shortened:
+            description = description[:self.description_chars].rstrip() + "…"
+        links = self._list([project.get('repo_link'), project.get('live_link')])
+        return "|".join([
+            "-", self._field(project['name']), self._list(project['project_categories']),
+            self._list(project['tech_stack'] or []), self._list(project['skills_used']), links, description
+        ]), bool(shortened)
+
+    def render_card(self, developer):
+        """
+        Render a developer's profile card: their rows of the developers section
+        with their estimated tokens, which do not depend on the project analyzed
+
+        Args:
+            developer (dict): Developer data as returned by GeminiService.get_developer_data
+
+        Returns:
+            dict: The "developer" data, its "row" (without the rank) and "row_tokens",
+            and per project its "row", "tokens", whether its description was
+            "shortened" and its normalized "skills" and "categories"
+        """
+        row = self._developer_row(developer)
+        projects = []
+        for project in developer['projects']:
+            project_row, shortened = self._project_row(project)
+            projects.append({
+                "row": project_row,
+                "tokens": estimate_tokens(project_row) + 1,
+                "shortened": shortened,
+                "skills": [normalize_name(skill) for skill in project['skills_used']],
+                "categories": [normalize_name(category) for category in project['project_categories']],
+            })
+        return {"developer": developer, "row": row, "row_tokens": estimate_tokens(row) + 1, "projects": projects}
+
+    def _pack_developer(self, number, card, remaining_tokens):
+        """
+        Assemble a developer's rows from their card, numbered by their rank or id,
+        with as many projects as fit into the remaining tokens
+
+        Returns:
+            tuple: The developer's lines, their token count and the number of
+            included projects and shortened descriptions, or None when not even the
+            developer row fits
+        """
+        projects = sorted(card['projects'], key=self._project_relevance, reverse=True)
+        lines = [f"{number}|{card['row']}"]
+        tokens = card['row_tokens'] + estimate_tokens(f"{number}|")
+        # Room for the note on omitted projects, should any have to be omitted
+        note_tokens = estimate_tokens(f"-|+{len(projects)} more projects") + 1 if projects else 0
+        if tokens + note_tokens > remaining_tokens:
+            return None
+
+        included = shortened = 0
+        for index, project in enumerate(projects):
+            last = index == len(projects) - 1
+            if tokens + project['tokens'] + (0 if last else note_tokens) > remaining_tokens:
+                break
+            lines.append(project['row'])
+            tokens += project['tokens']
+            included += 1
+            shortened += project['shortened']
+
+        if included < len(projects):
+            note = f"-|+{len(projects) - included} more projects"
+            lines.append(note)
+            tokens += estimate_tokens(note) + 1
+        return lines, tokens, included, shortened
+
+    def compile_developers(self, developers, cards=None):
+        """
+        Encode the ranked developers within the token budget
+
+        Args:
+            developers (list): Developer data in rank order, as returned by DeveloperRankingService.rank
+            cards (dict): Developer id -> profile card rendered with the same
+                description_chars, e.g. from ProfileCardCache; missing cards are rendered
+
+        Returns:
+            tuple: The encoded developers section, and a report of its "developer_tokens",
+            the "token_budget", the "developers_included" and the "developers_dropped" ids,
+            and per developer whose projects were cut the "projects_omitted" and
+            "descriptions_shortened"
+        """
+        structured = self.output_format == OUTPUT_JSON
+        lines = [self.JSON_DEVELOPER_COLUMNS if structured else self.DEVELOPER_COLUMNS, self.PROJECT_COLUMNS]
+        tokens = estimate_tokens("\n".join(lines)) + 1
+        truncated = []
+        included = []
+        dropped = []
+
+        for rank, developer in enumerate(developers, 1):
+            if dropped:
+                dropped.append(developer['id'])
+                continue
+
+            card = (cards or {}).get(developer['id']) or self.render_card(developer)
+            packed = self._pack_developer(developer['id'] if structured else rank, card, self.token_budget - tokens)
+            if packed is None:
+                dropped.append(developer['id'])
+                continue
+
+            developer_lines, developer_tokens, projects_included, descriptions_shortened = packed
+            lines.extend(developer_lines)
+            tokens += developer_tokens
+            included.append(developer['id'])
+            if projects_included < len(developer['projects']) or descriptions_shortened:
+                truncated.append({
+                    "developer_id": developer['id'],
+                    "projects_omitted": len(developer['projects']) - projects_included,
+                    "descriptions_shortened": descriptions_shortened,
+                })
+
+        return "\n".join(lines), {
+            "developer_tokens": tokens,
+            "token_budget": self.token_budget,
+            "developers_included": len(included),
+            "developers_dropped": dropped,
+            "truncated_developers": truncated,
+        }
+
+    def compile(self, project_name, project_description, required_skills, project_categories, developers, cards=None):
+        """
+        Build the project analysis prompt for the ranked shortlist
+
+        Returns:
+            tuple: The prompt and the compile_developers report
+        """
+        developers_section, report = self.compile_developers(developers, cards)
+        template = ANALYSIS_JSON_PROMPT_TEMPLATE if self.output_format == OUTPUT_JSON else ANALYSIS_PROMPT_TEMPLATE
+        prompt = template.format(
+            project_name=project_name,
+            project_description=project_description,
+            required_skills=required_skills or 'Not specified',
+            project_categories=project_categories or 'Not specified',
+            developers=developers_section,
+        )
+        return prompt, report
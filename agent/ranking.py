@@ -0,0 +1,148 @@
+from developers.skill_index import normalize_skill_name as normalize_name
+from projects.models import ProjectCategorySkills
+
+
+class DeveloperRankingService:
+    """
+    Service class to score developers locally against the project requirements, so
+    that only a shortlist of candidates is sent to Gemini.
+
+    A developer's score (0-100) combines:
+    - required skills the developer has, weighted by their skill level
+    - skills required by the requested project categories (ProjectCategorySkills),
+      weighted by their skill level
+    - the number of projects the developer did in the requested categories
+    - when description similarities from the semantic project index are given,
+      how similar the developer's closest project is to the project brief,
+      relative to the most similar developer
+    """
+
+    REQUIRED_SKILLS_WEIGHT = 50
+    CATEGORY_SKILLS_WEIGHT = 30
+    CATEGORY_PROJECTS_WEIGHT = 20
+
+    # Number of category projects that earns the full category projects score
+    CATEGORY_PROJECTS_TARGET = 3
+
+    # Points of the score given to description similarity, the other parts share the rest
+    SEMANTIC_WEIGHT = 25
+
+    def __init__(self, required_skills=None, project_categories=None, semantic_scores=None):
+        self.required_skills = {normalize_name(skill) for skill in required_skills or []}
+        self.project_categories = {normalize_name(category) for category in project_categories or []}
+        self.category_skills = self._get_category_skills(project_categories)
+        # Developer id -> (similarity, most similar project id), see SemanticProjectIndex.score
+        self.semantic_scores = semantic_scores
+        self.max_similarity = max((similarity for similarity, _ in (semantic_scores or {}).values()), default=0)
+
+    @staticmethod
+    def _get_category_skills(project_categories):
+        """
+        Get the skills required by the given project categories.
+
+        Args:
+            project_categories (list): List of project category names
+
+        Returns:
+            dict: Normalized skill name -> skill name
+        """
+        if not project_categories:
+            return {}
+
+        skill_names = ProjectCategorySkills.objects.filter(
+            project_category__name__in=project_categories
+        ).values_list('skill__name', flat=True)
+        return {normalize_name(name): name for name in skill_names}
+
+    @staticmethod
+    def _skill_weight(skill):
+        """
+        Weight of a skill the developer has, from 0.25 (basic knowledge) to 1 (expert).
+        """
+        return (skill.get('level', 0) + 1) / 4
+
+    def _match_skills(self, developer_skills, wanted):
+        """
+        Score how well the developer's skills cover the wanted skill names.
+
+        Returns:
+            tuple: Coverage ratio (0-1) and the sorted list of matched skill names
+        """
+        if not wanted:
+            return 0, []
+
+        matched = {}
+        for name, skill in developer_skills.items():
+            if name in wanted:
+                matched[skill['name']] = self._skill_weight(skill)
+        return sum(matched.values()) / len(wanted), sorted(matched)
+
+    def score_developer(self, developer):
+        """
+        Score a single developer from the developer snapshot.
+
+        Args:
+            developer (dict): Developer data as returned by GeminiService.get_developer_data
+
+        Returns:
+            dict: Score and the matches it is based on
+        """
+        developer_skills = {normalize_name(skill['name']): skill for skill in developer['skills']}
+
+        required_ratio, required_matches = self._match_skills(developer_skills, self.required_skills)
+        category_ratio, category_matches = self._match_skills(developer_skills, self.category_skills)
+
+        category_projects = 0
+        if self.project_categories:
+            for project in developer['projects']:
+                if any(normalize_name(category) in self.project_categories for category in project['project_categories']):
+                    category_projects += 1
+        category_projects_ratio = min(category_projects, self.CATEGORY_PROJECTS_TARGET) / self.CATEGORY_PROJECTS_TARGET
+
+        score = (
+            self.REQUIRED_SKILLS_WEIGHT * required_ratio
+            + self.CATEGORY_SKILLS_WEIGHT * category_ratio
+            + self.CATEGORY_PROJECTS_WEIGHT * category_projects_ratio
+        )
+
+        # Without any requirements, fall back to the developer's overall skill levels
+        if not self.required_skills and not self.project_categories and developer['skills']:
+            score = 100 * sum(self._skill_weight(skill) for skill in developer['skills']) / len(developer['skills'])
+
+        similarity, similar_project = 0, None
+        if self.semantic_scores is not None:
+            similarity, project_id = self.semantic_scores.get(developer['id'], (0, None))
+            similar_project = next((project['name'] for project in developer['projects'] if project['id'] == project_id), None)
+            relative_similarity = similarity / self.max_similarity if self.max_similarity else 0
+            score = score * (100 - self.SEMANTIC_WEIGHT) / 100 + self.SEMANTIC_WEIGHT * relative_similarity
+
+        return {
+            'developer_id': developer['id'],
+            'name': developer['name'],
+            'score': round(score, 2),
+            'matched_required_skills': required_matches,
+            'matched_category_skills': category_matches,
+            'category_projects': category_projects,
+            'total_projects': len(developer['projects']),
+            'description_similarity': round(similarity, 3),
+            'similar_project': similar_project,
+        }
+
+    def rank(self, developers, limit=None):
+        """
+        Rank developers by local score.
+
+        Args:
+            developers (list): Developer data as returned by GeminiService.get_developer_data
+            limit (int): Optional number of top developers to keep
+
+        Returns:
+            tuple: The kept developers and their scores, both in rank order
+        """
+        scored = [(self.score_developer(developer), developer) for developer in developers]
+        scored.sort(key=lambda item: (-item[0]['score'], -item[0]['total_projects'], item[0]['developer_id']))
+
+        if limit is not None:
+            scored = scored[:limit]
+
+        return [developer for _, developer in scored], [score for score, _ in scored]
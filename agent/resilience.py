@@ -0,0 +1,260 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+from django.conf import settings
+from google.genai import errors
+
+
+# Responses worth retrying: timeouts, rate limiting and server errors
+TRANSIENT_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling Gemini while the circuit breaker is open.
+    """
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(f"Gemini is failing, calls are suspended for {retry_after} more seconds")
+
+
+class DeadlineExceededError(Exception):
+    """
+    Raised when a Gemini call did not succeed within GEMINI_CLIENT['DEADLINE'] seconds.
+    """
+
+
+def is_transient(error):
+    """
+    Tell whether a failed Gemini call may succeed when retried
+    """
+    if isinstance(error, errors.APIError):
+        return error.code in TRANSIENT_STATUS_CODES
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError, TimeoutError, ConnectionError))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of the Gemini calls of this process, with counters for monitoring.
+
+    The outcomes of the last WINDOW calls are kept; once at least MIN_CALLS of
+    them are known and the share of transient failures reaches FAILURE_RATE, the
+    circuit opens and calls fail right away with CircuitOpenError. After COOLDOWN
+    seconds a single probe call is let through: its success closes the circuit,
+    its failure opens it again. Errors that are not transient (e.g. an invalid
+    request) show Gemini is up and count as successes.
+
+    Options default to the GEMINI_CIRCUIT_BREAKER settings.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    COUNTERS = ["calls", "successes", "failures", "retries", "rejected", "deadline_exceeded", "opened"]
+
+    def __init__(self, window=None, min_calls=None, failure_rate=None, cooldown=None):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self.reset()
+
+    def _option(self, name):
+        value = getattr(self, name)
+        return settings.GEMINI_CIRCUIT_BREAKER[name.upper()] if value is None else value
+
+    def reset(self):
+        """
+        Close the circuit and zero the counters.
+        """
+        with self._lock:
+            self._state = self.CLOSED
+            self._outcomes = deque()
+            self._opened_at = None
+            self._probing = False
+            self._counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def _retry_after(self):
+        return max(1, round(self._opened_at + self._option('cooldown') - time.monotonic()))
+
+    def before_call(self):
+        """
+        Let a call through, or raise CircuitOpenError while the circuit is open.
+        """
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._option('cooldown'):
+                self._state = self.HALF_OPEN
+            if self._state == self.OPEN or (self._state == self.HALF_OPEN and self._probing):
+                self._counters["rejected"] += 1
+                raise CircuitOpenError(self._retry_after() if self._state == self.OPEN else 1)
+            if self._state == self.HALF_OPEN:
+                self._probing = True
+            self._counters["calls"] += 1
+
+    def record(self, success):
+        """
+        Record the outcome of a call let through by before_call.
+        """
+        with self._lock:
+            self._counters["successes" if success else "failures"] += 1
+            if self._state == self.HALF_OPEN:
+                self._probing = False
+                if success:
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+
+            self._outcomes.append(success)
+            while len(self._outcomes) > self._option('window'):
+                self._outcomes.popleft()
+            failures = self._outcomes.count(False)
+            if (
+                self._state == self.CLOSED
+                and len(self._outcomes) >= self._option('min_calls')
+                and failures / len(self._outcomes) >= self._option('failure_rate')
+            ):
+                self._open()
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._counters["opened"] += 1
+
+    def abandon(self):
+        """
+        Forget a call let through by before_call that was cancelled before its outcome was known.
+        """
+        with self._lock:
+            self._probing = False
+
+    def count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: The "state", the "failure_rate" over the window and the counters
+        """
+        with self._lock:
+            state = self._state
+            if state == self.OPEN and time.monotonic() - self._opened_at >= self._option('cooldown'):
+                state = self.HALF_OPEN
+            outcomes = len(self._outcomes)
+            return {
+                "state": state,
+                "failure_rate": round(self._outcomes.count(False) / outcomes, 3) if outcomes else 0.0,
+                "window_calls": outcomes,
+                **self._counters,
+            }
+
+
+gemini_breaker = CircuitBreaker()
+
+
+class RetryState:
+    """
+    Attempts of one Gemini call: retries transient failures with jittered
+    exponential backoff until GEMINI_CLIENT['RETRY_ATTEMPTS'] attempts are made or
+    the call's GEMINI_CLIENT['DEADLINE'] would be exceeded, checking the circuit
+    breaker before every attempt.
+    """
+
+    def __init__(self, breaker=None):
+        self.breaker = breaker or gemini_breaker
+        self.options = settings.GEMINI_CLIENT
+        self.deadline = time.monotonic() + self.options['DEADLINE']
+        self.attempts = 0
+
+    def start_attempt(self):
+        """
+        Returns:
+            float: Seconds the attempt may take: TIMEOUT, or less when the deadline is closer
+        """
+        self.breaker.before_call()
+        self.attempts += 1
+        return max(0.001, min(self.options['TIMEOUT'], self.deadline - time.monotonic()))
+
+    def succeeded(self):
+        self.breaker.record(True)
+
+    def failed(self, error):
+        """
+        Record a failed attempt.
+
+        Returns:
+            float: Seconds to wait before the next attempt
+
+        Raises:
+            The error itself when it is not retried, or DeadlineExceededError when
+            the next attempt could not start within the deadline
+        """
+        transient = is_transient(error)
+        self.breaker.record(not transient)
+        if not transient or self.attempts >= self.options['RETRY_ATTEMPTS']:
+            raise error
+
+        # Full jitter: spread retries of concurrent calls over the whole backoff interval
+        delay = random.uniform(0, min(
+            self.options['RETRY_MAX_DELAY'], self.options['RETRY_INITIAL_DELAY'] * 2 ** (self.attempts - 1)
+        ))
+        if time.monotonic() + delay >= self.deadline:
+            self.breaker.count("deadline_exceeded")
+            raise DeadlineExceededError(
+                f"Gemini did not succeed within {self.options['DEADLINE']} seconds "
+                f"({self.attempts} attempts): {error}"
+            ) from error
+        self.breaker.count("retries")
+        return delay
+
+
+def call_with_retries(call, breaker=None):
+    """
+    Call Gemini with retries and the circuit breaker, see RetryState.
+
+    Args:
+        call: Function making one attempt, taking the seconds it may take
+        breaker (CircuitBreaker): Defaults to the process's gemini_breaker
+
+    Returns:
+        The result of the successful attempt
+    """
+    retry = RetryState(breaker)
+    while True:
+        timeout = retry.start_attempt()
+        try:
+            result = call(timeout)
+        except Exception as error:
+            time.sleep(retry.failed(error))
+            continue
+        retry.succeeded()
+        return result
+
+
+async def acall_with_retries(call, breaker=None):
+    """
+    Async variant of call_with_retries; call returns an awaitable, which is also
+    cancelled once its time is up.
+    """
+    retry = RetryState(breaker)
+    while True:
+        timeout = retry.start_attempt()
+        try:
+            result = await asyncio.wait_for(call(timeout), timeout)
+        except asyncio.CancelledError:
+            retry.breaker.abandon()
+            raise
+        except Exception as error:
+            await asyncio.sleep(retry.failed(error))
+            continue
+        retry.succeeded()
+        return result
@@ -0,0 +1,80 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AnalysisRun
+
+
+class AnalysisRunService:
+    """
+    Service class to record generated project analyses as AnalysisRun rows and to
+    find earlier runs of the same prompt to reuse.
+    """
+
+    @staticmethod
+    def hash_prompt(prompt):
+        """
+        Hash the full prompt sent to Gemini.
+
+        Returns:
+            str: SHA-256 hex digest
+        """
+        return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def record(prepared, result, gemini_response=None, user=None, reused_from_id=None):
+        """
+        Record a generated (or reused) analysis.
+
+        Args:
+            prepared (dict): Result of GeminiService.prepare_project_analysis
+            result (dict): Result of the analysis
+            gemini_response (dict): generate_content result with the call's "latency_ms" and "usage"
+            user: UserAuth who asked for the analysis, if any
+            reused_from_id (UUID): Id of the run whose analysis was reused
+
+        Returns:
+            AnalysisRun: The recorded run
+        """
+        context = prepared["context"]
+        usage = (gemini_response or {}).get("usage") or {}
+        output = dict(result)
+        analysis = output.pop("analysis", None)
+        return AnalysisRun.objects.create(
+            user=user,
+            project_name=context["project_name"][:255],
+            project_description=context["project_description"],
+            required_skills=context["required_skills"],
+            project_categories=context["project_categories"],
+            shortlist_size=prepared["shortlist_size"],
+            output_format=context["output_format"],
+            document=context.get("document"),
+            prompt_hash=prepared["prompt_hash"],
+            analysis_key=prepared["cache_key"],
+            roster_version=prepared["roster_version"],
+            model=result["model"],
+            estimated_prompt_tokens=context["prompt_stats"]["prompt_tokens"],
+            prompt_tokens=usage.get("prompt_tokens"),
+            response_tokens=usage.get("response_tokens"),
+            total_tokens=usage.get("total_tokens"),
+            latency_ms=(gemini_response or {}).get("latency_ms"),
+            analysis=analysis,
+            result=output,
+            reused_from_id=reused_from_id,
+        )
+
+    @staticmethod
+    def find_reusable(prompt_hash, model):
+        """
+        Find the latest run of a prompt younger than AGENT_RUN_REUSE_MAX_AGE seconds.
+
+        Returns:
+            AnalysisRun: The run, or None
+        """
+        return AnalysisRun.objects.filter(
+            prompt_hash=prompt_hash,
+            model=model,
+            created_at__gte=timezone.now() - timedelta(seconds=settings.AGENT_RUN_REUSE_MAX_AGE),
+        ).order_by('-created_at').first()
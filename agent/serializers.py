@@ -0,0 +1,52 @@
+from rest_framework import serializers
+from .models import AnalysisJob, AnalysisRun
+
+
+class AnalysisJobListSerializer(serializers.ModelSerializer):
+    queued_ms = serializers.FloatField(read_only=True)
+    run_ms = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = AnalysisJob
+        fields = ['id', 'project_name', 'status', 'attempts', 'created_at', 'started_at', 'finished_at', 'queued_ms', 'run_ms']
+
+
+class AnalysisJobSerializer(AnalysisJobListSerializer):
+    class Meta(AnalysisJobListSerializer.Meta):
+        fields = AnalysisJobListSerializer.Meta.fields + [
+            'project_description', 'required_skills', 'project_categories', 'shortlist_size', 'output_format',
+            'reuse_run', 'engine', 'file_name', 'analysis', 'result', 'error'
+        ]
+
+
+class AnalysisRunListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnalysisRun
+        fields = [
+            'id', 'project_name', 'output_format', 'model', 'prompt_hash', 'roster_version',
+            'total_tokens', 'latency_ms', 'reused_from', 'created_at'
+        ]
+
+
+class AnalysisRunSerializer(AnalysisRunListSerializer):
+    class Meta(AnalysisRunListSerializer.Meta):
+        fields = AnalysisRunListSerializer.Meta.fields + [
+            'project_description', 'required_skills', 'project_categories', 'shortlist_size', 'document',
+            'analysis_key', 'estimated_prompt_tokens', 'prompt_tokens', 'response_tokens', 'analysis', 'result'
+        ]
+
+
+class DeveloperRecommendationResponseSerializer(serializers.Serializer):
+    """Validates a recommendation of Gemini's structured analysis."""
+    developer_id = serializers.IntegerField()
+    score = serializers.FloatField(min_value=0, max_value=10)
+    reasons = serializers.ListField(child=serializers.CharField())
+    relevant_projects = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    gaps = serializers.ListField(child=serializers.CharField(), allow_empty=True)
+
+
+class StructuredAnalysisResponseSerializer(serializers.Serializer):
+    """Validates Gemini's structured analysis (see prompts.ANALYSIS_RESPONSE_SCHEMA)."""
+    summary = serializers.ListField(child=serializers.CharField())
+    required_expertise = serializers.ListField(child=serializers.CharField())
+    recommendations = DeveloperRecommendationResponseSerializer(many=True)
@@ -1,24 +1,32 @@
-from google import genai
+import asyncio
+import contextlib
+import itertools
 import logging
+import math
 import os
-import tempfile
-from django.db.models import Q
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Prefetch
 from django.core.files.uploadedfile import UploadedFile
-from developers.models import Developers, DeveloperSkills, DeveloperProjects, Skills, SkillAreas
-from projects.models import ProjectCategory, ProjectCategorySkills
-
-# File processing imports
-try:
-    import PyPDF2
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
-
-try:
-    from docx import Document
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
+from google.genai import types
+from developers.models import Developers, DeveloperSkills, DeveloperProjects
+from developers.roster import get_roster_version
+from developers.semantic_index import semantic_index
+from developers.skill_index import skill_index
+from .cache import get_analysis_cache
+from .client import get_gemini_client, run_in_gemini_loop
+from .document_cache import ExtractedTextCache
+from .documents import PDF_AVAILABLE, DOCX_AVAILABLE, extract_pdf_text, extract_docx_text
+from .limits import ConcurrencyGate, GateBusyError
+from .local_recommender import ENGINE_GEMINI, ENGINE_LOCAL, LocalRecommender
+from .metrics import AnalysisTrace, observe_gemini_call
+from .profile_cards import ProfileCardCache
+from .prompts import AnalysisPromptCompiler, ANALYSIS_RESPONSE_SCHEMA, OUTPUT_JSON, OUTPUT_MARKDOWN, estimate_tokens
+from .ranking import DeveloperRankingService
+from .resilience import CircuitOpenError, DeadlineExceededError, acall_with_retries, call_with_retries
+from .runs import AnalysisRunService
+from .structured import StructuredAnalysisService
 
 logger = logging.getLogger(__name__)
 
@@ -28,19 +36,29 @@ class GeminiService:
     Service class to handle Gemini API interactions
     """
     
-    def __init__(self):
-        self.client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    def __init__(self, client=None, user=None, gate_timeout=None):
+        # Reuse the process-wide client and its connection pool unless one is given
+        self.client = client or get_gemini_client()
         self.model = "gemini-2.5-flash"
+        # UserAuth the analyses are run for, recorded with their AnalysisRun
+        self.user = user
+        # Callers not admitted by llm_rate_limit (background jobs) hold a ConcurrencyGate
+        # slot around each Gemini call, waiting at most gate_timeout seconds for it
+        self.gate_timeout = gate_timeout
     
     def extract_text_from_pdf(self, file) -> dict:
         """
         Extract text from PDF file
         
+        The upload is read in memory (or memory-mapped when Django spooled it to
+        disk) and pages are parsed only until the AGENT_DOCUMENT_MAX_PAGES and
+        AGENT_DOCUMENT_MAX_CHARS budgets are reached.
+        
         Args:
             file: UploadedFile object
             
         Returns:
-            dict: Success status and extracted text
+            dict: Success status, extracted text, pages read and whether the text was truncated
         """
         if not PDF_AVAILABLE:
             return {
@@ -50,27 +68,11 @@ class GeminiService:
             }
         
         try:
-            # Create a temporary file to save the uploaded content
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                for chunk in file.chunks():
-                    temp_file.write(chunk)
-                temp_file_path = temp_file.name
-            
-            # Extract text from PDF
-            with open(temp_file_path, 'rb') as pdf_file:
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
-                text = ""
-                
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text() + "\n"
-            
-            # Clean up temporary file
-            os.unlink(temp_file_path)
+            extracted = extract_pdf_text(file)
             
             return {
                 "success": True,
-                "text": text.strip(),
+                **extracted,
                 "error": None
             }
             
@@ -86,11 +88,14 @@ class GeminiService:
         """
         Extract text from DOCX file
         
+        The upload is read without a disk round-trip and paragraphs are collected
+        until the AGENT_DOCUMENT_MAX_CHARS budget is reached.
+        
         Args:
             file: UploadedFile object
             
         Returns:
-            dict: Success status and extracted text
+            dict: Success status, extracted text and whether it was truncated
         """
         if not DOCX_AVAILABLE:
             return {
@@ -100,25 +105,11 @@ class GeminiService:
             }
         
         try:
-            # Create a temporary file to save the uploaded content
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_file:
-                for chunk in file.chunks():
-                    temp_file.write(chunk)
-                temp_file_path = temp_file.name
-            
-            # Extract text from DOCX
-            doc = Document(temp_file_path)
-            text = ""
-            
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            
-            # Clean up temporary file
-            os.unlink(temp_file_path)
+            extracted = extract_docx_text(file)
             
             return {
                 "success": True,
-                "text": text.strip(),
+                **extracted,
                 "error": None
             }
             
@@ -134,11 +125,15 @@ class GeminiService:
         """
         Extract text from uploaded file based on file type
         
+        Files already extracted (same bytes, same extraction budget) are served
+        from ExtractedTextCache without parsing them again.
+        
         Args:
             file: UploadedFile object
             
         Returns:
-            dict: Success status and extracted text
+            dict: Success status, extracted text, the file's "content_hash" and
+            whether the text came from the cache ("cache_hit")
         """
         if not file:
             return {
@@ -150,29 +145,42 @@ class GeminiService:
         # Get file extension
         file_extension = os.path.splitext(file.name)[1].lower()
         
-        if file_extension == '.pdf':
-            return self.extract_text_from_pdf(file)
-        elif file_extension == '.docx':
-            return self.extract_text_from_docx(file)
-        else:
+        extractors = {
+            '.pdf': self.extract_text_from_pdf,
+            '.docx': self.extract_text_from_docx,
+        }
+        if file_extension not in extractors:
             return {
                 "success": False,
                 "error": f"Unsupported file type: {file_extension}. Supported types: .pdf, .docx",
                 "text": ""
             }
+        
+        if not ExtractedTextCache.enabled():
+            return {**extractors[file_extension](file), "cache_hit": False}
+        
+        file_type = file_extension.lstrip('.')
+        content_hash = ExtractedTextCache.hash_upload(file)
+        cached = ExtractedTextCache.get(content_hash, file_type)
+        if cached is not None:
+            return {"success": True, **cached, "error": None, "content_hash": content_hash, "cache_hit": True}
+        
+        result = extractors[file_extension](file)
+        if result["success"]:
+            ExtractedTextCache.store(content_hash, file_type, result)
+        return {**result, "content_hash": content_hash, "cache_hit": False}
     
-    def generate_content(self, query: str) -> dict:
+    def _build_prompt(self, query: str) -> str:
         """
-        Generate content using Gemini API
+        Wrap the user's query in the assistant persona prompt
         
         Args:
             query (str): The query/prompt to send to Gemini
             
         Returns:
-            dict: Response containing the generated content or error information
+            str: Full prompt
         """
-        try:
-            prompt = f"""
+        return f"""
             You have to act like a Skilled and Professional Software Engineer with 10 years of experience in the following fields:
             - Python
             - Django
@@ -193,28 +201,214 @@ class GeminiService:
             You have to give brief and concise answer to the user's query.
             User's query: {query}
             """
-            response = self.client.models.generate_content(
+    
+    @staticmethod
+    def _generation_config(response_schema=None, timeout=None):
+        """
+        Build the generation config asking Gemini for JSON following a schema (or
+        text without one), with the attempt's timeout in seconds
+        """
+        options = {"http_options": types.HttpOptions(timeout=math.ceil(timeout * 1000))} if timeout else {}
+        if response_schema is not None:
+            options.update(response_mime_type="application/json", response_schema=response_schema)
+        return types.GenerateContentConfig(**options) if options else None
+    
+    def _call_failure(self, error):
+        """
+        Build the error result of a failed Gemini call, telling whether the circuit
+        breaker is open ("circuit_open" with the seconds to "retry_after") or the
+        call's deadline passed ("timed_out")
+        """
+        result = {"success": False, "error": str(error), "model": self.model}
+        if isinstance(error, CircuitOpenError):
+            result.update(circuit_open=True, retry_after=error.retry_after)
+        else:
+            logger.error(f"Error calling Gemini API: {str(error)}")
+            if isinstance(error, DeadlineExceededError):
+                result["timed_out"] = True
+        return result
+    
+    @staticmethod
+    def _usage(response):
+        """
+        Get the token counts Gemini reported for a response, or None when it reported none
+        """
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is None:
+            return None
+        counts = {
+            "prompt_tokens": getattr(usage, 'prompt_token_count', None),
+            "response_tokens": getattr(usage, 'candidates_token_count', None),
+            "total_tokens": getattr(usage, 'total_token_count', None),
+        }
+        # Every count is optional in the SDK's usage metadata
+        return {name: count if isinstance(count, int) else None for name, count in counts.items()}
+    
+    def generate_content(self, query: str, response_schema=None) -> dict:
+        """
+        Generate content using Gemini API
+        
+        Args:
+            query (str): The query/prompt to send to Gemini
+            response_schema (dict): Optional schema of the JSON Gemini has to respond with
+            
+        Returns:
+            dict: Response containing the generated content, the call's "latency_ms"
+            and token "usage", or error information
+            
+        Raises:
+            GateBusyError: No ConcurrencyGate slot became free within gate_timeout seconds
+        """
+        gate = ConcurrencyGate.hold(self.gate_timeout) if self.gate_timeout is not None else contextlib.nullcontext()
+        with gate:
+            return self._generate_content(query, response_schema)
+    
+    def _generate_content(self, query, response_schema):
+        started = time.perf_counter()
+        try:
+            contents = self._build_prompt(query)
+            response = call_with_retries(lambda timeout: self.client.models.generate_content(
                 model=self.model,
-                contents=prompt,
-            )
+                contents=contents,
+                config=self._generation_config(response_schema, timeout),
+            ))
             
-            return {
+            result = {
                 "success": True,
                 "response": response.text,
-                "model": self.model
+                "model": self.model,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                "usage": self._usage(response)
             }
             
         except Exception as e:
-            logger.error(f"Error calling Gemini API: {str(e)}")
+            result = self._call_failure(e)
+        
+        observe_gemini_call("generate", time.perf_counter() - started, result, result.get("usage"))
+        return result
+    
+    async def agenerate_content(self, query: str, response_schema=None) -> dict:
+        """
+        Async variant of generate_content using the SDK's async client, so the
+        event loop can serve other requests during the Gemini round-trip
+        
+        Args:
+            query (str): The query/prompt to send to Gemini
+            response_schema (dict): Optional schema of the JSON Gemini has to respond with
+            
+        Returns:
+            dict: Same as generate_content
+        """
+        started = time.perf_counter()
+        try:
+            contents = self._build_prompt(query)
+            response = await acall_with_retries(lambda timeout: self.client.aio.models.generate_content(
+                model=self.model,
+                contents=contents,
+                config=self._generation_config(response_schema, timeout),
+            ))
+            
+            result = {
+                "success": True,
+                "response": response.text,
+                "model": self.model,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+                "usage": self._usage(response)
+            }
+            
+        except Exception as e:
+            result = self._call_failure(e)
+        
+        observe_gemini_call("generate", time.perf_counter() - started, result, result.get("usage"))
+        return result
+    
+    def stream_content(self, query: str):
+        """
+        Generate content using Gemini API, yielding the response as it is produced
+        
+        Args:
+            query (str): The query/prompt to send to Gemini
+            
+        Yields:
+            tuple: ("chunk", {"text": ...}) for every piece of text, then either
+            ("done", metadata with the timings and token "usage") or ("error", error information)
+        """
+        started = time.perf_counter()
+        first_chunk_at = None
+        usage = None
+        contents = self._build_prompt(query)
+        
+        def open_stream(timeout):
+            # Failures up to the first chunk are retried, later ones would repeat streamed text
+            stream = iter(self.client.models.generate_content_stream(
+                model=self.model,
+                contents=contents,
+                config=self._generation_config(timeout=timeout),
+            ))
+            first = next(stream, None)
+            return itertools.chain([first] if first is not None else [], stream)
+        
+        try:
+            for chunk in call_with_retries(open_stream):
+                # The counts arrive with the last chunks
+                usage = self._usage(chunk) or usage
+                if not chunk.text:
+                    continue
+                if first_chunk_at is None:
+                    first_chunk_at = time.perf_counter()
+                yield "chunk", {"text": chunk.text}
+        except Exception as e:
+            failure = self._call_failure(e)
+            observe_gemini_call("stream", time.perf_counter() - started, failure, usage)
+            yield "error", failure
+            return
+        
+        finished = time.perf_counter()
+        result = {
+            "success": True,
+            "model": self.model,
+            "timings": {
+                "first_chunk_ms": round(((first_chunk_at or finished) - started) * 1000, 1),
+                "total_ms": round((finished - started) * 1000, 1),
+            },
+            "usage": usage
+        }
+        observe_gemini_call("stream", finished - started, result, usage)
+        yield "done", result
+    
+    def get_developer_data(self, required_skills=None, project_categories=None):
+        """
+        Fetch developer data from database based on skills and project categories
+        
+        Args:
+            required_skills (list): List of skill names
+            project_categories (list): List of project category names
+            
+        Returns:
+            dict: Developer data with their skills and projects, and their "profile_cards" by developer id
+        """
+        try:
+            developers_query = self._available_developers_query(required_skills)
+            developers_data, profile_cards = self._load_developer_snapshot(developers_query)
+            
+            return {
+                "success": True,
+                "developers": developers_data,
+                "total_count": len(developers_data),
+                "profile_cards": profile_cards
+            }
+            
+        except Exception as e:
+            logger.error(f"Error fetching developer data: {str(e)}")
             return {
                 "success": False,
                 "error": str(e),
-                "model": self.model
+                "developers": []
             }
     
-    def get_developer_data(self, required_skills=None, project_categories=None):
+    async def aget_developer_data(self, required_skills=None, project_categories=None):
         """
-        Fetch developer data from database based on skills and project categories
+        Async variant of get_developer_data using Django's async ORM
         
         Args:
             required_skills (list): List of skill names
@@ -224,62 +418,15 @@ class GeminiService:
             dict: Developer data with their skills and projects
         """
         try:
-            # Start with all available developers
-            developers_query = Developers.objects.filter(is_available=True)
-            
-            # If specific skills are required, filter developers who have those skills
-            if required_skills:
-                skill_ids = Skills.objects.filter(name__in=required_skills).values_list('id', flat=True)
-                developers_with_skills = DeveloperSkills.objects.filter(
-                    skill_id__in=skill_ids
-                ).values_list('developer_id', flat=True)
-                developers_query = developers_query.filter(id__in=developers_with_skills)
-            
-            # Get developer data with their skills and projects
-            developers_data = []
-            for developer in developers_query:
-                # Get developer skills
-                developer_skills = DeveloperSkills.objects.filter(developer=developer).select_related('skill', 'skill__skill_area')
-                skills_data = []
-                for dev_skill in developer_skills:
-                    skills_data.append({
-                        'name': dev_skill.skill.name,
-                        'skill_area': dev_skill.skill.skill_area.name
-                    })
-                
-                # Get developer projects
-                developer_projects = DeveloperProjects.objects.filter(developer=developer).prefetch_related('project_categories', 'skills')
-                projects_data = []
-                for project in developer_projects:
-                    project_cats = [cat.name for cat in project.project_categories.all()]
-                    project_skills = [skill.name for skill in project.skills.all()]
-                    projects_data.append({
-                        'name': project.name,
-                        'description': project.description,
-                        'tech_stack': project.tech_stack,
-                        'project_origin': project.project_origin,
-                        'project_categories': project_cats,
-                        'skills_used': project_skills,
-                        'repo_link': project.repo_link,
-                        'live_link': project.live_link
-                    })
-                
-                developers_data.append({
-                    'id': developer.id,
-                    'name': developer.name,
-                    'email': developer.email,
-                    'role': developer.role,
-                    'industry_experience': developer.industry_experience,
-                    'graduation_date': developer.graduation_date.isoformat(),
-                    'employment_start_date': developer.employment_start_date.isoformat(),
-                    'skills': skills_data,
-                    'projects': projects_data
-                })
+            # The skill index may have to (re)load itself from the database
+            developers_query = await sync_to_async(self._available_developers_query)(required_skills)
+            developers_data, profile_cards = await self._aload_developer_snapshot(developers_query)
             
             return {
                 "success": True,
                 "developers": developers_data,
-                "total_count": len(developers_data)
+                "total_count": len(developers_data),
+                "profile_cards": profile_cards
             }
             
         except Exception as e:
@@ -290,9 +437,148 @@ class GeminiService:
                 "developers": []
             }
     
-    def analyze_project_and_suggest_developers(self, project_name, project_description=None, project_file=None, required_skills=None, project_categories=None) -> dict:
+    def _available_developers_query(self, required_skills=None):
         """
-        Analyze project requirements and suggest suitable developers
+        Build the query of available developers having any of the required skills
+        """
+        # Start with all available developers
+        developers_query = Developers.objects.filter(is_available=True)
+        
+        # If specific skills are required, filter developers who have any of those skills
+        if required_skills:
+            developers_with_skills = [developer_id for developer_id, _ in skill_index.any_of(required_skills)]
+            developers_query = developers_query.filter(id__in=developers_with_skills)
+        
+        return developers_query
+    
+    def _load_developer_snapshot(self, developers_query):
+        """
+        Load developers with their skills and projects, taking those whose profile
+        has not changed from their cached profile cards
+        
+        Developers without a current card are loaded with one prefetch query each
+        for skills (with skill areas), skill levels, projects, project categories
+        and project skills, so the query count does not grow with the number of
+        developers, and their cards are rendered and cached.
+        
+        Args:
+            developers_query (QuerySet): Developers to include in the snapshot
+            
+        Returns:
+            tuple: Developer data with their skills and projects, and their profile cards by developer id
+        """
+        developer_ids = list(developers_query.values_list('id', flat=True))
+        cards, versions = ProfileCardCache.get_many(developer_ids)
+        missing_query = self._missing_cards_query(developers_query, developer_ids, cards)
+        if missing_query is not None:
+            new_cards = {
+                developer.id: ProfileCardCache.render(self._serialize_developer(developer))
+                for developer in self._snapshot_query(missing_query)
+            }
+            ProfileCardCache.set_many(new_cards, versions)
+            cards.update(new_cards)
+        return self._snapshot_from_cards(developer_ids, cards)
+    
+    async def _aload_developer_snapshot(self, developers_query):
+        """
+        Async variant of _load_developer_snapshot, running the same queries
+        """
+        developer_ids = [developer_id async for developer_id in developers_query.values_list('id', flat=True)]
+        cards, versions = await sync_to_async(ProfileCardCache.get_many)(developer_ids)
+        missing_query = self._missing_cards_query(developers_query, developer_ids, cards)
+        if missing_query is not None:
+            new_cards = {
+                developer.id: ProfileCardCache.render(self._serialize_developer(developer))
+                async for developer in self._snapshot_query(missing_query)
+            }
+            await sync_to_async(ProfileCardCache.set_many)(new_cards, versions)
+            cards.update(new_cards)
+        return self._snapshot_from_cards(developer_ids, cards)
+    
+    @staticmethod
+    def _missing_cards_query(developers_query, developer_ids, cards):
+        """
+        Build the query of the developers without a current profile card, or None when all have one
+        """
+        missing_ids = [developer_id for developer_id in developer_ids if developer_id not in cards]
+        if not missing_ids:
+            return None
+        if len(missing_ids) == len(developer_ids):
+            # Cold cache, avoid a long id list
+            return developers_query
+        return Developers.objects.filter(id__in=missing_ids)
+    
+    @staticmethod
+    def _snapshot_from_cards(developer_ids, cards):
+        # Developers deleted since their ids were read have no card
+        developer_ids = [developer_id for developer_id in developer_ids if developer_id in cards]
+        return [cards[developer_id]["developer"] for developer_id in developer_ids], {
+            developer_id: cards[developer_id] for developer_id in developer_ids
+        }
+    
+    @staticmethod
+    def _snapshot_query(developers_query):
+        return developers_query.prefetch_related(
+            Prefetch(
+                'developerskills_set',
+                queryset=DeveloperSkills.objects.select_related('skill__skill_area').order_by('id'),
+            ),
+            Prefetch(
+                'developer_projects',
+                queryset=DeveloperProjects.objects.prefetch_related('project_categories', 'skills').order_by('id'),
+            ),
+            'skill_levels',
+        )
+    
+    @staticmethod
+    def _serialize_developer(developer):
+        """
+        Convert a developer loaded by _snapshot_query to snapshot data
+        """
+        skill_levels = {skill_level.skill_id: skill_level for skill_level in developer.skill_levels.all()}
+        skills_data = []
+        for dev_skill in developer.developerskills_set.all():
+            skill_level = skill_levels.get(dev_skill.skill_id)
+            skills_data.append({
+                'id': dev_skill.skill_id,
+                'name': dev_skill.skill.name,
+                'skill_area': dev_skill.skill.skill_area.name,
+                'level': skill_level.level if skill_level else 0,
+                'project_count': skill_level.project_count if skill_level else 0
+            })
+        
+        projects_data = []
+        for project in developer.developer_projects.all():
+            projects_data.append({
+                'id': project.id,
+                'name': project.name,
+                'description': project.description,
+                'tech_stack': project.tech_stack,
+                'project_origin': project.project_origin,
+                'project_categories': [cat.name for cat in project.project_categories.all()],
+                'skills_used': [skill.name for skill in project.skills.all()],
+                'repo_link': project.repo_link,
+                'live_link': project.live_link
+            })
+        
+        return {
+            'id': developer.id,
+            'name': developer.name,
+            'email': developer.email,
+            'role': developer.role,
+            'industry_experience': developer.industry_experience,
+            'graduation_date': developer.graduation_date.isoformat(),
+            'employment_start_date': developer.employment_start_date.isoformat(),
+            'skills': skills_data,
+            'projects': projects_data
+        }
+    
+    def prepare_project_analysis(self, project_name, project_description=None, project_file=None, required_skills=None, project_categories=None, shortlist_size=None, use_cache=True, output_format=OUTPUT_MARKDOWN, reuse_run=False, engine=ENGINE_GEMINI, trace=None) -> dict:
+        """
+        Prepare a project analysis up to the point where Gemini has to be called
+        
+        Resolves the project description, looks the analysis up in the cache, loads
+        the developer snapshot, ranks it locally and builds the analysis prompt.
         
         Args:
             project_name (str): Name of the project
@@ -300,168 +586,708 @@ class GeminiService:
             project_file (UploadedFile): Optional file containing project description
             required_skills (list): Optional list of required skills
             project_categories (list): Optional list of project categories
+            shortlist_size (int): Optional number of candidates sent to Gemini, defaults to AGENT_SHORTLIST_SIZE
+            use_cache (bool): Serve the result from the analysis cache when possible
+            output_format (str): "markdown" for a Markdown analysis, or "json" for a
+                structured analysis validated against ANALYSIS_RESPONSE_SCHEMA
+            reuse_run (bool): Reuse the analysis of an earlier AnalysisRun of the very
+                same prompt instead of calling Gemini
+            engine (str): "gemini" for Gemini's analysis, or "local" for the
+                LocalRecommender's recommendations, which need no Gemini call
+            trace (AnalysisTrace): Trace timing the stages of the analysis, a new one by default
             
         Returns:
-            dict: Analysis and developer suggestions
+            dict: With "success" False and an "error" when the analysis cannot be run,
+            with a complete "result" when no Gemini call is needed (cache hit or no
+            developers), or with the "prompt" to send and the context needed by
+            finish_project_analysis (including the "trace")
         """
-        try:
-            # Handle project description - either from text or file
-            final_project_description = project_description
-            
-            if project_file:
-                # Extract text from uploaded file
-                file_result = self.extract_text_from_file(project_file)
-                if not file_result["success"]:
-                    return {
-                        "success": False,
-                        "error": file_result["error"],
-                        "model": self.model
-                    }
-                final_project_description = file_result["text"]
-            
-            # Validate that we have a project description
-            if not final_project_description:
+        trace = trace or AnalysisTrace()
+        with trace.span("extract"):
+            description_result = self._resolve_project_description(project_description, project_file)
+        if not description_result["success"]:
+            return description_result
+        final_project_description = description_result["text"]
+        
+        shortlist_size = shortlist_size or settings.AGENT_SHORTLIST_SIZE
+        with trace.span("cache_lookup"):
+            cache_key, cached_result = self._lookup_cached_analysis(
+                project_name, final_project_description, required_skills, project_categories, shortlist_size,
+                use_cache and engine != ENGINE_LOCAL, output_format
+            )
+        if cached_result is not None:
+            return self._with_document(
+                {"success": True, "result": cached_result}, description_result["document"]
+            )
+        
+        # Get developer data from database
+        with trace.span("snapshot"):
+            developer_data_result = self.get_developer_data(required_skills, project_categories)
+        
+        return self._prepare_from_developer_data(
+            project_name, final_project_description, required_skills, project_categories, shortlist_size,
+            cache_key, developer_data_result, output_format, reuse_run, description_result["document"], engine, trace
+        )
+    
+    async def aprepare_project_analysis(self, project_name, project_description=None, project_file=None, required_skills=None, project_categories=None, shortlist_size=None, use_cache=True, output_format=OUTPUT_MARKDOWN, reuse_run=False, engine=ENGINE_GEMINI, trace=None) -> dict:
+        """
+        Async variant of prepare_project_analysis
+        
+        The developer snapshot is loaded with the async ORM. File extraction, the
+        cache lookup and the local ranking are short synchronous steps and run in a
+        worker thread.
+        
+        Returns:
+            dict: Same as prepare_project_analysis
+        """
+        trace = trace or AnalysisTrace()
+        # Text extraction is CPU bound and touches no database, so it need not share the ORM thread
+        with trace.span("extract"):
+            description_result = await sync_to_async(self._resolve_project_description, thread_sensitive=False)(
+                project_description, project_file
+            )
+        if not description_result["success"]:
+            return description_result
+        final_project_description = description_result["text"]
+        
+        shortlist_size = shortlist_size or settings.AGENT_SHORTLIST_SIZE
+        with trace.span("cache_lookup"):
+            cache_key, cached_result = await sync_to_async(self._lookup_cached_analysis)(
+                project_name, final_project_description, required_skills, project_categories, shortlist_size,
+                use_cache and engine != ENGINE_LOCAL, output_format
+            )
+        if cached_result is not None:
+            return self._with_document(
+                {"success": True, "result": cached_result}, description_result["document"]
+            )
+        
+        with trace.span("snapshot"):
+            developer_data_result = await self.aget_developer_data(required_skills, project_categories)
+        
+        return await sync_to_async(self._prepare_from_developer_data)(
+            project_name, final_project_description, required_skills, project_categories, shortlist_size,
+            cache_key, developer_data_result, output_format, reuse_run, description_result["document"], engine, trace
+        )
+    
+    def _resolve_project_description(self, project_description=None, project_file=None) -> dict:
+        """
+        Get the project description, either from text or from the uploaded file
+        
+        Returns:
+            dict: Success status, the description as "text" and information about the
+            uploaded "document" (None without a file), or error information
+        """
+        final_project_description = project_description
+        document = None
+        
+        if project_file:
+            # Extract text from uploaded file
+            file_result = self.extract_text_from_file(project_file)
+            if not file_result["success"]:
                 return {
                     "success": False,
-                    "error": "Project description is required. Provide either 'project_description' text or 'project_file'",
+                    "error": file_result["error"],
                     "model": self.model
                 }
+            final_project_description = file_result["text"]
+            document = {
+                "name": project_file.name,
+                "content_hash": file_result.get("content_hash"),
+                "text_cached": file_result["cache_hit"],
+                "truncated": file_result.get("truncated", False),
+            }
+        
+        # Validate that we have a project description
+        if not final_project_description:
+            return {
+                "success": False,
+                "error": "Project description is required. Provide either 'project_description' text or 'project_file'",
+                "model": self.model
+            }
+        
+        return {"success": True, "text": final_project_description, "document": document}
+    
+    @staticmethod
+    def _with_document(prepared, document):
+        """
+        Report the uploaded document, if any, in the result or context of a prepared analysis
+        """
+        if prepared["success"]:
+            target = prepared["result"] if prepared["result"] is not None else prepared["context"]
+            target.pop("document", None)
+            if document is not None:
+                target["document"] = document
+        return prepared
+    
+    def _lookup_cached_analysis(self, project_name, project_description, required_skills, project_categories, shortlist_size, use_cache=True, output_format=OUTPUT_MARKDOWN):
+        """
+        Look a previous analysis of the same brief against the same roster up in the cache
+        
+        Returns:
+            tuple: The cache key and the cached result, or None when there is none
+            or use_cache is False
+        """
+        analysis_cache = get_analysis_cache()
+        cache_key = analysis_cache.make_key(
+            project_description, required_skills, project_categories, self.model, get_roster_version(), shortlist_size,
+            output_format
+        )
+        if not use_cache:
+            return cache_key, None
+        
+        cached_result = analysis_cache.get(cache_key)
+        if cached_result is not None:
+            cached_result["project_name"] = project_name
+            cached_result["cached"] = True
+        return cache_key, cached_result
+    
+    def _prepare_from_developer_data(self, project_name, final_project_description, required_skills, project_categories, shortlist_size, cache_key, developer_data_result, output_format=OUTPUT_MARKDOWN, reuse_run=False, document=None, engine=ENGINE_GEMINI, trace=None) -> dict:
+        """
+        Rank the developer snapshot locally and build the analysis prompt for the
+        shortlist, or reuse an earlier run of the same prompt
+        
+        Returns:
+            dict: As described in prepare_project_analysis
+        """
+        if not developer_data_result["success"]:
+            return developer_data_result
+        
+        developers = developer_data_result["developers"]
+        
+        if not developers:
+            result = {
+                "success": True,
+                "project_name": project_name,
+                "project_description": final_project_description,
+                "analysis": "No developers found matching the specified criteria.",
+                "suggested_developers": [],
+                "model": self.model
+            }
+            if output_format == OUTPUT_JSON:
+                result["output_format"] = output_format
+                result["structured_analysis"] = {
+                    "summary": [], "required_expertise": [], "recommendations": [], "unresolved_developer_ids": []
+                }
+            return self._with_document({"success": True, "result": result}, document)
+        
+        trace = trace or AnalysisTrace()
+        # Rank developers locally and keep only the shortlist for Gemini
+        with trace.span("rank"):
+            semantic_scores = self._semantic_scores(
+                project_name, final_project_description, required_skills, project_categories, developers
+            )
+            ranking = DeveloperRankingService(required_skills, project_categories, semantic_scores)
+            shortlist, local_scores = ranking.rank(developers, limit=shortlist_size)
+        
+        # Pack the shortlist into the prompt's token budget
+        with trace.span("prompt"):
+            analysis_prompt, prompt_report = AnalysisPromptCompiler(
+                required_skills, project_categories, output_format=output_format
+            ).compile(
+                project_name, final_project_description, required_skills, project_categories, shortlist,
+                developer_data_result.get("profile_cards")
+            )
+            full_prompt = self._build_prompt(analysis_prompt)
+        
+        prepared = self._with_document({
+            "success": True,
+            "prompt": analysis_prompt,
+            "response_schema": ANALYSIS_RESPONSE_SCHEMA if output_format == OUTPUT_JSON else None,
+            "cache_key": cache_key,
+            "prompt_hash": AnalysisRunService.hash_prompt(full_prompt),
+            "roster_version": get_roster_version(),
+            "shortlist_size": shortlist_size,
+            "local_recommender": (LocalRecommender(ranking, required_skills, project_categories), shortlist),
+            "trace": trace,
+            "result": None,
+            "context": {
+                "project_name": project_name,
+                "analysis_key": cache_key,
+                "output_format": output_format,
+                "project_description": final_project_description,
+                "required_skills": required_skills,
+                "project_categories": project_categories,
+                "total_developers_analyzed": len(developers),
+                "shortlisted_developers": len(shortlist),
+                "pruned_developers": len(developers) - len(shortlist),
+                "local_scores": local_scores,
+                "prompt_stats": {"prompt_tokens": estimate_tokens(full_prompt), **prompt_report},
+            }
+        }, document)
+        
+        if engine == ENGINE_LOCAL:
+            with trace.span("local"):
+                prepared["result"] = self._local_result(prepared)
+        elif reuse_run:
+            prior_run = AnalysisRunService.find_reusable(prepared["prompt_hash"], self.model)
+            if prior_run is not None:
+                prepared["result"] = self._reuse_run(prepared, prior_run)
+        return prepared
+    
+    def _reuse_run(self, prepared, prior_run):
+        """
+        Build the result of a prepared analysis from an earlier run of the same
+        prompt, recording the reuse as a run of its own
+        
+        Returns:
+            dict: Analysis and developer suggestions, with the "reused_run_id"
+        """
+        output = {"analysis": prior_run.analysis} if prior_run.analysis is not None else {
+            "structured_analysis": prior_run.result.get("structured_analysis")
+        }
+        result = {
+            "success": True,
+            **prepared["context"],
+            **output,
+            "model": self.model,
+            "engine": ENGINE_GEMINI,
+            "cached": True,
+            "reused_run_id": str(prior_run.id)
+        }
+        if prepared["context"]["output_format"] == OUTPUT_JSON:
+            StructuredAnalysisService.store(
+                prepared["cache_key"], prepared["context"]["project_name"], self.model, result["structured_analysis"]
+            )
+        # Point at the run that generated the analysis, not at an earlier reuse of it
+        run = AnalysisRunService.record(
+            prepared, result, user=self.user, reused_from_id=prior_run.reused_from_id or prior_run.id
+        )
+        result["run_id"] = str(run.id)
+        get_analysis_cache().set(prepared["cache_key"], result)
+        return result
+    
+    @staticmethod
+    def _semantic_scores(project_name, project_description, required_skills, project_categories, developers):
+        """
+        Score the developers' projects against the project brief with the semantic project index
+        
+        Returns:
+            dict: As returned by SemanticProjectIndex.score, or None when the index
+            is not available and ranking has to do without it
+        """
+        if not semantic_index.available:
+            return None
+        
+        brief = "\n".join([project_name, project_description, *(required_skills or []), *(project_categories or [])])
+        return semantic_index.score(brief, [developer['id'] for developer in developers])
+    
+    def _analysis_failure(self, prepared, gemini_response):
+        """
+        Build the result of an analysis Gemini failed to generate: the local
+        recommendations when AGENT_LOCAL_FALLBACK is enabled, otherwise the error
+        of generate_content with the local ranking ("local_scores") of the shortlist
+        """
+        if settings.AGENT_LOCAL_FALLBACK:
+            return self._local_result(prepared, fallback_reason=gemini_response["error"])
+        return {**prepared["context"], **gemini_response}
+    
+    @staticmethod
+    def _local_result(prepared, fallback_reason=None):
+        """
+        Build the result of a prepared analysis from the LocalRecommender's
+        recommendations, as a Markdown "analysis" or a "structured_analysis"
+        
+        Args:
+            fallback_reason (str): Error of the failed Gemini call the local result replaces
+        
+        Returns:
+            dict: Analysis and developer suggestions, with "engine" local and whether it is a "fallback"
+        """
+        recommender, shortlist = prepared["local_recommender"]
+        structured_analysis = recommender.recommend(shortlist, prepared["context"]["local_scores"])
+        if prepared["context"]["output_format"] == OUTPUT_JSON:
+            output = {"structured_analysis": structured_analysis}
+        else:
+            output = {"analysis": recommender.render_markdown(structured_analysis)}
+        result = {
+            "success": True,
+            **prepared["context"],
+            **output,
+            "model": LocalRecommender.MODEL,
+            "engine": ENGINE_LOCAL,
+            "cached": False,
+            "fallback": fallback_reason is not None
+        }
+        if fallback_reason is not None:
+            logger.warning(f"Serving local recommendations for {result['project_name']}: {fallback_reason}")
+            result["fallback_reason"] = fallback_reason
+        return result
+    
+    def finish_project_analysis(self, prepared, analysis_text, gemini_response=None) -> dict:
+        """
+        Build the analysis result from Gemini's response, record it as an
+        AnalysisRun and store it in the cache
+        
+        A structured analysis is validated and its recommendations are stored as
+        DeveloperRecommendation rows; an invalid one fails the analysis.
+        
+        Args:
+            prepared (dict): Result of prepare_project_analysis
+            analysis_text (str): Gemini's analysis
+            gemini_response (dict): The call's "latency_ms" and token "usage", as
+                returned by generate_content
             
-            # Get developer data from database
-            developer_data_result = self.get_developer_data(required_skills, project_categories)
+        Returns:
+            dict: Analysis and developer suggestions
+        """
+        context = prepared["context"]
+        if context["output_format"] == OUTPUT_JSON:
+            parsed = StructuredAnalysisService.parse(
+                analysis_text, [score["developer_id"] for score in context["local_scores"]]
+            )
+            if not parsed["success"]:
+                logger.warning(f"Invalid structured analysis for {context['project_name']}: {parsed['error']}")
+                return {**parsed, "model": self.model}
+            StructuredAnalysisService.store(
+                prepared["cache_key"], context["project_name"], self.model, parsed["structured_analysis"]
+            )
+            analysis = {"structured_analysis": parsed["structured_analysis"]}
+        else:
+            analysis = {"analysis": analysis_text}
+        
+        result = {
+            "success": True,
+            **context,
+            **analysis,
+            "model": self.model,
+            "engine": ENGINE_GEMINI,
+            "cached": False
+        }
+        run = AnalysisRunService.record(prepared, result, gemini_response, user=self.user)
+        result["run_id"] = str(run.id)
+        get_analysis_cache().set(prepared["cache_key"], result)
+        return result
+    
+    def analyze_project_and_suggest_developers(self, project_name, project_description=None, project_file=None, required_skills=None, project_categories=None, shortlist_size=None, use_cache=True, output_format=OUTPUT_MARKDOWN, reuse_run=False, engine=ENGINE_GEMINI) -> dict:
+        """
+        Analyze project requirements and suggest suitable developers
+        
+        Developers are first ranked locally and only the top `shortlist_size`
+        candidates are sent to Gemini.
+        
+        Args:
+            project_name (str): Name of the project
+            project_description (str): Optional description of the project (if not provided via file)
+            project_file (UploadedFile): Optional file containing project description
+            required_skills (list): Optional list of required skills
+            project_categories (list): Optional list of project categories
+            shortlist_size (int): Optional number of candidates sent to Gemini, defaults to AGENT_SHORTLIST_SIZE
+            use_cache (bool): Serve the result from the analysis cache when possible. When
+                False the analysis is always generated and then stored in the cache
+            output_format (str): "markdown" for the Markdown "analysis", or "json" for
+                a "structured_analysis" with the recommended developers resolved
+            reuse_run (bool): Reuse the analysis of an earlier AnalysisRun of the very
+                same prompt, e.g. after roster changes that did not touch the shortlist
+            engine (str): "gemini" (default) or "local" for the recommendations of the
+                LocalRecommender, in milliseconds and without Gemini. When Gemini
+                fails, the local recommendations are returned instead (with
+                "fallback" true) unless AGENT_LOCAL_FALLBACK is disabled
+            
+        Returns:
+            dict: Analysis and developer suggestions
+        """
+        trace = AnalysisTrace()
+        try:
+            prepared = self.prepare_project_analysis(
+                project_name, project_description, project_file, required_skills, project_categories, shortlist_size, use_cache,
+                output_format, reuse_run, engine, trace
+            )
+            if not prepared["success"]:
+                return trace.finish(prepared, user=self.user)
+            if prepared["result"] is not None:
+                return trace.finish(prepared["result"], user=self.user)
             
-            if not developer_data_result["success"]:
-                return developer_data_result
+            # Get Gemini's analysis
+            with trace.span("gemini"):
+                gemini_response = self.generate_content(prepared["prompt"], prepared["response_schema"])
             
-            developers = developer_data_result["developers"]
+            if not gemini_response["success"]:
+                return trace.finish(self._analysis_failure(prepared, gemini_response), gemini_response, self.user)
             
-            if not developers:
-                return {
-                    "success": True,
-                    "project_name": project_name,
-                    "project_description": final_project_description,
-                    "analysis": "No developers found matching the specified criteria.",
-                    "suggested_developers": [],
-                    "model": self.model
-                }
+            with trace.span("finish"):
+                result = self.finish_project_analysis(prepared, gemini_response["response"], gemini_response)
+            return trace.finish(result, gemini_response, self.user)
             
-            # Create prompt for Gemini analysis
-            analysis_prompt = f"""
-                You are an expert **Project Manager** and **Technical Salesperson**. 
-                Analyze the given project requirements and available developers. 
-                Your task is to recommend the most suitable developers ONLY using the information provided (no assumptions).
-
-                ---
-
-                ## PROJECT DETAILS
-                - **Name:** {project_name}
-                - **Description:** {final_project_description}
-                - **Required Skills:** {required_skills or 'Not specified'}
-                - **Project Categories:** {project_categories or 'Not specified'}
-
-                ---
-
-                ## AVAILABLE DEVELOPERS
-                {self._format_developers_for_analysis(developers)}
-
-                ---
-
-                ## OUTPUT REQUIREMENTS
-                You MUST respond in **clear Markdown** following the exact structure below.  
-                Keep it **brief and to the point** (no more than 4–5 bullet points per section).  
-                Do **not** invent or infer skills or experience not explicitly listed.  
-                Do **not** repeat project details unnecessarily.  
-                Use only developer data provided.
-
-                ---
-
-                ### RESPONSE STRUCTURE
-
-                #### 1. Brief Analysis of Project
-                - (2–3 bullet points summarizing key needs)
-
-                #### 2. Required Skills & Technical Expertise
-                - (List key skills & expertise required for the project, bullet format)
-
-                #### 3. Top 3 Developer Recommendations
-                For each developer, create a separate subsection. If less developers are available, then only display the approriate once:
-
-                ##### Developer Rank. **Name**
-                - **Score:** x/10  
-                - **Why Suggested:** (1–3 concise bullet points)  
-                - **Relevant Projects:** 
-                    - **Project name**: description.
-                    - **Link:** Links of project  
-                - **Potential Concerns / Gaps:** (1–2 concise bullet points)
-
-                ---
-
-                ### ADDITIONAL INSTRUCTIONS
-                - Use **Markdown headings**, lists and bold text exactly as shown.
-                - Keep tone **neutral and professional**, avoid filler words.
-                - Do NOT add APIs, libraries, or technologies not listed in developer data.
-                - Always provide exactly 3 developer recommendations (ranked).
-                """
-
+        except GateBusyError:
+            # Left to the caller waiting for the slot, e.g. run_job queues the job again
+            raise
+        except Exception as e:
+            logger.error(f"Error analyzing project and suggesting developers: {str(e)}")
+            return trace.finish({
+                "success": False,
+                "error": str(e),
+                "model": self.model
+            }, user=self.user)
+    
+    async def aanalyze_project_and_suggest_developers(self, project_name, project_description=None, project_file=None, required_skills=None, project_categories=None, shortlist_size=None, use_cache=True, output_format=OUTPUT_MARKDOWN, reuse_run=False, engine=ENGINE_GEMINI) -> dict:
+        """
+        Async variant of analyze_project_and_suggest_developers
+        
+        Returns:
+            dict: Analysis and developer suggestions
+        """
+        trace = AnalysisTrace()
+        try:
+            prepared = await self.aprepare_project_analysis(
+                project_name, project_description, project_file, required_skills, project_categories, shortlist_size, use_cache,
+                output_format, reuse_run, engine, trace
+            )
+            if not prepared["success"]:
+                return trace.finish(prepared, user=self.user)
+            if prepared["result"] is not None:
+                return trace.finish(prepared["result"], user=self.user)
             
-            # Get Gemini's analysis
-            gemini_response = self.generate_content(analysis_prompt)
+            with trace.span("gemini"):
+                gemini_response = await self.agenerate_content(prepared["prompt"], prepared["response_schema"])
             
             if not gemini_response["success"]:
-                return gemini_response
+                return trace.finish(self._analysis_failure(prepared, gemini_response), gemini_response, self.user)
             
-            # Parse and structure the response
-            return {
-                "success": True,
-                "project_name": project_name,
-                "project_description": final_project_description,
-                "required_skills": required_skills,
-                "project_categories": project_categories,
-                "total_developers_analyzed": len(developers),
-                "analysis": gemini_response["response"],
-                "model": self.model
-            }
+            with trace.span("finish"):
+                result = await sync_to_async(self.finish_project_analysis)(
+                    prepared, gemini_response["response"], gemini_response
+                )
+            return trace.finish(result, gemini_response, self.user)
             
         except Exception as e:
             logger.error(f"Error analyzing project and suggesting developers: {str(e)}")
-            return {
+            return trace.finish({
                 "success": False,
                 "error": str(e),
                 "model": self.model
-            }
+            }, user=self.user)
     
-    def _format_developers_for_analysis(self, developers):
+    def analyze_projects_batch(self, projects, concurrency=None, item_timeout=None) -> dict:
         """
-        Format developer data for Gemini analysis
+        Analyze many projects, sharing one developer snapshot across the batch and
+        calling Gemini for them concurrently
+        
+        Descriptions, cache lookups and local rankings are resolved one project
+        after the other; only the Gemini calls are fanned out, at most
+        `concurrency` at a time. A call taking longer than `item_timeout` is
+        cancelled and reported as a failed item, the rest of the batch is unaffected.
         
         Args:
-            developers (list): List of developer data
+            projects (list): Keyword arguments of analyze_project_and_suggest_developers, one dict per project
+            concurrency (int): Maximum number of Gemini calls in flight, defaults to AGENT_BATCH_CONCURRENCY
+            item_timeout (float): Seconds a Gemini call may take, defaults to AGENT_BATCH_ITEM_TIMEOUT
             
         Returns:
-            str: Formatted string for analysis
-        """
-        formatted_data = ""
-        for i, dev in enumerate(developers, 1):
-            formatted_data += f"""
-            DEVELOPER {i}:
-            Name: {dev['name']}
-            Role: {dev['role']}
-            Industry Experience: {dev['industry_experience']} years
-            Skills: {', '.join([skill['name'] for skill in dev['skills']])}
-            Projects ({len(dev['projects'])} total):
-            """
-            
-            for project in dev['projects'][:3]:  # Limit to first 3 projects for brevity
-                formatted_data += f"""
-                - {project['name']}: {project['description'][:100]}...
-                  Tech Stack: {', '.join(project['tech_stack']) if project['tech_stack'] else 'Not specified'}
-                  Categories: {', '.join(project['project_categories']) if project['project_categories'] else 'Not specified'}
-                  Repo Link: {', '.join(project['repo_link']) if project['repo_link'] else 'Not Specified'} 
-                """
+            dict: One result per project in request order ("results", each shaped like
+            the result of analyze_project_and_suggest_developers plus the "latency_ms"
+            of its Gemini call) and aggregate "stats"
+        """
+        started = time.perf_counter()
+        concurrency = concurrency or settings.AGENT_BATCH_CONCURRENCY
+        item_timeout = item_timeout or settings.AGENT_BATCH_ITEM_TIMEOUT
+        results = [None] * len(projects)
+        
+        # Resolve descriptions and serve what the analysis cache already has
+        pending = []
+        for index, project in enumerate(projects):
+            try:
+                description_result = self._resolve_project_description(
+                    project.get("project_description"), project.get("project_file")
+                )
+                if not description_result["success"]:
+                    results[index] = description_result
+                    continue
+                
+                shortlist_size = project.get("shortlist_size") or settings.AGENT_SHORTLIST_SIZE
+                cache_key, cached_result = self._lookup_cached_analysis(
+                    project["project_name"], description_result["text"], project.get("required_skills"),
+                    project.get("project_categories"), shortlist_size,
+                    project.get("use_cache", True) and project.get("engine") != ENGINE_LOCAL,
+                    project.get("output_format", OUTPUT_MARKDOWN)
+                )
+                if cached_result is not None:
+                    results[index] = self._with_document(
+                        {"success": True, "result": cached_result}, description_result["document"]
+                    )["result"]
+                    continue
+                pending.append((index, project, description_result, shortlist_size, cache_key))
+            except Exception as e:
+                logger.error(f"Error preparing batch item {index}: {str(e)}")
+                results[index] = {"success": False, "error": str(e), "model": self.model}
+        
+        # One snapshot for the whole batch, narrowed to each project's candidates below
+        snapshot_started = time.perf_counter()
+        developer_data_result = None
+        if pending:
+            batch_skills = set()
+            for _, project, _, _, _ in pending:
+                if not project.get("required_skills"):
+                    # Some project takes any developer, so every available one is needed
+                    batch_skills = None
+                    break
+                batch_skills.update(project["required_skills"])
+            developer_data_result = self.get_developer_data(sorted(batch_skills) if batch_skills else None)
+        snapshot_ms = round((time.perf_counter() - snapshot_started) * 1000, 1)
+        
+        prompts = []
+        for index, project, description_result, shortlist_size, cache_key in pending:
+            try:
+                prepared = self._prepare_from_developer_data(
+                    project["project_name"], description_result["text"], project.get("required_skills"),
+                    project.get("project_categories"), shortlist_size, cache_key,
+                    self._narrow_developer_data(developer_data_result, project.get("required_skills")),
+                    project.get("output_format", OUTPUT_MARKDOWN), project.get("reuse_run", False),
+                    description_result["document"], project.get("engine", ENGINE_GEMINI)
+                )
+            except Exception as e:
+                logger.error(f"Error preparing batch item {index}: {str(e)}")
+                prepared = {"success": False, "error": str(e), "model": self.model}
+            if not prepared["success"]:
+                results[index] = prepared
+            elif prepared["result"] is not None:
+                results[index] = prepared["trace"].finish(prepared["result"], user=self.user)
+            else:
+                prompts.append((index, prepared))
+        
+        gemini_started = time.perf_counter()
+        responses = run_in_gemini_loop(self._agenerate_batch(
+            [(prepared["prompt"], prepared["response_schema"]) for _, prepared in prompts], concurrency, item_timeout
+        )) if prompts else []
+        gemini_ms = round((time.perf_counter() - gemini_started) * 1000, 1)
+        
+        for (index, prepared), response in zip(prompts, responses):
+            if response["success"]:
+                results[index] = self.finish_project_analysis(prepared, response["response"], response)
+            elif settings.AGENT_LOCAL_FALLBACK:
+                results[index] = {
+                    **self._local_result(prepared, fallback_reason=response["error"]),
+                    "timed_out": response.get("timed_out", False)
+                }
+            else:
+                results[index] = {
+                    "success": False,
+                    "project_name": prepared["context"]["project_name"],
+                    "error": response["error"],
+                    "timed_out": response.get("timed_out", False),
+                    "circuit_open": response.get("circuit_open", False),
+                    "model": self.model
+                }
+            results[index]["latency_ms"] = response["latency_ms"]
+            prepared["trace"].add("gemini", response["latency_ms"] / 1000)
+            prepared["trace"].finish(results[index], response, self.user)
+        
+        latencies = sorted(response["latency_ms"] for response in responses)
+        return {
+            "results": results,
+            "stats": {
+                "total": len(projects),
+                "succeeded": sum(1 for result in results if result["success"]),
+                "failed": sum(1 for result in results if not result["success"]),
+                "timed_out": sum(1 for result in results if result.get("timed_out")),
+                "cached": sum(1 for result in results if result.get("cached")),
+                "fallbacks": sum(1 for result in results if result.get("fallback")),
+                "gemini_calls": len(responses),
+                "concurrency": concurrency,
+                "item_timeout": item_timeout,
+                "snapshot_ms": snapshot_ms,
+                "gemini_ms": gemini_ms,
+                "total_ms": round((time.perf_counter() - started) * 1000, 1),
+                "latency_ms": {
+                    "min": latencies[0],
+                    "median": latencies[len(latencies) // 2],
+                    "p95": latencies[math.ceil(len(latencies) * 0.95) - 1],
+                    "max": latencies[-1],
+                    "mean": round(sum(latencies) / len(latencies), 1),
+                } if latencies else None,
+            }
+        }
+    
+    @staticmethod
+    def _narrow_developer_data(developer_data_result, required_skills):
+        """
+        Keep the developers of a shared snapshot having any of the required skills,
+        as get_developer_data would have loaded them
+        """
+        if not developer_data_result["success"] or not required_skills:
+            return developer_data_result
+        
+        candidate_ids = {developer_id for developer_id, _ in skill_index.any_of(required_skills)}
+        developers = [developer for developer in developer_data_result["developers"] if developer["id"] in candidate_ids]
+        return {**developer_data_result, "developers": developers, "total_count": len(developers)}
+    
+    async def _agenerate_batch(self, prompts, concurrency, item_timeout):
+        """
+        Send prompts to Gemini concurrently, at most `concurrency` at a time, each
+        call holding a slot of the ConcurrencyGate shared by all processes
+        
+        Args:
+            prompts (list): (prompt, response schema or None) tuples
             
-            if len(dev['projects']) > 3:
-                formatted_data += f"            ... and {len(dev['projects']) - 3} more projects\n"
+        Returns:
+            list: agenerate_content results in prompt order, each with the call's
+            "latency_ms", and "timed_out" when it was cancelled after `item_timeout` seconds
+        """
+        # Async connections belong to the event loop, so use the client of the Gemini loop
+        service = GeminiService()
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def gated_generate(prompt, response_schema):
+            async with ConcurrencyGate.ahold():
+                return await service.agenerate_content(prompt, response_schema)
+        
+        async def generate(prompt, response_schema):
+            async with semaphore:
+                call_started = time.perf_counter()
+                try:
+                    response = await asyncio.wait_for(gated_generate(prompt, response_schema), item_timeout)
+                except asyncio.TimeoutError:
+                    response = {
+                        "success": False,
+                        "error": f"Gemini did not respond within {item_timeout} seconds",
+                        "timed_out": True,
+                        "model": self.model
+                    }
+                response["latency_ms"] = round((time.perf_counter() - call_started) * 1000, 1)
+                return response
+        
+        return await asyncio.gather(*(generate(prompt, response_schema) for prompt, response_schema in prompts))
+    
+    def stream_project_analysis(self, prepared):
+        """
+        Stream Gemini's analysis of a prepared project analysis
+        
+        Args:
+            prepared (dict): Successful result of prepare_project_analysis
             
-            formatted_data += "\n"
+        Yields:
+            tuple: ("chunk", {"text": ...}) for every piece of the analysis, then either
+            ("done", result metadata with the stage "timings") or ("error", error information)
+        """
+        trace = prepared.get("trace") or AnalysisTrace()
+        trace.operation = "stream"
+        if prepared["result"] is not None:
+            # Cache hit or no developers, send the complete analysis as one chunk
+            result = trace.finish(dict(prepared["result"]), user=self.user)
+            yield "chunk", {"text": result.pop("analysis")}
+            yield "done", result
+            return
         
-        return formatted_data
+        chunks = []
+        for event, data in self.stream_content(prepared["prompt"]):
+            if event == "chunk":
+                chunks.append(data["text"])
+                yield event, data
+            elif event == "error":
+                if chunks or not settings.AGENT_LOCAL_FALLBACK:
+                    trace.finish({**data, "project_name": prepared["context"]["project_name"]}, data, self.user)
+                    yield event, data
+                    return
+                # Nothing was streamed yet, so the local recommendations can still take over
+                result = trace.finish(self._local_result(prepared, fallback_reason=data["error"]), data, self.user)
+                yield "chunk", {"text": result.pop("analysis")}
+                yield "done", result
+                return
+            else:
+                trace.add("gemini", data["timings"]["total_ms"] / 1000)
+                with trace.span("finish"):
+                    result = self.finish_project_analysis(prepared, "".join(chunks), {
+                        "latency_ms": data["timings"]["total_ms"], "usage": data["usage"]
+                    })
+                result.pop("analysis")
+                result["timings"] = {"first_chunk_ms": data["timings"]["first_chunk_ms"]}
+                yield "done", trace.finish(result, data, self.user)
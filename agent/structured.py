@@ -0,0 +1,125 @@
+import json
+
+from django.db import transaction
+
+from developers.models import Developers
+from .models import DeveloperRecommendation
+from .serializers import StructuredAnalysisResponseSerializer
+
+
+class StructuredAnalysisService:
+    """
+    Service class to validate Gemini's structured (JSON output format) analyses,
+    resolve the recommended developers and store the recommendations.
+    """
+
+    @classmethod
+    def _flatten_errors(cls, errors, path=""):
+        """
+        Flatten nested serializer errors into "path: message" strings, e.g. "recommendations.0.score: ..."
+        """
+        if errors and all(isinstance(error, str) for error in errors) and not isinstance(errors, dict):
+            return [f"{path}: {' '.join(errors)}"]
+        messages = []
+        for key, error in errors.items() if isinstance(errors, dict) else enumerate(errors):
+            if error:
+                messages.extend(cls._flatten_errors(error, f"{path}.{key}" if path else str(key)))
+        return messages
+
+    @classmethod
+    def parse(cls, response_text, shortlist_ids):
+        """
+        Validate a structured analysis and resolve its developers.
+
+        Recommendations of developers that were not in the shortlist (or no longer
+        exist) are dropped and their ids reported; a developer recommended twice
+        is kept once. All developers are resolved with a single query.
+
+        Args:
+            response_text (str): Gemini's JSON response
+            shortlist_ids (list): Ids of the developers sent to Gemini
+
+        Returns:
+            dict: Success status and the "structured_analysis" with its
+            "recommendations" ordered by score and ranked, or error information
+        """
+        try:
+            data = json.loads(response_text)
+        except (TypeError, json.JSONDecodeError) as e:
+            return {"success": False, "error": f"Gemini returned invalid JSON: {str(e)}"}
+
+        serializer = StructuredAnalysisResponseSerializer(data=data)
+        if not serializer.is_valid():
+            return {
+                "success": False,
+                "error": f"Gemini returned an invalid structured analysis: {'; '.join(cls._flatten_errors(serializer.errors))}"
+            }
+        analysis = serializer.validated_data
+
+        recommendations = {}
+        unresolved = []
+        shortlist_ids = set(shortlist_ids)
+        for recommendation in analysis["recommendations"]:
+            developer_id = recommendation["developer_id"]
+            if developer_id not in shortlist_ids:
+                unresolved.append(developer_id)
+            elif developer_id not in recommendations:
+                recommendations[developer_id] = recommendation
+
+        developers = {
+            developer["id"]: developer
+            for developer in Developers.objects.filter(id__in=list(recommendations)).values('id', 'name', 'email', 'role')
+        }
+        unresolved.extend(developer_id for developer_id in recommendations if developer_id not in developers)
+
+        resolved = sorted(
+            (recommendation for developer_id, recommendation in recommendations.items() if developer_id in developers),
+            key=lambda recommendation: -recommendation["score"]
+        )
+        ranked = []
+        for rank, recommendation in enumerate(resolved, 1):
+            developer = developers[recommendation["developer_id"]]
+            ranked.append({
+                "rank": rank,
+                "developer_id": developer["id"],
+                "name": developer["name"],
+                "email": developer["email"],
+                "role": developer["role"],
+                "score": recommendation["score"],
+                "reasons": recommendation["reasons"],
+                "relevant_projects": recommendation["relevant_projects"],
+                "gaps": recommendation["gaps"],
+            })
+
+        return {
+            "success": True,
+            "structured_analysis": {
+                "summary": analysis["summary"],
+                "required_expertise": analysis["required_expertise"],
+                "recommendations": ranked,
+                "unresolved_developer_ids": unresolved,
+            }
+        }
+
+    @staticmethod
+    def store(analysis_key, project_name, model, structured_analysis):
+        """
+        Store the recommendations of a structured analysis, replacing those of an
+        earlier analysis with the same key.
+        """
+        with transaction.atomic():
+            DeveloperRecommendation.objects.filter(analysis_key=analysis_key).delete()
+            DeveloperRecommendation.objects.bulk_create([
+                DeveloperRecommendation(
+                    analysis_key=analysis_key,
+                    project_name=project_name[:255],
+                    developer_id=recommendation["developer_id"],
+                    rank=recommendation["rank"],
+                    score=recommendation["score"],
+                    reasons=recommendation["reasons"],
+                    relevant_projects=recommendation["relevant_projects"],
+                    gaps=recommendation["gaps"],
+                    model=model,
+                )
+                for recommendation in structured_analysis["recommendations"]
+            ])
@@ -0,0 +1,246 @@
+"""
+Fake Gemini clients and a fake Gemini HTTP server for tests, load tests and benchmarks.
+"""
+import asyncio
+import json
+import multiprocessing
+import time
+from types import SimpleNamespace
+
+import httpx
+from google.genai import errors
+
+
+def gemini_error(code, message="Injected fault"):
+    """
+    Build the error the SDK raises for a Gemini response with an HTTP error status.
+    """
+    error_class = errors.ServerError if code >= 500 else errors.ClientError
+    return error_class(code, {"error": {"code": code, "message": message, "status": "INJECTED"}})
+
+
+class FakeGeminiModels:
+    """
+    Fake of genai.Client().models returning canned text, optionally after a delay.
+
+    Faults are injected with `faults`, consumed one per call: an exception to
+    raise (see gemini_error), or None for a call that succeeds; calls succeed once
+    the list is used up. A call whose delay exceeds the timeout of its config
+    raises httpx.ReadTimeout after the timeout, like the SDK.
+
+    Responses report no token usage unless `usage` gives the (prompt, response)
+    token counts; streams report them with their last chunk.
+    """
+
+    def __init__(self, text="analysis", chunks=None, delay=0, faults=None, usage=None):
+        self.text = text
+        self.chunks = chunks or [text]
+        self.delay = delay
+        self.faults = list(faults or [])
+        self.usage = usage
+        self.calls = []
+        # Highest number of concurrent async calls seen
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _start_call(self, model, contents, config):
+        """
+        Log a call and inject its fault
+
+        Returns:
+            float: Seconds the call takes
+        """
+        self.calls.append({"model": model, "contents": contents, "config": config})
+        fault = self.faults.pop(0) if self.faults else None
+        if fault is not None:
+            raise fault
+        timeout = config.http_options.timeout / 1000 if config and config.http_options and config.http_options.timeout else None
+        if timeout is not None and self.delay > timeout:
+            return timeout
+        return self.delay
+
+    def usage_metadata(self):
+        if self.usage is None:
+            return None
+        prompt_tokens, response_tokens = self.usage
+        return SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=response_tokens,
+            total_token_count=prompt_tokens + response_tokens,
+        )
+
+    def _check_timeout(self, waited):
+        if waited < self.delay:
+            raise httpx.ReadTimeout(f"Fake Gemini did not respond within {waited} seconds")
+
+    def generate_content(self, model, contents, config=None):
+        delay = self._start_call(model, contents, config)
+        if delay:
+            time.sleep(delay)
+        self._check_timeout(delay)
+        return SimpleNamespace(text=self.text, usage_metadata=self.usage_metadata())
+
+    def generate_content_stream(self, model, contents, config=None):
+        self._start_call(model, contents, config)
+        for index, chunk in enumerate(self.chunks, 1):
+            if self.delay:
+                time.sleep(self.delay)
+            yield SimpleNamespace(text=chunk, usage_metadata=self.usage_metadata() if index == len(self.chunks) else None)
+
+
+class FakeAsyncGeminiModels:
+    """
+    Fake of genai.Client().aio.models, sharing the canned text and call log of the sync fake.
+    """
+
+    def __init__(self, models):
+        self._models = models
+
+    async def generate_content(self, model, contents, config=None):
+        delay = self._models._start_call(model, contents, config)
+        self._models.in_flight += 1
+        self._models.max_in_flight = max(self._models.max_in_flight, self._models.in_flight)
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+        finally:
+            self._models.in_flight -= 1
+        self._models._check_timeout(delay)
+        return SimpleNamespace(text=self._models.text, usage_metadata=self._models.usage_metadata())
+
+
+class FakeGeminiClient:
+    """
+    Fake of genai.Client, to be returned by a patched get_gemini_client.
+    """
+
+    def __init__(self, text="analysis", chunks=None, delay=0, faults=None, usage=None):
+        self.models = FakeGeminiModels(text=text, chunks=chunks, delay=delay, faults=faults, usage=usage)
+        self.aio = SimpleNamespace(models=FakeAsyncGeminiModels(self.models))
+
+
+def _fake_gemini_response(text):
+    words = len(text.split())
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "finishReason": "STOP",
+        }],
+        "usageMetadata": {"promptTokenCount": 100, "candidatesTokenCount": words, "totalTokenCount": 100 + words},
+    }
+
+
+def _serve_fake_gemini(text, delay, host, port, ready):
+    """
+    Serve the fake Gemini API over keep-alive HTTP/1.1 connections on an event loop.
+    """
+    body = json.dumps(_fake_gemini_response(text)).encode()
+    stream_body = f"data: {body.decode()}\r\n\r\n".encode()
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                headers = dict(line.split(":", 1) for line in header_lines if ":" in line)
+                content_length = int({key.strip().lower(): value for key, value in headers.items()}.get("content-length", 0))
+                await reader.readexactly(content_length)
+                if delay:
+                    await asyncio.sleep(delay)
+
+                if ":streamGenerateContent" in request_line:
+                    payload, content_type = stream_body, "text/event-stream"
+                else:
+                    payload, content_type = body, "application/json"
+                writer.write(
+                    f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    async def main():
+        # Load tests open many connections at once, well beyond the default backlog
+        server = await asyncio.start_server(handle, host, port, backlog=1024)
+        ready.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+class FakeGeminiServer:
+    """
+    Local HTTP server speaking enough of the Gemini REST API for load tests and
+    benchmarks: generateContent and streamGenerateContent (SSE) return canned text
+    after a configurable delay. Use as a context manager; `base_url` is set once
+    the server is running.
+
+    The server runs in a child process, so it does not compete for the GIL with
+    the code under test.
+    """
+
+    def __init__(self, text="analysis", delay=0.0, host="127.0.0.1", port=0):
+        self.text = text
+        self.delay = delay
+        self.host = host
+        self.port = port
+        self.base_url = None
+        self._process = None
+
+    def __enter__(self):
+        # Spawn rather than fork, the child must not inherit database connections
+        context = multiprocessing.get_context("spawn")
+        ready = context.Queue()
+        self._process = context.Process(
+            target=_serve_fake_gemini, args=(self.text, self.delay, self.host, self.port, ready), daemon=True
+        )
+        self._process.start()
+        self.base_url = f"http://{self.host}:{ready.get(timeout=30)}"
+        return self
+
+    def __exit__(self, *exc_info):
+        self._process.terminate()
+        self._process.join()
+
+
+def make_pdf(pages):
+    """
+    Build a PDF with the given text on each page, for extraction tests and benchmarks.
+
+    Args:
+        pages (list): Text of each page, lines separated by newlines (ASCII without
+            parentheses or backslashes)
+
+    Returns:
+        bytes: PDF document
+    """
+    page_count = len(pages)
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and its content stream per page
+    page_ids = [4 + 2 * index for index in range(page_count)]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: f"<< /Type /Pages /Kids [{' '.join(f'{page_id} 0 R' for page_id in page_ids)}] /Count {page_count} >>".encode(),
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for page_id, text in zip(page_ids, pages):
+        lines = " T* ".join(f"({line}) Tj" for line in text.split("\n"))
+        content = f"BT /F1 12 Tf 14 TL 72 720 Td {lines} ET".encode()
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        ).encode()
+        objects[page_id + 1] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)
+
+    document = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(document)
+        document += b"%d 0 obj\n%s\nendobj\n" % (object_id, objects[object_id])
+
+    xref_offset = len(document)
+    document += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for object_id in sorted(objects):
+        document += b"%010d 00000 n \n" % offsets[object_id]
+    document += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(document)
@@ -1,3 +1,1401 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from developers.models import Developers, SkillAreas, Skills, DeveloperSkills, DeveloperProjects
+from developers.semantic_index import semantic_index
+from developers.services import SkillLevelService
+from developers.skill_index import skill_index
+from projects.models import ProjectCategory, ProjectCategorySkills
+from user_auth.authentication import generate_token
+from user_auth.models import UserAuth
+from .cache import LocalMemoryLRUBackend, get_analysis_cache
+from .checks import check_shared_caches
+from .client import get_gemini_client, reset_gemini_client, run_in_gemini_loop
+from .document_cache import ExtractedTextCache
+from .documents import collect_text, extract_pdf_text, shutdown_pdf_pool
+from .jobs import claim_next_job, dispatch_jobs, requeue_stale_jobs, run_job, run_pending_jobs
+from .limits import ConcurrencyGate, TokenBucket
+from .metrics import ANALYSES, GEMINI_CALL_SECONDS, Histogram, registry
+from .models import AnalysisJob, AnalysisRun, DeveloperRecommendation, ExtractedDocument
+from .profile_cards import ProfileCardCache
+from .prompts import AnalysisPromptCompiler
+from .runs import AnalysisRunService
+from .ranking import DeveloperRankingService
+from .resilience import CircuitBreaker, gemini_breaker
+from .services import GeminiService
+from .structured import StructuredAnalysisService
+from .testing import FakeGeminiClient, gemini_error, make_pdf
+
+
+class AgentTestDataMixin:
+    """Helpers to build developers with skills and projects for agent tests."""
+
+    def create_skill_fixtures(self):
+        # Roster version bumps only run on commit, so start every test from empty caches
+        get_analysis_cache().clear()
+        cache.clear()
+        semantic_index.mark_stale()
+        self.skill_area = SkillAreas.objects.create(name="Programming")
+        self.python = Skills.objects.create(name="Python", skill_area=self.skill_area)
+        self.django = Skills.objects.create(name="Django", skill_area=self.skill_area)
+        self.react = Skills.objects.create(name="React", skill_area=self.skill_area)
+        self.web_category = ProjectCategory.objects.create(name="Web Development")
+
+    def create_developer(self, index, skills, projects=1):
+        developer = Developers.objects.create(
+            name=f"Developer {index}",
+            email=f"developer{index}@example.com",
+            role="Developer",
+            graduation_date="2020-01-01",
+            industry_experience=2,
+            employment_start_date="2020-01-01"
+        )
+        for skill in skills:
+            DeveloperSkills.objects.create(developer=developer, skill=skill)
+        for project_index in range(projects):
+            project = DeveloperProjects.objects.create(
+                developer=developer,
+                name=f"Project {index}-{project_index}",
+                description="A web application",
+                tech_stack=["Python"],
+                project_origin="Personal"
+            )
+            project.project_categories.add(self.web_category)
+            project.skills.add(*skills)
+        return developer
+
+
+@patch('agent.services.get_gemini_client')
+class DeveloperSnapshotTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+
+    def test_snapshot_structure(self, mock_client):
+        """Test the snapshot contains skills, projects, categories and project skills."""
+        developer = self.create_developer(1, [self.python, self.django])
+
+        result = GeminiService().get_developer_data()
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["total_count"], 1)
+        data = result["developers"][0]
+        self.assertEqual(data["id"], developer.id)
+        self.assertEqual([skill["name"] for skill in data["skills"]], ["Python", "Django"])
+        self.assertEqual(data["skills"][0]["skill_area"], "Programming")
+        self.assertEqual(data["projects"][0]["project_categories"], ["Web Development"])
+        self.assertEqual(sorted(data["projects"][0]["skills_used"]), ["Django", "Python"])
+
+    def test_snapshot_query_count_is_constant(self, mock_client):
+        """Test the number of queries does not grow with the number of developers."""
+        service = GeminiService()
+        for index in range(2):
+            self.create_developer(index, [self.python, self.react], projects=2)
+        skill_index.rebuild()
+        # The developer ids, then one query per prefetch for developers without a profile card
+        with self.assertNumQueries(7):
+            small = service.get_developer_data(required_skills=["Python"])
+
+        for index in range(2, 12):
+            self.create_developer(index, [self.python, self.react], projects=2)
+        skill_index.rebuild()
+        with self.assertNumQueries(7):
+            large = service.get_developer_data(required_skills=["Python"])
+        with self.assertNumQueries(1):
+            cached = service.get_developer_data(required_skills=["Python"])
+
+        self.assertEqual(small["total_count"], 2)
+        self.assertEqual(large["total_count"], 12)
+        self.assertEqual(cached, large)
+
+
+@patch('agent.services.get_gemini_client')
+class LocalRankingTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+        ProjectCategorySkills.objects.create(project_category=self.web_category, skill=self.django)
+        self.full_stack = self.create_developer(1, [self.python, self.django], projects=3)
+        self.backend = self.create_developer(2, [self.python], projects=0)
+        self.frontend = self.create_developer(3, [self.react], projects=0)
+
+    def test_rank_orders_by_skills_categories_and_levels(self, mock_client):
+        """Test developers are ranked by required skills, category skills and category projects."""
+        developers = GeminiService().get_developer_data()["developers"]
+
+        ranked, scores = DeveloperRankingService(["python"], ["Web Development"]).rank(developers)
+
+        self.assertEqual([dev["id"] for dev in ranked], [self.full_stack.id, self.backend.id, self.frontend.id])
+        self.assertEqual(scores[0]["matched_required_skills"], ["Python"])
+        self.assertEqual(scores[0]["matched_category_skills"], ["Django"])
+        self.assertEqual(scores[0]["category_projects"], 3)
+        self.assertEqual(scores[2]["score"], 0)
+
+    def test_only_shortlist_is_sent_to_gemini(self, mock_client):
+        """Test pruned developers are left out of the prompt and reported in the response."""
+        mock_client.return_value.models.generate_content.return_value.text = "analysis"
+
+        result = GeminiService().analyze_project_and_suggest_developers(
+            "Shop", project_description="An online shop", project_categories=["Web Development"], shortlist_size=1
+        )
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["total_developers_analyzed"], 3)
+        self.assertEqual(result["shortlisted_developers"], 1)
+        self.assertEqual(result["pruned_developers"], 2)
+        self.assertEqual(result["local_scores"][0]["developer_id"], self.full_stack.id)
+        prompt = mock_client.return_value.models.generate_content.call_args.kwargs["contents"]
+        self.assertIn("Developer 1", prompt)
+        self.assertNotIn("Developer 2", prompt)
+
+    def test_description_similarity_breaks_ties(self, mock_client):
+        """Test developers with projects similar to the brief rank above equally skilled ones."""
+        shop = self.create_developer(4, [self.react], projects=0)
+        DeveloperProjects.objects.create(
+            developer=shop, name="Storefront", description="Online shop with a shopping cart and checkout",
+            tech_stack=["Stripe"], project_origin="Client"
+        )
+        skill_index.rebuild()
+        developers = GeminiService().get_developer_data(required_skills=["React"])["developers"]
+        semantic_scores = semantic_index.score("An online shop with checkout", [developer["id"] for developer in developers])
+
+        ranked, scores = DeveloperRankingService(["React"], None, semantic_scores).rank(developers)
+
+        self.assertEqual([dev["id"] for dev in ranked], [shop.id, self.frontend.id])
+        self.assertEqual(scores[0]["similar_project"], "Storefront")
+        self.assertGreater(scores[0]["description_similarity"], 0)
+        # A quarter of the 50 required skill points at level 0, scaled to 75 points, plus all 25 similarity points
+        self.assertEqual(scores[0]["score"], 34.38)
+        self.assertEqual(scores[1]["score"], 9.38)
+
+
+
+class AnalysisPromptCompilerTestCase(TestCase):
+    def make_developer(self, index, projects=2, description="A web application"):
+        return {
+            "id": index,
+            "name": f"Developer {index}",
+            "role": "Developer",
+            "industry_experience": 2,
+            "skills": [{"name": "Python", "level": 2}, {"name": "React", "level": 1}],
+            "projects": [
+                {
+                    "name": f"Project {index}-{project_index}",
+                    "description": description,
+                    "tech_stack": ["Python"],
+                    "project_categories": ["Web Development"] if project_index else ["Mobile"],
+                    "skills_used": ["Python"] if project_index else ["React"],
+                    "repo_link": None,
+                    "live_link": "https://example.com",
+                }
+                for project_index in range(projects)
+            ],
+        }
+
+    def test_developers_are_encoded_as_compact_rows(self):
+        """Test one row per developer and project, relevant projects first and long descriptions cut."""
+        developer = self.make_developer(1, description="Shop | with\n   payments " * 5)
+
+        section, report = AnalysisPromptCompiler(["python"], token_budget=1000, description_chars=20).compile_developers([developer])
+
+        lines = section.split("\n")
+        self.assertEqual(lines[2], "1|Developer 1|Developer|2|Python:2;React:1")
+        self.assertEqual(lines[3], "-|Project 1-1|Web Development|Python|Python|https://example.com|Shop / with payments…")
+        self.assertTrue(lines[4].startswith("-|Project 1-0|Mobile|"))
+        self.assertFalse(any(line.startswith(" ") for line in lines))
+        self.assertEqual(report["truncated_developers"], [{"developer_id": 1, "projects_omitted": 0, "descriptions_shortened": 2}])
+
+    def test_ranked_developers_are_packed_into_the_budget(self):
+        """Test developers lose projects, then are dropped in rank order, to stay within the budget."""
+        developers = [self.make_developer(index, projects=10) for index in range(1, 21)]
+
+        section, report = AnalysisPromptCompiler(token_budget=400).compile_developers(developers)
+
+        self.assertLessEqual(report["developer_tokens"], 400)
+        self.assertGreater(report["developers_included"], 0)
+        self.assertEqual(report["developers_dropped"], list(range(report["developers_included"] + 1, 21)))
+        self.assertIn(f"1|Developer 1|", section)
+        last = report["truncated_developers"][-1]
+        self.assertEqual(last["developer_id"], report["developers_included"])
+        self.assertIn(f"-|+{last['projects_omitted']} more projects", section)
+
+    def test_analysis_reports_prompt_tokens_and_truncation(self):
+        """Test the analysis response reports the prompt's token count and packing decisions."""
+        skill_area = SkillAreas.objects.create(name="Programming")
+        python = Skills.objects.create(name="Python", skill_area=skill_area)
+        developer = Developers.objects.create(
+            name="Developer 1", email="developer1@example.com", role="Developer",
+            graduation_date="2020-01-01", industry_experience=2, employment_start_date="2020-01-01"
+        )
+        DeveloperSkills.objects.create(developer=developer, skill=python)
+        fake_client = FakeGeminiClient(text="Developer 1")
+
+        with patch('agent.services.get_gemini_client', return_value=fake_client):
+            result = GeminiService().analyze_project_and_suggest_developers("Shop", project_description="An online shop")
+
+        stats = result["prompt_stats"]
+        prompt = fake_client.models.calls[0]["contents"]
+        self.assertAlmostEqual(stats["prompt_tokens"], len(prompt) / settings.AGENT_PROMPT_CHARS_PER_TOKEN, delta=1)
+        self.assertEqual(stats["developers_included"], 1)
+        self.assertEqual(stats["developers_dropped"], [])
+        self.assertIn("1|Developer 1|Developer|2|Python:0", prompt)
+
+
+
+@patch('agent.services.get_gemini_client')
+class ProfileCardTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first = self.create_developer(1, [self.python])
+            self.second = self.create_developer(2, [self.react])
+
+    def snapshot(self):
+        return GeminiService().get_developer_data()
+
+    def rendered_ids(self):
+        with patch.object(ProfileCardCache, 'render', side_effect=ProfileCardCache.render) as mock_render:
+            self.snapshot()
+        return sorted(call.args[0]["id"] for call in mock_render.call_args_list)
+
+    def test_unchanged_developers_are_served_from_cards(self, mock_client):
+        """Test cards are rendered once and then reused by snapshots and prompts."""
+        self.assertEqual(self.rendered_ids(), [self.first.id, self.second.id])
+        self.assertEqual(self.rendered_ids(), [])
+
+        mock_client.return_value.models.generate_content.return_value.text = "analysis"
+        with patch('agent.prompts.AnalysisPromptCompiler.render_card') as mock_render_card:
+            result = GeminiService().analyze_project_and_suggest_developers("Shop", project_description="An online shop")
+
+        mock_render_card.assert_not_called()
+        self.assertEqual(result["prompt_stats"]["developers_included"], 2)
+
+    def test_profile_changes_invalidate_only_that_developer(self, mock_client):
+        """Test skill and project changes re-render the changed developer's card only."""
+        self.snapshot()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DeveloperSkills.objects.create(developer=self.first, skill=self.django)
+        self.assertEqual(self.rendered_ids(), [self.first.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            project = DeveloperProjects.objects.filter(developer=self.second).get()
+            project.skills.add(self.python)
+        self.assertEqual(self.rendered_ids(), [self.second.id])
+
+        skills = [skill["name"] for skill in self.snapshot()["developers"][0]["skills"]]
+        self.assertEqual(skills, ["Python", "Django"])
+
+    def test_bulk_recalculation_invalidates_changed_developers(self, mock_client):
+        """Test skill levels recalculated in bulk, bypassing the signals, re-render the changed cards."""
+        self.snapshot()
+        # Projects added without signals, as by a data import
+        projects = DeveloperProjects.objects.bulk_create([
+            DeveloperProjects(developer=self.first, name=f"Import {index}", project_origin="Personal")
+            for index in range(2)
+        ])
+        DeveloperProjects.skills.through.objects.bulk_create([
+            DeveloperProjects.skills.through(developerprojects=project, skills=self.python) for project in projects
+        ])
+        self.assertEqual(self.rendered_ids(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SkillLevelService.bulk_update_skill_levels()
+        self.assertEqual(self.rendered_ids(), [self.first.id])
+
+        developer = next(developer for developer in self.snapshot()["developers"] if developer["id"] == self.first.id)
+        self.assertEqual(developer["skills"][0]["level"], 2)
+
+    def test_renames_invalidate_every_card(self, mock_client):
+        """Test renaming a skill shown in profiles re-renders every card."""
+        self.snapshot()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.python.name = "Python 3"
+            self.python.save()
+
+        self.assertEqual(self.rendered_ids(), [self.first.id, self.second.id])
+        self.assertEqual(self.snapshot()["developers"][0]["skills"][0]["name"], "Python 3")
+
+
+@patch('agent.services.get_gemini_client')
+class AnalysisCacheTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+        self.developer = self.create_developer(1, [self.python])
+
+    def analyze(self, description, **kwargs):
+        return GeminiService().analyze_project_and_suggest_developers("Shop", project_description=description, **kwargs)
+
+    def test_repeated_brief_is_served_from_cache(self, mock_client):
+        """Test near-identical briefs hit the cache until the roster changes."""
+        generate_content = mock_client.return_value.models.generate_content
+        generate_content.return_value.text = "analysis"
+
+        first = self.analyze("An online   shop", required_skills=["Python"])
+        second = self.analyze("an online shop", required_skills=["python", "Python"])
+
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["analysis"], "analysis")
+        self.assertEqual(generate_content.call_count, 1)
+        self.assertEqual(get_analysis_cache().stats()["hits"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.developer.role = "Senior Developer"
+            self.developer.save()
+        self.assertFalse(self.analyze("An online shop", required_skills=["Python"])["cached"])
+        self.assertEqual(generate_content.call_count, 2)
+
+    def test_bypass_flag_skips_cache_lookup(self, mock_client):
+        """Test use_cache=False always calls Gemini."""
+        generate_content = mock_client.return_value.models.generate_content
+        generate_content.return_value.text = "analysis"
+
+        self.analyze("An online shop")
+        result = self.analyze("An online shop", use_cache=False)
+
+        self.assertFalse(result["cached"])
+        self.assertEqual(generate_content.call_count, 2)
+
+    def test_local_backend_evicts_least_recently_used_and_expired(self, mock_client):
+        """Test the local backend honours its size bound and TTL."""
+        backend = LocalMemoryLRUBackend(max_entries=2, ttl=60)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        backend.get("a")
+        backend.set("c", 3)
+        self.assertEqual((backend.get("a"), backend.get("b"), backend.get("c")), (1, None, 3))
+
+        expired = LocalMemoryLRUBackend(max_entries=2, ttl=-1)
+        expired.set("a", 1)
+        self.assertIsNone(expired.get("a"))
+
+
+class StreamingEndpointsTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+        self.create_developer(1, [self.python])
+        self.fake_client = FakeGeminiClient(chunks=["Top ", "developer: ", "Developer 1"])
+        patcher = patch('agent.services.get_gemini_client', return_value=self.fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read_events(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = []
+        for block in b"".join(response.streaming_content).decode().strip().split("\n\n"):
+            event_line, data_line = block.split("\n")
+            events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+        return events
+
+    def test_query_stream_forwards_chunks(self):
+        """Test query chunks are forwarded as SSE events followed by metadata."""
+        events = self.read_events(self.client.post('/api/agent/query/stream/', {"query": "Hi"}))
+
+        self.assertEqual([data["text"] for event, data in events if event == "chunk"], ["Top ", "developer: ", "Developer 1"])
+        self.assertEqual(events[-1][0], "done")
+        self.assertEqual(events[-1][1]["model"], "gemini-2.5-flash")
+        self.assertIn("total_ms", events[-1][1]["timings"])
+
+    def test_analyze_stream_ends_with_metadata_and_fills_cache(self):
+        """Test the analysis is streamed, summarized in the final event and cached."""
+        payload = {"project_name": "Shop", "project_description": "An online shop"}
+
+        events = self.read_events(self.client.post('/api/agent/analyze-project/stream/', payload))
+
+        event, metadata = events[-1]
+        self.assertEqual(event, "done")
+        self.assertEqual(metadata["total_developers_analyzed"], 1)
+        self.assertFalse(metadata["cached"])
+        self.assertIn("preparation_ms", metadata["timings"])
+
+        result = self.client.post('/api/agent/analyze-project/', payload).data
+        self.assertTrue(result["cached"])
+        self.assertEqual(result["analysis"], "Top developer: Developer 1")
+        self.assertEqual(len(self.fake_client.models.calls), 1)
+
+    def test_analyze_stream_validates_before_streaming(self):
+        """Test validation errors are plain JSON responses."""
+        response = self.client.post('/api/agent/analyze-project/stream/', {"project_name": "Shop"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncEndpointsTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+        self.create_developer(1, [self.python])
+        self.create_developer(2, [self.react])
+        skill_index.rebuild()
+        self.fake_client = FakeGeminiClient(text="Developer 1")
+        patcher = patch('agent.services.get_gemini_client', return_value=self.fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_async_snapshot_matches_sync_snapshot(self):
+        """Test the async ORM snapshot returns the same data as the sync one."""
+        service = GeminiService()
+
+        async_result = await service.aget_developer_data(required_skills=["python"])
+        sync_result = await sync_to_async(service.get_developer_data)(required_skills=["python"])
+
+        self.assertEqual(async_result, sync_result)
+        self.assertEqual([developer["name"] for developer in async_result["developers"]], ["Developer 1"])
+
+    async def test_analyze_project_async(self):
+        """Test the async endpoint analyzes with the async client and shares the cache."""
+        payload = {"project_name": "Shop", "project_description": "An online shop", "required_skills": ["Python"]}
+
+        response = await self.async_client.post('/api/agent/analyze-project/async/', payload, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual(result["analysis"], "Developer 1")
+        self.assertEqual(result["total_developers_analyzed"], 1)
+        self.assertFalse(result["cached"])
+
+        cached = await self.async_client.post('/api/agent/analyze-project/async/', payload, content_type='application/json')
+        self.assertTrue(cached.json()["cached"])
+        self.assertEqual(len(self.fake_client.models.calls), 1)
+
+    async def test_async_endpoints_validate_and_authenticate(self):
+        """Test validation errors and invalid tokens are rejected like the DRF views do."""
+        response = await self.async_client.post('/api/agent/analyze-project/async/', {"project_name": "Shop"})
+        self.assertEqual(response.status_code, 400)
+
+        response = await self.async_client.post('/api/agent/query/async/', {"query": "Hi"}, headers={"Authorization": "Bearer invalid"})
+        self.assertEqual(response.status_code, 401)
+
+        response = await self.async_client.post('/api/agent/query/async/', {"query": "Hi"})
+        self.assertEqual(response.json()["response"], "Developer 1")
+
+
+@patch('agent.client.genai.Client')
+class SharedGeminiClientTestCase(TestCase):
+    def setUp(self):
+        reset_gemini_client()
+        self.addCleanup(reset_gemini_client)
+
+    def test_client_is_built_once_from_settings(self, mock_client):
+        """Test services share one client configured by the GEMINI_CLIENT settings."""
+        with override_settings(GEMINI_BASE_URL="http://localhost:8080"):
+            first = GeminiService().client
+            second = GeminiService().client
+
+        self.assertIs(first, second)
+        mock_client.assert_called_once()
+        http_options = mock_client.call_args.kwargs["http_options"]
+        self.assertEqual(http_options.base_url, "http://localhost:8080")
+        self.assertEqual(http_options.timeout, settings.GEMINI_CLIENT["TIMEOUT"] * 1000)
+        # Retries are left to GeminiService
+        self.assertEqual(http_options.retry_options.attempts, 1)
+        self.assertEqual(http_options.client_args["limits"].max_connections, settings.GEMINI_CLIENT["POOL_SIZE"])
+
+    def test_concurrent_first_use_builds_one_client(self, mock_client):
+        """Test threads racing on first use all get the same client."""
+        def slow_client(**kwargs):
+            time.sleep(0.01)
+            return object()
+        mock_client.side_effect = slow_client
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(get_gemini_client())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(mock_client.call_count, 1)
+        self.assertEqual(len({id(client) for client in clients}), 1)
+
+    def test_event_loops_get_their_own_client(self, mock_client):
+        """Test async callers get a client per event loop, reused within the loop."""
+        mock_client.side_effect = lambda **kwargs: object()
+
+        async def get_twice():
+            return get_gemini_client(), get_gemini_client()
+
+        first, second = asyncio.run(get_twice())
+        self.assertIs(first, second)
+        self.assertIsNot(first, get_gemini_client())
+
+    def test_sync_callers_share_the_gemini_loop_client(self, mock_client):
+        """Test coroutines run from sync code reuse one loop and its client."""
+        mock_client.side_effect = lambda **kwargs: object()
+
+        async def get_client():
+            return asyncio.get_running_loop(), get_gemini_client()
+
+        first_loop, first = run_in_gemini_loop(get_client())
+        second_loop, second = run_in_gemini_loop(get_client())
+        self.assertIs(first_loop, second_loop)
+        self.assertIs(first, second)
+        self.assertEqual(mock_client.call_count, 1)
+
+
+@patch('agent.services.get_gemini_client')
+class DocumentExtractionTestCase(TestCase):
+    def setUp(self):
+        self.pages = [f"Page {number} requirements" for number in range(1, 6)]
+        self.pdf = make_pdf(self.pages)
+
+    def test_pdf_is_extracted_in_memory_within_page_budget(self, mock_client):
+        """Test only the budgeted pages of an in-memory upload are extracted."""
+        upload = SimpleUploadedFile("brief.pdf", self.pdf, content_type="application/pdf")
+
+        with override_settings(AGENT_DOCUMENT_MAX_PAGES=2):
+            result = GeminiService().extract_text_from_file(upload)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["text"], "Page 1 requirements\nPage 2 requirements")
+        self.assertEqual((result["pages_read"], result["total_pages"]), (2, 5))
+        self.assertTrue(result["truncated"])
+
+    def test_spooled_upload_is_memory_mapped(self, mock_client):
+        """Test uploads Django spooled to disk are read whole without a budget."""
+        upload = TemporaryUploadedFile("brief.pdf", "application/pdf", len(self.pdf), None)
+        upload.write(self.pdf)
+        upload.flush()
+        self.addCleanup(upload.close)
+
+        result = extract_pdf_text(upload, max_pages=0, max_chars=0)
+
+        self.assertEqual(result["text"], "\n".join(self.pages))
+        self.assertFalse(result["truncated"])
+
+    def test_collect_text_stops_consuming_at_character_budget(self, mock_client):
+        """Test segments past the character budget are never requested."""
+        consumed = []
+
+        def segments():
+            for page in self.pages:
+                consumed.append(page)
+                yield page
+
+        result = collect_text(segments(), max_chars=30)
+
+        self.assertEqual(len(consumed), 2)
+        self.assertEqual(len(result["text"]), 30)
+        self.assertTrue(result["truncated"])
+
+    def test_large_pdf_pages_are_extracted_in_parallel_in_order(self, mock_client):
+        """Test PDFs above the page threshold are split across workers and reassembled in order."""
+        self.addCleanup(shutdown_pdf_pool)
+        shutdown_pdf_pool()
+        upload = SimpleUploadedFile("brief.pdf", self.pdf, content_type="application/pdf")
+
+        with override_settings(AGENT_PDF_WORKERS=2, AGENT_PDF_PARALLEL_MIN_PAGES=5):
+            parallel = extract_pdf_text(upload, max_pages=0, max_chars=0)
+            serial = extract_pdf_text(upload, max_pages=4, max_chars=0)
+
+        self.assertTrue(parallel["parallel"])
+        self.assertEqual(parallel["text"], "\n".join(self.pages))
+        # Four budgeted pages are below the threshold
+        self.assertFalse(serial["parallel"])
+        self.assertEqual(serial["pages_read"], 4)
+
+    def test_invalid_pdf_returns_error(self, mock_client):
+        """Test unreadable documents are reported instead of raising."""
+        upload = SimpleUploadedFile("brief.pdf", b"not a pdf", content_type="application/pdf")
+
+        result = GeminiService().extract_text_from_file(upload)
+
+        self.assertFalse(result["success"])
+        self.assertIn("Failed to extract text from PDF", result["error"])
+
+
+class ExtractedTextCacheTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.pdf = make_pdf(["Online shop for Python developers", "Payments and search"])
+        self.fake_client = FakeGeminiClient(text="Developer 1")
+        patcher = patch('agent.services.get_gemini_client', return_value=self.fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, content=None):
+        return SimpleUploadedFile("brief.pdf", content or self.pdf, content_type="application/pdf")
+
+    def test_repeat_upload_skips_parsing(self):
+        """Test the same bytes are parsed once and then served from the cache."""
+        service = GeminiService()
+        first = service.extract_text_from_file(self.upload())
+
+        with patch('agent.documents.PyPDF2.PdfReader') as mock_reader:
+            second = service.extract_text_from_file(self.upload())
+
+        mock_reader.assert_not_called()
+        self.assertFalse(first["cache_hit"])
+        self.assertTrue(second["cache_hit"])
+        self.assertEqual(second["text"], first["text"])
+        self.assertEqual(second["content_hash"], first["content_hash"])
+        self.assertEqual(ExtractedDocument.objects.get().hit_count, 1)
+
+    def test_budget_change_misses_cache(self):
+        """Test text extracted under another budget is not reused."""
+        service = GeminiService()
+        service.extract_text_from_file(self.upload())
+
+        with override_settings(AGENT_DOCUMENT_MAX_PAGES=1):
+            result = service.extract_text_from_file(self.upload())
+
+        self.assertFalse(result["cache_hit"])
+        self.assertEqual(result["text"], "Online shop for Python developers")
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test eviction removes the least recently used entries beyond the size limit."""
+        with override_settings(AGENT_DOCUMENT_CACHE_MAX_CHARS=10 ** 6):
+            for content_hash in ["a", "b", "c"]:
+                ExtractedTextCache.store(content_hash, "pdf", {"text": "x" * 10})
+            ExtractedTextCache.get("a", "pdf")
+
+        self.assertEqual(ExtractedTextCache.evict(max_chars=20), 1)
+        self.assertEqual(sorted(ExtractedDocument.objects.values_list("content_hash", flat=True)), ["a", "c"])
+
+    def test_analysis_reports_document_cache_hit(self):
+        """Test the analysis response tells whether the document text came from the cache."""
+        self.create_skill_fixtures()
+        self.create_developer(1, [self.python])
+
+        first = self.client.post('/api/agent/analyze-project/', {"project_name": "Shop", "project_file": self.upload()}).data
+        second = self.client.post('/api/agent/analyze-project/', {"project_name": "Shop", "project_file": self.upload()}).data
+
+        self.assertFalse(first["document"]["text_cached"])
+        self.assertTrue(second["document"]["text_cached"])
+        self.assertTrue(second["cached"])
+
+
+@override_settings(AGENT_JOB_WORKERS=0)
+class AnalysisJobTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+        self.create_developer(1, [self.python])
+        self.fake_client = FakeGeminiClient(text="Developer 1")
+        patcher = patch('agent.services.get_gemini_client', return_value=self.fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.owner = UserAuth.objects.create(email="owner@example.com", password="unused", role="developer")
+        self.other = UserAuth.objects.create(email="other@example.com", password="unused", role="developer")
+
+    def auth(self, user):
+        return {"HTTP_AUTHORIZATION": f"Bearer {generate_token(user)}"}
+
+    def submit(self, user=None, **payload):
+        payload.setdefault("project_name", "Shop")
+        headers = self.auth(user) if user else {}
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/agent/analyze-project/jobs/', payload, **headers)
+
+    def test_job_is_queued_then_run_and_polled(self):
+        """Test submitting answers before Gemini is called, and polling returns the stored analysis."""
+        upload = SimpleUploadedFile("brief.pdf", make_pdf(["An online shop built with Python"]), content_type="application/pdf")
+        response = self.submit(project_file=upload)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["data"]["status"], "queued")
+        self.assertEqual(self.fake_client.models.calls, [])
+
+        self.assertEqual(run_pending_jobs(), 1)
+
+        job = self.client.get(response.data["poll_url"]).data["data"]
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["analysis"], "Developer 1")
+        self.assertEqual(job["result"]["total_developers_analyzed"], 1)
+        self.assertEqual(job["file_name"], "brief.pdf")
+        self.assertIsNotNone(job["queued_ms"])
+        self.assertIsNotNone(job["run_ms"])
+        self.assertIsNone(AnalysisJob.objects.get().file_content)
+
+    def test_workers_claim_each_job_once_in_order(self):
+        """Test queued jobs are claimed oldest first and never twice."""
+        first = self.submit(project_description="First").data["data"]["id"]
+        second = self.submit(project_description="Second").data["data"]["id"]
+
+        claimed = [claim_next_job("worker-a"), claim_next_job("worker-b"), claim_next_job("worker-a")]
+
+        self.assertEqual([str(job.id) for job in claimed[:2]], [first, second])
+        self.assertIsNone(claimed[2])
+        self.assertEqual(claimed[1].status, AnalysisJob.STATUS_RUNNING)
+        self.assertEqual(claimed[1].worker, "worker-b")
+        self.assertEqual(claimed[1].attempts, 1)
+
+    def test_stale_jobs_are_retried_then_failed(self):
+        """Test jobs of dead workers are queued again until they run out of attempts."""
+        long_ago = timezone.now() - timedelta(seconds=settings.AGENT_JOB_TIMEOUT + 1)
+        retried = AnalysisJob.objects.create(project_name="Retried", status="running", started_at=long_ago, attempts=1)
+        exhausted = AnalysisJob.objects.create(
+            project_name="Exhausted", status="running", started_at=long_ago, attempts=settings.AGENT_JOB_MAX_ATTEMPTS
+        )
+
+        self.assertEqual(requeue_stale_jobs(), 2)
+
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual(retried.status, "queued")
+        self.assertEqual(exhausted.status, "failed")
+
+    def test_outcome_of_a_requeued_job_is_dropped(self):
+        """Test a worker finishing a job claimed again by another worker leaves it to that worker."""
+        self.submit(project_description="An online shop")
+        stale = claim_next_job("worker-a")
+        AnalysisJob.objects.filter(id=stale.id).update(
+            started_at=timezone.now() - timedelta(seconds=settings.AGENT_JOB_TIMEOUT + 1)
+        )
+        requeue_stale_jobs()
+        current = claim_next_job("worker-b")
+
+        with self.assertLogs('agent.jobs', level='WARNING'):
+            run_job(stale)
+        self.assertEqual(AnalysisJob.objects.get().status, AnalysisJob.STATUS_RUNNING)
+
+        run_job(current)
+        job = AnalysisJob.objects.get()
+        self.assertEqual(job.status, AnalysisJob.STATUS_SUCCEEDED)
+        self.assertEqual(job.worker, "worker-b")
+
+    def test_jobs_wait_for_a_concurrency_slot(self):
+        """Test a job calling Gemini waits until a slot of the gate is free, and frees it again."""
+        self.submit(project_description="An online shop")
+        job = claim_next_job("worker-a")
+
+        with override_settings(AGENT_RATE_LIMIT=rate_limit_settings(CONCURRENCY=1)):
+            slot = ConcurrencyGate.acquire()
+            threading.Timer(0.2, ConcurrencyGate.release, [slot]).start()
+            started = time.monotonic()
+            run_job(job)
+            waited = time.monotonic() - started
+            slot = ConcurrencyGate.acquire()
+        ConcurrencyGate.release(slot)
+
+        self.assertGreaterEqual(waited, 0.2)
+        self.assertEqual(AnalysisJob.objects.get().status, AnalysisJob.STATUS_SUCCEEDED)
+        self.assertIsNotNone(slot)
+
+    @override_settings(AGENT_JOB_SLOT_WAIT=0)
+    def test_jobs_without_a_concurrency_slot_are_queued_again(self):
+        """Test a job finding every slot taken goes back to the queue without using up an attempt."""
+        self.submit(project_description="An online shop")
+        job = claim_next_job("worker-a")
+
+        with override_settings(AGENT_RATE_LIMIT=rate_limit_settings(CONCURRENCY=1)):
+            slot = ConcurrencyGate.acquire()
+            with self.assertLogs('agent.jobs', level='INFO'):
+                run_job(job)
+            ConcurrencyGate.release(slot)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.worker), (AnalysisJob.STATUS_QUEUED, 0, None))
+        self.assertEqual(self.fake_client.models.calls, [])
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(AnalysisJob.objects.get().status, AnalysisJob.STATUS_SUCCEEDED)
+
+    def test_jobs_are_only_visible_to_their_owner(self):
+        """Test listing and polling are scoped to the submitting user."""
+        poll_url = self.submit(user=self.owner, project_description="An online shop").data["poll_url"]
+
+        self.assertEqual(self.client.get(poll_url, **self.auth(self.owner)).status_code, 200)
+        self.assertEqual(self.client.get(poll_url, **self.auth(self.other)).status_code, 404)
+        self.assertEqual(len(self.client.get('/api/agent/analyze-project/jobs/', **self.auth(self.owner)).data["data"]), 1)
+        self.assertEqual(self.client.get('/api/agent/analyze-project/jobs/', **self.auth(self.other)).data["data"], [])
+        self.assertEqual(self.client.get('/api/agent/analyze-project/jobs/').status_code, 401)
+
+    def test_commit_wakes_in_process_workers(self):
+        """Test queued jobs are handed to the thread pool unless workers are disabled."""
+        with patch('agent.jobs.get_job_executor') as mock_executor:
+            dispatch_jobs()
+            mock_executor.assert_not_called()
+
+            with override_settings(AGENT_JOB_WORKERS=2):
+                self.submit(project_description="An online shop")
+            mock_executor.return_value.submit.assert_called_once()
+
+
+class BatchAnalysisTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+        self.create_developer(1, [self.python])
+        self.create_developer(2, [self.react])
+        skill_index.rebuild()
+        self.fake_client = FakeGeminiClient(text="Developer 1", delay=0.05)
+        patcher = patch('agent.services.get_gemini_client', return_value=self.fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def batch(self, projects, **options):
+        return self.client.post(
+            '/api/agent/analyze-project/batch/', {"projects": projects, **options}, content_type='application/json'
+        )
+
+    def test_batch_shares_one_snapshot_and_bounds_concurrency(self):
+        """Test the snapshot is loaded once and at most `concurrency` Gemini calls run at a time."""
+        projects = [
+            {"project_name": f"Shop {index}", "project_description": f"Online shop {index}", "required_skills": ["Python"]}
+            for index in range(5)
+        ] + [{"project_name": "Portal", "project_description": "A portal", "required_skills": ["React"]}]
+
+        with patch.object(GeminiService, 'get_developer_data', autospec=True, side_effect=GeminiService.get_developer_data) as mock_snapshot:
+            response = self.batch(projects, concurrency=2)
+
+        self.assertEqual(response.status_code, 200)
+        mock_snapshot.assert_called_once()
+        results = response.data["results"]
+        self.assertEqual([result["project_name"] for result in results], [project["project_name"] for project in projects])
+        # Each project is still ranked against its own candidates only
+        self.assertEqual(results[0]["local_scores"][0]["name"], "Developer 1")
+        self.assertEqual(results[-1]["local_scores"][0]["name"], "Developer 2")
+        self.assertEqual(results[-1]["total_developers_analyzed"], 1)
+        self.assertEqual(self.fake_client.models.max_in_flight, 2)
+
+        stats = response.data["stats"]
+        self.assertEqual((stats["total"], stats["succeeded"], stats["gemini_calls"]), (6, 6, 6))
+        self.assertGreaterEqual(stats["latency_ms"]["min"], 50)
+
+    def test_batch_calls_hold_concurrency_slots(self):
+        """Test each Gemini call of a batch waits for a slot of the gate shared by all processes."""
+        projects = [{"project_name": f"Shop {index}", "project_description": f"Online shop {index}"} for index in range(3)]
+
+        with override_settings(AGENT_RATE_LIMIT=rate_limit_settings(CONCURRENCY=1)):
+            response = self.batch(projects, concurrency=3)
+            slot = ConcurrencyGate.acquire()
+        ConcurrencyGate.release(slot)
+
+        self.assertEqual(response.data["stats"]["succeeded"], 3)
+        self.assertEqual(self.fake_client.models.max_in_flight, 1)
+        # Every slot was freed again
+        self.assertIsNotNone(slot)
+
+    @override_settings(AGENT_LOCAL_FALLBACK=False)
+    def test_slow_items_time_out_without_failing_the_batch(self):
+        """Test a Gemini call over the item timeout fails only its own project."""
+        self.batch([{"project_name": "Shop", "project_description": "Online shop"}])
+        self.fake_client.models.delay = 1
+
+        response = self.batch([
+            {"project_name": "Shop", "project_description": "Online shop"},
+            {"project_name": "CRM", "project_description": "A CRM"},
+        ], item_timeout=0.1)
+
+        cached, slow = response.data["results"]
+        self.assertTrue(cached["cached"])
+        self.assertFalse(slow["success"])
+        self.assertTrue(slow["timed_out"])
+        self.assertEqual(response.data["stats"]["timed_out"], 1)
+        self.assertEqual(response.data["stats"]["cached"], 1)
+
+    def test_batch_validates_every_item(self):
+        """Test an invalid project or a missing file rejects the batch."""
+        response = self.batch([{"project_name": "Shop", "project_description": "Online shop"}, {"project_name": "Empty"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("projects[1]", response.data["error"])
+
+        response = self.batch([{"project_name": "Shop", "project_file": "brief"}])
+        self.assertEqual(response.status_code, 400)
+
+        with override_settings(AGENT_BATCH_MAX_ITEMS=1):
+            response = self.batch([{"project_name": "A", "project_description": "a"}] * 2)
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_accepts_files_by_field_name(self):
+        """Test multipart batches map each project to its uploaded file."""
+        upload = SimpleUploadedFile("brief.pdf", make_pdf(["An online shop built with Python"]), content_type="application/pdf")
+
+        response = self.client.post('/api/agent/analyze-project/batch/', {
+            "projects": json.dumps([{"project_name": "Shop", "project_file": "shop_brief"}]),
+            "shop_brief": upload,
+        })
+
+        result = response.data["results"][0]
+        self.assertTrue(result["success"])
+        self.assertEqual(result["document"]["name"], "brief.pdf")
+        self.assertEqual(result["project_description"], "An online shop built with Python")
+
+
+class StructuredAnalysisTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+        self.first = self.create_developer(1, [self.python])
+        self.second = self.create_developer(2, [self.python])
+        self.fake_client = FakeGeminiClient()
+        patcher = patch('agent.services.get_gemini_client', return_value=self.fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def respond_with(self, recommendations):
+        self.fake_client.models.text = json.dumps({
+            "summary": ["An online shop"],
+            "required_expertise": ["Python"],
+            "recommendations": recommendations,
+        })
+
+    def recommendation(self, developer_id, score):
+        return {"developer_id": developer_id, "score": score, "reasons": ["Knows Python"], "gaps": []}
+
+    def analyze(self, **options):
+        payload = {"project_name": "Shop", "project_description": "An online shop", "output_format": "json", **options}
+        return self.client.post('/api/agent/analyze-project/', payload)
+
+    def test_structured_analysis_is_resolved_ranked_and_stored(self):
+        """Test the JSON analysis is requested by schema, resolved to developers, ranked by score and stored."""
+        self.respond_with([
+            self.recommendation(self.second.id, 7),
+            self.recommendation(self.first.id, 9),
+            self.recommendation(999, 10),
+            self.recommendation(self.second.id, 6),
+        ])
+
+        response = self.analyze()
+
+        self.assertEqual(response.status_code, 200)
+        call = self.fake_client.models.calls[0]
+        self.assertEqual(call["config"].response_mime_type, "application/json")
+        self.assertIn(f"{self.first.id}|Developer 1|", call["contents"])
+        structured = response.data["structured_analysis"]
+        self.assertNotIn("analysis", response.data)
+        self.assertEqual(
+            [(item["rank"], item["developer_id"], item["name"], item["score"]) for item in structured["recommendations"]],
+            [(1, self.first.id, "Developer 1", 9), (2, self.second.id, "Developer 2", 7)]
+        )
+        self.assertEqual(structured["unresolved_developer_ids"], [999])
+        stored = DeveloperRecommendation.objects.filter(analysis_key=response.data["analysis_key"])
+        self.assertEqual(list(stored.values_list('developer_id', 'rank')), [(self.first.id, 1), (self.second.id, 2)])
+
+        # Regenerating the analysis replaces its recommendations, a cache hit leaves them alone
+        self.respond_with([self.recommendation(self.second.id, 8)])
+        self.analyze(use_cache="false")
+        self.assertTrue(self.analyze().data["cached"])
+        self.assertEqual(list(stored.values_list('developer_id', flat=True)), [self.second.id])
+        # The Markdown analysis of the same project is cached separately
+        self.assertFalse(self.analyze(output_format="markdown").data["cached"])
+
+    def test_developers_are_resolved_in_one_query(self):
+        """Test resolving recommendations costs one query however many developers are recommended."""
+        response_text = json.dumps({"summary": [], "required_expertise": [], "recommendations": [
+            self.recommendation(self.first.id, 9), self.recommendation(self.second.id, 7)
+        ]})
+
+        with self.assertNumQueries(1):
+            parsed = StructuredAnalysisService.parse(response_text, [self.first.id, self.second.id])
+
+        self.assertEqual(len(parsed["structured_analysis"]["recommendations"]), 2)
+
+    def test_invalid_structured_analysis_fails_the_analysis(self):
+        """Test malformed or out-of-schema JSON fails the analysis without storing or caching it."""
+        self.fake_client.models.text = "not json"
+        self.assertIn("invalid JSON", self.analyze().data["error"])
+
+        self.respond_with([self.recommendation(self.first.id, 12)])
+        response = self.analyze()
+
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("recommendations.0.score", response.data["error"])
+        self.assertFalse(DeveloperRecommendation.objects.exists())
+        self.assertEqual(len(self.fake_client.models.calls), 2)
+        self.analyze()
+        self.assertEqual(len(self.fake_client.models.calls), 3)
+
+    def test_output_format_is_validated(self):
+        """Test unknown formats are rejected, and JSON is not streamed."""
+        self.assertEqual(self.analyze(output_format="xml").status_code, 400)
+        response = self.client.post('/api/agent/analyze-project/stream/', {
+            "project_name": "Shop", "project_description": "An online shop", "output_format": "json"
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class AnalysisRunTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+        self.developer = self.create_developer(1, [self.python])
+        self.fake_client = FakeGeminiClient(text="Developer 1")
+        patcher = patch('agent.services.get_gemini_client', return_value=self.fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.owner = UserAuth.objects.create(email="owner@example.com", password="unused", role="developer")
+        self.other = UserAuth.objects.create(email="other@example.com", password="unused", role="developer")
+        self.admin = UserAuth.objects.create(email="admin@example.com", password="unused", role="admin")
+
+    def auth(self, user):
+        return {"HTTP_AUTHORIZATION": f"Bearer {generate_token(user)}"}
+
+    def analyze(self, user=None, **payload):
+        payload = {"project_name": "Shop", "project_description": "An online shop", **payload}
+        headers = self.auth(user) if user else {}
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/agent/analyze-project/', payload, **headers)
+
+    def test_run_is_recorded_and_visible_to_its_user(self):
+        """Test a generated analysis is recorded with its prompt hash and only listed for its user and admins."""
+        response = self.analyze(self.owner)
+
+        run = AnalysisRun.objects.get(id=response.data["run_id"])
+        self.assertEqual(run.user, self.owner)
+        self.assertEqual(run.analysis, "Developer 1")
+        self.assertEqual(run.prompt_hash, AnalysisRunService.hash_prompt(self.fake_client.models.calls[0]["contents"]))
+        self.assertEqual(run.analysis_key, response.data["analysis_key"])
+        self.assertIsNotNone(run.latency_ms)
+        self.assertEqual(run.result["total_developers_analyzed"], 1)
+
+        listed = self.client.get('/api/agent/analyze-project/runs/', **self.auth(self.owner)).data["data"]
+        self.assertEqual([item["id"] for item in listed], [str(run.id)])
+        self.assertEqual(self.client.get('/api/agent/analyze-project/runs/', **self.auth(self.other)).data["data"], [])
+        self.assertEqual(len(self.client.get('/api/agent/analyze-project/runs/', **self.auth(self.admin)).data["data"]), 1)
+        self.assertEqual(self.client.get('/api/agent/analyze-project/runs/').status_code, 401)
+
+        detail_url = f'/api/agent/analyze-project/runs/{run.id}/'
+        self.assertEqual(self.client.get(detail_url, **self.auth(self.owner)).data["data"]["analysis"], "Developer 1")
+        self.assertEqual(self.client.get(detail_url, **self.auth(self.other)).status_code, 404)
+
+    def test_run_of_identical_prompt_is_reused(self):
+        """Test reuse_run skips Gemini when the roster changed without changing the prompt."""
+        first = self.analyze()
+        # The email is not part of the prompt, but changes the roster version
+        with self.captureOnCommitCallbacks(execute=True):
+            self.developer.email = "developer1@example.org"
+            self.developer.save()
+
+        reused = self.analyze(reuse_run="true")
+
+        self.assertEqual(len(self.fake_client.models.calls), 1)
+        self.assertTrue(reused.data["cached"])
+        self.assertEqual(reused.data["reused_run_id"], first.data["run_id"])
+        self.assertEqual(reused.data["analysis"], "Developer 1")
+        self.assertNotEqual(reused.data["analysis_key"], first.data["analysis_key"])
+        run = AnalysisRun.objects.get(id=reused.data["run_id"])
+        self.assertEqual(str(run.reused_from_id), first.data["run_id"])
+        self.assertIsNone(run.prompt_tokens)
+
+        # Without reuse_run the analysis is generated again
+        self.assertFalse(self.analyze(use_cache="false").data["cached"])
+        self.assertEqual(len(self.fake_client.models.calls), 2)
+
+    def test_run_is_not_reused_after_a_shortlisted_developer_changed(self):
+        """Test a changed developer in the shortlist changes the prompt, so Gemini is called again."""
+        self.analyze()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.developer.industry_experience = 5
+            self.developer.save()
+
+        response = self.analyze(reuse_run="true")
+
+        self.assertFalse(response.data["cached"])
+        self.assertNotIn("reused_run_id", response.data)
+        self.assertEqual(len(self.fake_client.models.calls), 2)
+
+
+def rate_limit_settings(**overrides):
+    return {**settings.AGENT_RATE_LIMIT, **overrides}
+
+
+class RateLimitTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+        self.create_developer(1, [self.python])
+        self.fake_client = FakeGeminiClient(text="Developer 1")
+        patcher = patch('agent.services.get_gemini_client', return_value=self.fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.first = UserAuth.objects.create(email="first@example.com", password="unused", role="developer")
+        self.second = UserAuth.objects.create(email="second@example.com", password="unused", role="developer")
+
+    def query(self, user=None):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {generate_token(user)}"} if user else {}
+        return self.client.post('/api/agent/query/', {"query": "Hi"}, **headers)
+
+    def test_users_and_roles_have_their_own_buckets(self):
+        """Test each user is limited by their bucket and all users of a role by the role's bucket."""
+        roles = {**settings.AGENT_RATE_LIMIT['ROLES'], 'developer': {'RATE': 1, 'BURST': 2, 'ROLE_RATE': 1, 'ROLE_BURST': 3}}
+        with override_settings(AGENT_RATE_LIMIT=rate_limit_settings(ROLES=roles)):
+            self.assertEqual([self.query(self.first).status_code for _ in range(3)], [200, 200, 429])
+            limited = self.query(self.first)
+            self.assertEqual(self.query(self.second).status_code, 200)
+            # The role's bucket is empty now, although the second user has a token left
+            role_limited = self.query(self.second)
+            self.assertEqual(self.query().status_code, 200)
+
+        self.assertEqual(limited.status_code, 429)
+        self.assertGreaterEqual(int(limited["Retry-After"]), 59)
+        self.assertEqual(role_limited.status_code, 429)
+        self.assertEqual(len(self.fake_client.models.calls), 4)
+
+    def test_bucket_refills_over_time(self):
+        """Test tokens come back at the configured rate per minute."""
+        bucket = TokenBucket("test", rate=6, burst=1)
+        with patch('agent.limits.time.time', return_value=1000.0):
+            self.assertEqual(bucket.consume(), 0)
+            self.assertAlmostEqual(bucket.consume(), 10)
+        with patch('agent.limits.time.time', return_value=1010.0):
+            self.assertEqual(bucket.consume(), 0)
+
+    def test_concurrency_gate_caps_requests_in_flight(self):
+        """Test requests beyond the concurrency cap are turned away without using up the rate limit."""
+        with override_settings(AGENT_RATE_LIMIT=rate_limit_settings(CONCURRENCY=1)):
+            slot = ConcurrencyGate.acquire()
+            busy = self.query(self.first)
+            ConcurrencyGate.release(slot)
+            served = [self.query(self.first).status_code for _ in range(2)]
+
+            # The stream holds its slot until it is consumed
+            stream = self.client.post('/api/agent/query/stream/', {"query": "Hi"})
+            self.assertIsNone(ConcurrencyGate.acquire())
+            b"".join(stream.streaming_content)
+            self.assertIsNotNone(ConcurrencyGate.acquire())
+
+        self.assertEqual(busy.status_code, 429)
+        self.assertEqual(busy["Retry-After"], str(settings.AGENT_RATE_LIMIT['BUSY_RETRY_AFTER']))
+        self.assertEqual(served, [200, 200])
+
+    def test_process_local_caches_are_reported(self):
+        """Test the system check warns when limits and roster versions are kept in each process's memory."""
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/0'}}
+
+        with override_settings(DEBUG=False, CACHES=locmem):
+            self.assertEqual([warning.id for warning in check_shared_caches(None)], ['agent.W001'])
+        with override_settings(DEBUG=False, CACHES=redis):
+            self.assertEqual(check_shared_caches(None), [])
+        with override_settings(DEBUG=True, CACHES=locmem):
+            self.assertEqual(check_shared_caches(None), [])
+
+    async def test_async_endpoints_are_limited(self):
+        """Test the async views share the limits of the DRF views."""
+        roles = {**settings.AGENT_RATE_LIMIT['ROLES'], 'anonymous': {'RATE': 1, 'BURST': 1, 'ROLE_RATE': 10, 'ROLE_BURST': 10}}
+        with override_settings(AGENT_RATE_LIMIT=rate_limit_settings(ROLES=roles)):
+            self.assertEqual((await sync_to_async(self.query)()).status_code, 200)
+            response = await self.async_client.post('/api/agent/query/async/', {"query": "Hi"})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+
+def gemini_client_settings(**overrides):
+    return {**settings.GEMINI_CLIENT, "RETRY_INITIAL_DELAY": 0.001, "RETRY_MAX_DELAY": 0.001, **overrides}
+
+
+class GeminiResilienceTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+        self.create_developer(1, [self.python])
+        self.fake_client = FakeGeminiClient(text="Developer 1")
+        patcher = patch('agent.services.get_gemini_client', return_value=self.fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        gemini_breaker.reset()
+        self.addCleanup(gemini_breaker.reset)
+
+    def query(self):
+        return self.client.post('/api/agent/query/', {"query": "Hi"})
+
+    @override_settings(GEMINI_CLIENT=gemini_client_settings(RETRY_ATTEMPTS=3))
+    def test_transient_errors_are_retried(self):
+        """Test rate limiting and server errors are retried, client errors are not."""
+        self.fake_client.models.faults = [gemini_error(503), gemini_error(429)]
+        self.assertEqual(self.query().status_code, 200)
+        self.assertEqual(len(self.fake_client.models.calls), 3)
+
+        self.fake_client.models.faults = [gemini_error(400)]
+        self.assertEqual(self.query().status_code, 500)
+        self.assertEqual(len(self.fake_client.models.calls), 4)
+
+        stats = gemini_breaker.stats()
+        self.assertEqual((stats["calls"], stats["failures"], stats["retries"]), (4, 2, 2))
+        self.assertEqual(stats["state"], CircuitBreaker.CLOSED)
+
+    @override_settings(GEMINI_CLIENT=gemini_client_settings(TIMEOUT=0.05, DEADLINE=0.12, RETRY_ATTEMPTS=5), AGENT_LOCAL_FALLBACK=False)
+    def test_slow_gemini_fails_at_the_deadline(self):
+        """Test attempts time out and the analysis gives up at the deadline with the local ranking."""
+        self.fake_client.models.delay = 1
+
+        started = time.perf_counter()
+        response = self.client.post('/api/agent/analyze-project/', {"project_name": "Shop", "project_description": "An online shop"})
+
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(response.status_code, 504)
+        self.assertTrue(response.data["timed_out"])
+        self.assertEqual(len(response.data["local_scores"]), 1)
+        self.assertEqual(self.fake_client.models.calls[0]["config"].http_options.timeout, 50)
+        self.assertEqual(gemini_breaker.stats()["deadline_exceeded"], 1)
+
+    @override_settings(
+        GEMINI_CLIENT=gemini_client_settings(RETRY_ATTEMPTS=1),
+        GEMINI_CIRCUIT_BREAKER={"WINDOW": 4, "MIN_CALLS": 2, "FAILURE_RATE": 0.5, "COOLDOWN": 0.05}
+    )
+    def test_circuit_opens_fails_fast_and_recovers(self):
+        """Test the breaker opens at the failure rate, rejects calls until the cooldown, then probes."""
+        # Queries have no local fallback, analyses fall back to the local recommendations
+        self.fake_client.models.faults = [gemini_error(500), gemini_error(503)]
+        self.assertEqual([self.query().status_code for _ in range(2)], [500, 500])
+
+        rejected = self.query()
+        analysis = self.client.post('/api/agent/analyze-project/', {"project_name": "Shop", "project_description": "An online shop"})
+
+        self.assertEqual(rejected.status_code, 503)
+        self.assertIn("Retry-After", rejected)
+        self.assertEqual(analysis.status_code, 200)
+        self.assertTrue(analysis.data["fallback"])
+        self.assertIn("suspended", analysis.data["fallback_reason"])
+        self.assertEqual(len(self.fake_client.models.calls), 2)
+
+        time.sleep(0.06)
+        self.assertEqual(self.query().status_code, 200)
+        self.assertEqual(gemini_breaker.stats()["state"], CircuitBreaker.CLOSED)
+
+        admin = UserAuth.objects.create(email="admin@example.com", password="unused", role="admin")
+        stats = self.client.get('/api/agent/gemini-stats/', HTTP_AUTHORIZATION=f"Bearer {generate_token(admin)}").data["data"]
+        self.assertEqual((stats["opened"], stats["rejected"], stats["successes"]), (1, 2, 1))
+
+    @override_settings(GEMINI_CLIENT=gemini_client_settings(RETRY_ATTEMPTS=2))
+    async def test_async_calls_are_retried(self):
+        """Test the async client is retried like the sync one."""
+        self.fake_client.models.faults = [gemini_error(502)]
+
+        result = await GeminiService().agenerate_content("Hi")
+
+        self.assertTrue(result["success"])
+        self.assertEqual(len(self.fake_client.models.calls), 2)
+
+
+class LocalRecommenderTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+        ProjectCategorySkills.objects.create(project_category=self.web_category, skill=self.react)
+        self.full_stack = self.create_developer(1, [self.python, self.django], projects=2)
+        self.backend = self.create_developer(2, [self.python], projects=0)
+        self.create_developer(3, [self.react])
+        self.fake_client = FakeGeminiClient(text="Developer 1")
+        patcher = patch('agent.services.get_gemini_client', return_value=self.fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        gemini_breaker.reset()
+        self.addCleanup(gemini_breaker.reset)
+
+    def analyze(self, **options):
+        payload = {
+            "project_name": "Shop",
+            "project_description": "An online shop",
+            "required_skills": json.dumps(["Python", "Django"]),
+            "project_categories": json.dumps(["Web Development"]),
+            **options
+        }
+        return self.client.post('/api/agent/analyze-project/', payload)
+
+    def test_local_engine_recommends_without_gemini(self):
+        """Test the local engine ranks the shortlist with scores, reasons and gaps and never calls Gemini."""
+        response = self.analyze(engine="local", output_format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.fake_client.models.calls, [])
+        self.assertEqual((response.data["engine"], response.data["model"]), ("local", "local"))
+        self.assertFalse(response.data["fallback"])
+        recommendations = response.data["structured_analysis"]["recommendations"]
+        self.assertEqual([item["developer_id"] for item in recommendations], [self.full_stack.id, self.backend.id])
+        self.assertEqual(recommendations[0]["score"], round(response.data["local_scores"][0]["score"] / 10, 1))
+        self.assertIn("Has the required skills Django (Basic Knowledge), Python (Basic Knowledge)", recommendations[0]["reasons"])
+        self.assertEqual(recommendations[0]["relevant_projects"], ["Project 1-0", "Project 1-1"])
+        self.assertIn("Missing required skills: Django", recommendations[1]["gaps"])
+        self.assertFalse(AnalysisRun.objects.exists())
+
+        markdown = self.analyze(engine="local").data["analysis"]
+        self.assertIn("##### 1. **Developer 1**", markdown)
+        self.assertEqual(self.analyze(engine="claude").status_code, 400)
+
+    @override_settings(GEMINI_CLIENT=gemini_client_settings(RETRY_ATTEMPTS=1))
+    def test_failed_gemini_analysis_falls_back_to_local_engine(self):
+        """Test a failed Gemini analysis returns the local recommendations, unless the fallback is off."""
+        self.fake_client.models.faults = [gemini_error(503)]
+        response = self.analyze()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["fallback"])
+        self.assertEqual(response.data["engine"], "local")
+        self.assertIn("Developer 1", response.data["analysis"])
+
+        self.fake_client.models.faults = [gemini_error(503)]
+        with self.settings(AGENT_LOCAL_FALLBACK=False):
+            self.assertEqual(self.analyze(use_cache="false").status_code, 500)
+
+
+class MetricsTestCase(AgentTestDataMixin, TestCase):
+    def setUp(self):
+        self.create_skill_fixtures()
+        self.create_developer(1, [self.python])
+        self.fake_client = FakeGeminiClient(text="Developer 1", chunks=["Developer ", "1"], usage=(1200, 300))
+        patcher = patch('agent.services.get_gemini_client', return_value=self.fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        registry.reset()
+        self.admin = UserAuth.objects.create(email="admin@example.com", password="unused", role="admin")
+
+    def analyze(self, path='/api/agent/analyze-project/'):
+        return self.client.post(path, {"project_name": "Shop", "project_description": "An online shop"})
+
+    def scrape(self):
+        return self.client.get('/api/agent/metrics/', HTTP_AUTHORIZATION=f"Bearer {generate_token(self.admin)}")
+
+    def test_analysis_stages_usage_and_cost_are_recorded_and_logged(self):
+        """Test an analysis reports its stage timings, logs one record and feeds the Prometheus metrics."""
+        with self.assertLogs('agent.metrics', level='INFO') as logs:
+            response = self.analyze()
+
+        timings = response.data["timings"]
+        self.assertTrue({"extract_ms", "cache_lookup_ms", "snapshot_ms", "rank_ms", "prompt_ms", "gemini_ms", "finish_ms"} <= set(timings))
+        self.assertGreaterEqual(timings["total_ms"], timings["gemini_ms"])
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((record["event"], record["outcome"], record["engine"]), ("project_analysis", "generated", "gemini"))
+        self.assertEqual(record["usage"], {"prompt_tokens": 1200, "response_tokens": 300, "total_tokens": 1500})
+        # 1200 input tokens at $0.30 and 300 output tokens at $2.50 per million
+        self.assertAlmostEqual(record["cost_usd"], 0.00111)
+        self.assertEqual(logs.records[-1].analysis["timings"], timings)
+
+        self.assertTrue(self.analyze().data["cached"])
+        b"".join(self.analyze('/api/agent/analyze-project/stream/').streaming_content)
+        self.assertEqual(ANALYSES.value(engine="gemini", outcome="cached"), 2)
+        self.assertEqual(GEMINI_CALL_SECONDS.count(operation="generate", outcome="success"), 1)
+
+        response = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn('agent_gemini_tokens_total{kind="prompt"} 1200', body)
+        self.assertIn('agent_analyses_total{engine="gemini",outcome="generated"} 1', body)
+        self.assertIn('agent_analysis_stage_seconds_count{stage="snapshot"} 1', body)
+        self.assertIn('agent_gemini_cost_usd_total 0.00111', body)
+        self.assertIn('agent_analysis_cache_requests_total{result="hit"} 2', body)
+
+    def test_failed_calls_are_labelled_and_metrics_are_admin_only(self):
+        """Test failed Gemini calls are counted by outcome and only admins can scrape the metrics."""
+        self.fake_client.models.faults = [gemini_error(400)]
+        with self.settings(AGENT_LOCAL_FALLBACK=False):
+            self.assertEqual(self.analyze().status_code, 500)
+
+        self.assertEqual(GEMINI_CALL_SECONDS.count(operation="generate", outcome="error"), 1)
+        self.assertEqual(ANALYSES.value(engine="gemini", outcome="failed"), 1)
+        developer = UserAuth.objects.create(email="dev@example.com", password="unused", role="developer")
+        self.assertEqual(
+            self.client.get('/api/agent/metrics/', HTTP_AUTHORIZATION=f"Bearer {generate_token(developer)}").status_code, 403
+        )
+
+    def test_histogram_renders_cumulative_buckets(self):
+        """Test histogram buckets are cumulative and end with +Inf, sum and count."""
+        histogram = Histogram("test_seconds", "Test", ["stage"], buckets=[0.1, 1])
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, stage="a")
+
+        self.assertEqual(histogram.render()[2:], [
+            'test_seconds_bucket{stage="a",le="0.1"} 1',
+            'test_seconds_bucket{stage="a",le="1"} 2',
+            'test_seconds_bucket{stage="a",le="+Inf"} 3',
+            'test_seconds_sum{stage="a"} 5.55',
+            'test_seconds_count{stage="a"} 3',
+        ])
+        with self.assertRaises(ValueError):
+            histogram.observe(1)
@@ -5,5 +5,17 @@ app_name = 'agent'
 
 urlpatterns = [
     path('query/', views.query_gemini, name='query_gemini'),
+    path('query/stream/', views.query_gemini_stream, name='query_gemini_stream'),
+    path('query/async/', views.query_gemini_async, name='query_gemini_async'),
     path('analyze-project/', views.analyze_project, name='analyze_project'),
+    path('analyze-project/stream/', views.analyze_project_stream, name='analyze_project_stream'),
+    path('analyze-project/async/', views.analyze_project_async, name='analyze_project_async'),
+    path('analyze-project/batch/', views.analyze_project_batch, name='analyze_project_batch'),
+    path('analyze-project/jobs/', views.analysis_jobs, name='analysis_jobs'),
+    path('analyze-project/jobs/<uuid:job_id>/', views.analysis_job_detail, name='analysis_job_detail'),
+    path('analyze-project/runs/', views.analysis_runs, name='analysis_runs'),
+    path('analyze-project/runs/<uuid:run_id>/', views.analysis_run_detail, name='analysis_run_detail'),
+    path('cache-stats/', views.cache_stats, name='cache_stats'),
+    path('gemini-stats/', views.gemini_stats, name='gemini_stats'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
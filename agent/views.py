@@ -1,17 +1,222 @@
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from .cache import get_analysis_cache
+from .jobs import submit_analysis_job
+from .limits import alimit, arelease, llm_rate_limit
+from .local_recommender import ENGINE_GEMINI, ENGINES, ENGINE_LOCAL
+from .metrics import render_metrics
+from .models import AnalysisJob, AnalysisRun
+from .prompts import OUTPUT_FORMATS, OUTPUT_JSON, OUTPUT_MARKDOWN
+from .resilience import gemini_breaker
+from .serializers import AnalysisJobSerializer, AnalysisJobListSerializer, AnalysisRunSerializer, AnalysisRunListSerializer
 from .services import GeminiService
 from user_auth.authentication import CustomTokenAuthentication
-from user_auth.permissions import RoleBasedPermission
+from user_auth.permissions import RoleBasedPermission, IsAdminRole
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _parse_analysis_request(data, files):
+    """
+    Parse and validate the project analysis fields of a request
+    
+    Args:
+        data: Request data (request.data, or the parsed body of a plain Django request)
+        files: Uploaded files of the request
+    
+    Returns:
+        tuple: Keyword arguments for GeminiService.prepare_project_analysis and
+        analyze_project_and_suggest_developers, and an error body (for a 400
+        response) or None
+    """
+    # Get project details from request
+    project_name = data.get('project_name')
+    project_description = data.get('project_description')
+    project_file = files.get('project_file')
+    required_skills = data.get('required_skills', [])
+    project_categories = data.get('project_categories', [])
+    
+    # Parse JSON strings if they exist
+    if isinstance(required_skills, str):
+        try:
+            required_skills = json.loads(required_skills)
+        except json.JSONDecodeError:
+            required_skills = []
+    
+    if isinstance(project_categories, str):
+        try:
+            project_categories = json.loads(project_categories)
+        except json.JSONDecodeError:
+            project_categories = []
+    
+    shortlist_size = data.get('shortlist_size')
+    if shortlist_size is not None:
+        try:
+            shortlist_size = int(shortlist_size)
+            if shortlist_size < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            return None, {
+                "success": False,
+                "error": "shortlist_size must be a positive integer",
+                "model": "gemini-2.5-flash"
+            }
+    
+    use_cache = str(data.get('use_cache', 'true')).lower() not in ['false', '0', 'no']
+    
+    reuse_run = str(data.get('reuse_run', 'false')).lower() in ['true', '1', 'yes']
+    
+    output_format = data.get('output_format') or OUTPUT_MARKDOWN
+    if output_format not in OUTPUT_FORMATS:
+        return None, {
+            "success": False,
+            "error": f"output_format must be one of: {', '.join(OUTPUT_FORMATS)}",
+            "model": "gemini-2.5-flash"
+        }
+    
+    engine = data.get('engine') or ENGINE_GEMINI
+    if engine not in ENGINES:
+        return None, {
+            "success": False,
+            "error": f"engine must be one of: {', '.join(ENGINES)}",
+            "model": "gemini-2.5-flash"
+        }
+    
+    # Validate required fields
+    if not project_name:
+        return None, {
+            "success": False,
+            "error": "project_name is required",
+            "model": "gemini-2.5-flash"
+        }
+    
+    # Validate that either description or file is provided
+    if not project_description and not project_file:
+        return None, {
+            "success": False,
+            "error": "Either project_description or project_file must be provided",
+            "model": "gemini-2.5-flash"
+        }
+    
+    return {
+        "project_name": project_name,
+        "project_description": project_description,
+        "project_file": project_file,
+        "required_skills": required_skills if required_skills else None,
+        "project_categories": project_categories if project_categories else None,
+        "shortlist_size": shortlist_size,
+        "use_cache": use_cache,
+        "output_format": output_format,
+        "reuse_run": reuse_run,
+        "engine": engine,
+    }, None
+
+
+async def _aauthenticate(request):
+    """
+    Authenticate a plain (non-DRF) Django request with CustomTokenAuthentication
+    
+    Returns:
+        JsonResponse: 401 response when an invalid token was sent, otherwise None
+    """
+    try:
+        user_auth_tuple = await sync_to_async(CustomTokenAuthentication().authenticate)(request)
+    except AuthenticationFailed as e:
+        response = JsonResponse({"detail": str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    
+    if user_auth_tuple is not None:
+        request.user, request.auth = user_auth_tuple
+    return None
+
+
+def _request_user(request):
+    """
+    Get the UserAuth of a request, or None for anonymous requests
+    """
+    return request.user if hasattr(request.user, 'role') else None
+
+
+def _request_data(request):
+    """
+    Get the data of a plain Django request, from a JSON body or form fields
+    """
+    if request.content_type == 'application/json':
+        return json.loads(request.body or b'{}')
+    return request.POST
+
+
+def _failure_response(result, response_class=Response):
+    """
+    Build the response of a failed Gemini call or analysis: 503 with Retry-After
+    while the circuit breaker is open, 504 when the call's deadline passed and
+    500 otherwise
+    """
+    if result.get("circuit_open"):
+        response = response_class(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = str(result["retry_after"])
+        return response
+    if result.get("timed_out"):
+        return response_class(result, status=status.HTTP_504_GATEWAY_TIMEOUT)
+    return response_class(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _analysis_cost(request):
+    """
+    Rate limit cost of an analysis: none for the local engine, which does not call Gemini
+    """
+    return 0 if request.data.get('engine') == ENGINE_LOCAL else 1
+
+
+def _batch_cost(request):
+    """
+    Rate limit cost of a batch analysis: one request per project analyzed by Gemini
+    """
+    projects = request.data.get('projects')
+    if isinstance(projects, str):
+        try:
+            projects = json.loads(projects)
+        except json.JSONDecodeError:
+            projects = None
+    # Invalid batches are rejected by the view, at the cost of one request
+    if not isinstance(projects, list) or not projects:
+        return 1
+    return sum(1 for project in projects if not (isinstance(project, dict) and project.get('engine') == ENGINE_LOCAL))
+
+
+def _sse_response(events):
+    """
+    Wrap (event, data) tuples in a Server-Sent Events streaming response
+    """
+    def stream():
+        for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @api_view(['POST'])
 @authentication_classes([CustomTokenAuthentication])
 @permission_classes([permissions.AllowAny])
+@llm_rate_limit()
 def query_gemini(request):
     """
     API endpoint to send queries to Gemini and return responses
@@ -48,7 +253,7 @@ def query_gemini(request):
         if result["success"]:
             return Response(result, status=status.HTTP_200_OK)
         else:
-            return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return _failure_response(result)
             
     except Exception as e:
         logger.error(f"Unexpected error in query_gemini view: {str(e)}")
@@ -62,6 +267,7 @@ def query_gemini(request):
 @api_view(['POST'])
 @authentication_classes([CustomTokenAuthentication])
 @permission_classes([permissions.AllowAny])
+@llm_rate_limit(cost=_analysis_cost)
 def analyze_project(request):
     """
     API endpoint to analyze project requirements and suggest suitable developers
@@ -72,8 +278,21 @@ def analyze_project(request):
     - project_file (optional): PDF or DOCX file containing project description
     - required_skills (optional): JSON string array of required skills
     - project_categories (optional): JSON string array of project categories
+    - shortlist_size (optional): Number of locally ranked developers sent to Gemini
+    - use_cache (optional): "false" to bypass the analysis cache and generate a fresh analysis
+    - output_format (optional): "markdown" (default) or "json" for a structured analysis
+    - reuse_run (optional): "true" to reuse the analysis of an earlier run of the very same
+      prompt (see analysis_runs) instead of calling Gemini
+    - engine (optional): "gemini" (default), or "local" for deterministic recommendations
+      from skill levels, category skills and projects, without calling Gemini
     
-    Note: Either project_description or project_file must be provided
+    Note: Either project_description or project_file must be provided. "document"
+    is only returned for a project_file; "text_cached" tells whether its text came
+    from the extracted text cache instead of being parsed. With output_format
+    "json", "structured_analysis" replaces "analysis" and its recommendations are
+    stored as DeveloperRecommendation rows under "analysis_key". When Gemini fails,
+    the local recommendations are returned instead with "fallback" true and the
+    "fallback_reason"
     
     Returns:
     {
@@ -82,70 +301,562 @@ def analyze_project(request):
         "project_description": "Project description",
         "required_skills": ["Python", "Django"],
         "project_categories": ["Web Development"],
-        "total_developers_analyzed": 5,
+        "total_developers_analyzed": 25,
+        "shortlisted_developers": 15,
+        "pruned_developers": 10,
+        "local_scores": [{"developer_id": 1, "name": "Jane", "score": 87.5, ...}],
+        "document": {"name": "brief.pdf", "content_hash": "...", "text_cached": true, "truncated": false},
+        "analysis_key": "SHA-256 of the analysis inputs",
+        "output_format": "markdown",
         "analysis": "Detailed analysis and recommendations from Gemini",
+        "structured_analysis": {
+            "summary": ["..."],
+            "required_expertise": ["..."],
+            "recommendations": [{"rank": 1, "developer_id": 1, "name": "Jane", "email": "...", "role": "...",
+                                 "score": 8.5, "reasons": ["..."], "relevant_projects": ["..."], "gaps": ["..."]}],
+            "unresolved_developer_ids": []
+        },
         "model": "gemini-2.5-flash",
+        "engine": "gemini",
+        "cached": false,
+        "fallback": false,
         "error": "Error message if any"
     }
     """
     try:
-        # Get project details from request
-        project_name = request.data.get('project_name')
-        project_description = request.data.get('project_description')
-        project_file = request.FILES.get('project_file')
-        required_skills = request.data.get('required_skills', [])
-        project_categories = request.data.get('project_categories', [])
-        
-        # Parse JSON strings if they exist
-        if isinstance(required_skills, str):
+        analysis_kwargs, error = _parse_analysis_request(request.data, request.FILES)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Initialize Gemini service and analyze project
+        gemini_service = GeminiService(user=_request_user(request))
+        result = gemini_service.analyze_project_and_suggest_developers(**analysis_kwargs)
+        
+        # Return appropriate response based on success/failure
+        if result["success"]:
+            return Response(result, status=status.HTTP_200_OK)
+        else:
+            return _failure_response(result)
+            
+    except Exception as e:
+        logger.error(f"Unexpected error in analyze_project view: {str(e)}")
+        return Response({
+            "success": False,
+            "error": f"Internal server error: {str(e)}",
+            "model": "gemini-2.5-flash"
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+@api_view(['POST'])
+@authentication_classes([CustomTokenAuthentication])
+@permission_classes([permissions.AllowAny])
+@llm_rate_limit()
+def query_gemini_stream(request):
+    """
+    Streaming variant of query_gemini, sending Gemini's response as Server-Sent Events
+    
+    Expected request body:
+    {
+        "query": "Your question or prompt here"
+    }
+    
+    Streams:
+        event: chunk   data: {"text": "..."}                       (repeated)
+        event: done    data: {"success": true, "model": "gemini-2.5-flash", "timings": {...}}
+        event: error   data: {"success": false, "error": "..."}    (instead of done on failure)
+    """
+    query = request.data.get('query')
+    
+    if not query:
+        return Response({
+            "success": False,
+            "error": "Query is required in request body",
+            "model": "gemini-2.5-flash"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    gemini_service = GeminiService()
+    return _sse_response(gemini_service.stream_content(query))
+
+
+@api_view(['POST'])
+@authentication_classes([CustomTokenAuthentication])
+@permission_classes([permissions.AllowAny])
+@llm_rate_limit(cost=_analysis_cost)
+def analyze_project_stream(request):
+    """
+    Streaming variant of analyze_project, sending Gemini's analysis as Server-Sent Events
+    
+    Accepts the same request body as analyze_project, except for output_format
+    "json": a structured analysis is only usable once complete. Validation, file
+    extraction and the developer snapshot happen before the stream starts, so their
+    errors are returned as regular JSON responses.
+    
+    Streams:
+        event: chunk   data: {"text": "..."}    (repeated)
+        event: done    data: {"success": true, "project_name": ..., "total_developers_analyzed": ...,
+                              "local_scores": [...], "model": ..., "cached": false, "timings": {...}}
+        event: error   data: {"success": false, "error": "..."}    (instead of done on failure)
+    """
+    try:
+        analysis_kwargs, error = _parse_analysis_request(request.data, request.FILES)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+        if analysis_kwargs["output_format"] == OUTPUT_JSON:
+            return Response({
+                "success": False,
+                "error": "output_format json is not supported for streaming, use /agent/analyze-project/",
+                "model": "gemini-2.5-flash"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        gemini_service = GeminiService(user=_request_user(request))
+        started = time.perf_counter()
+        prepared = gemini_service.prepare_project_analysis(**analysis_kwargs)
+        if not prepared["success"]:
+            return Response(prepared, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        preparation_ms = round((time.perf_counter() - started) * 1000, 1)
+        
+        def events():
+            for event, data in gemini_service.stream_project_analysis(prepared):
+                if event == "done":
+                    data.setdefault("timings", {})["preparation_ms"] = preparation_ms
+                yield event, data
+        
+        return _sse_response(events())
+    
+    except Exception as e:
+        logger.error(f"Unexpected error in analyze_project_stream view: {str(e)}")
+        return Response({
+            "success": False,
+            "error": f"Internal server error: {str(e)}",
+            "model": "gemini-2.5-flash"
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@authentication_classes([CustomTokenAuthentication])
+@permission_classes([IsAdminRole])
+def cache_stats(request):
+    """
+    API endpoint returning the hit and miss counters of the analysis cache in this process
+    
+    Returns:
+    {
+        "details": "Cache stats fetched successfully",
+        "data": {"backend": "LocalMemoryLRUBackend", "hits": 3, "misses": 5, "hit_ratio": 0.375}
+    }
+    """
+    return Response({
+        "details": "Cache stats fetched successfully",
+        "data": get_analysis_cache().stats()
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([CustomTokenAuthentication])
+@permission_classes([IsAdminRole])
+def gemini_stats(request):
+    """
+    API endpoint returning the circuit breaker state and call counters of the
+    Gemini calls in this process
+    
+    Returns:
+    {
+        "details": "Gemini stats fetched successfully",
+        "data": {"state": "closed", "failure_rate": 0.05, "window_calls": 20, "calls": 120, "successes": 114,
+                 "failures": 6, "retries": 5, "rejected": 0, "deadline_exceeded": 1, "opened": 0}
+    }
+    """
+    return Response({
+        "details": "Gemini stats fetched successfully",
+        "data": gemini_breaker.stats()
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([CustomTokenAuthentication])
+@permission_classes([IsAdminRole])
+def metrics(request):
+    """
+    API endpoint exposing the metrics of the Gemini calls and project analyses in
+    this process in the Prometheus text format (admin only)
+    
+    Histograms of the analysis stage durations (extract, cache_lookup, snapshot,
+    rank, prompt, local, gemini, finish), of the Gemini call durations and token
+    usage, counters of the analyses by engine and outcome, of the tokens and of
+    their estimated cost, plus the circuit breaker and analysis cache counters.
+    
+    Returns:
+        text/plain; version=0.0.4, e.g.
+        agent_gemini_call_seconds_bucket{operation="generate",outcome="success",le="5"} 12
+    """
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@api_view(['POST'])
+@authentication_classes([CustomTokenAuthentication])
+@permission_classes([permissions.AllowAny])
+@llm_rate_limit(cost=_batch_cost, gate=False)
+def analyze_project_batch(request):
+    """
+    API endpoint to analyze many projects at once
+    
+    The developer snapshot is loaded once for the whole batch and the Gemini calls
+    run concurrently, so a batch takes about as long as its slowest projects
+    instead of the sum of all of them. Each Gemini call waits for a slot of the
+    concurrency gate, within the item timeout.
+    
+    Expected request body (JSON, or multipart/form-data with "projects" as a JSON string):
+    {
+        "projects": [
+            {"project_name": "Shop", "project_description": "...", "required_skills": ["Python"]},
+            {"project_name": "CRM", "project_file": "crm_brief"},
+            ...
+        ],
+        "concurrency": 4,      (optional, at most AGENT_BATCH_CONCURRENCY)
+        "item_timeout": 30     (optional, seconds, at most AGENT_BATCH_ITEM_TIMEOUT)
+    }
+    Each project accepts the fields of analyze_project. "project_file" names the
+    multipart field holding that project's PDF or DOCX file.
+    
+    Returns:
+    {
+        "success": true,
+        "results": [{"success": true, "project_name": "Shop", "analysis": "...", "latency_ms": 5400.0, ...}, ...],
+        "stats": {"total": 2, "succeeded": 2, "failed": 0, "timed_out": 0, "cached": 0,
+                  "snapshot_ms": 35.2, "gemini_ms": 6100.4, "total_ms": 6180.9,
+                  "latency_ms": {"min": ..., "median": ..., "p95": ..., "max": ..., "mean": ...}, ...},
+        "model": "gemini-2.5-flash"
+    }
+    Failed projects do not fail the batch, see "success" and "error" of each result.
+    """
+    def bad_request(error):
+        return Response({
+            "success": False,
+            "error": error,
+            "model": "gemini-2.5-flash"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        projects = request.data.get('projects')
+        if isinstance(projects, str):
             try:
-                import json
-                required_skills = json.loads(required_skills)
+                projects = json.loads(projects)
             except json.JSONDecodeError:
-                required_skills = []
+                return bad_request("projects must be a JSON array")
+        
+        if not isinstance(projects, list) or not projects:
+            return bad_request("projects must be a non-empty list")
+        if len(projects) > settings.AGENT_BATCH_MAX_ITEMS:
+            return bad_request(f"A batch accepts at most {settings.AGENT_BATCH_MAX_ITEMS} projects")
         
-        if isinstance(project_categories, str):
+        batch_kwargs = []
+        for index, project in enumerate(projects):
+            if not isinstance(project, dict):
+                return bad_request(f"projects[{index}] must be an object")
+            file_field = project.get('project_file')
+            files = {}
+            if file_field:
+                if file_field not in request.FILES:
+                    return bad_request(f"projects[{index}]: no uploaded file named '{file_field}'")
+                files['project_file'] = request.FILES[file_field]
+            analysis_kwargs, error = _parse_analysis_request(project, files)
+            if error:
+                return bad_request(f"projects[{index}]: {error['error']}")
+            batch_kwargs.append(analysis_kwargs)
+        
+        limits = {}
+        for name, maximum in [('concurrency', settings.AGENT_BATCH_CONCURRENCY), ('item_timeout', settings.AGENT_BATCH_ITEM_TIMEOUT)]:
+            value = request.data.get(name)
+            if value is None:
+                continue
             try:
-                import json
-                project_categories = json.loads(project_categories)
-            except json.JSONDecodeError:
-                project_categories = []
+                value = int(value) if name == 'concurrency' else float(value)
+                if value <= 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                return bad_request(f"{name} must be a positive number")
+            limits[name] = min(value, maximum)
         
-        # Validate required fields
-        if not project_name:
-            return Response({
+        gemini_service = GeminiService(user=_request_user(request))
+        result = gemini_service.analyze_projects_batch(batch_kwargs, **limits)
+        return Response({"success": True, **result, "model": gemini_service.model}, status=status.HTTP_200_OK)
+    
+    except Exception as e:
+        logger.error(f"Unexpected error in analyze_project_batch view: {str(e)}")
+        return Response({
+            "success": False,
+            "error": f"Internal server error: {str(e)}",
+            "model": "gemini-2.5-flash"
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET', 'POST'])
+@authentication_classes([CustomTokenAuthentication])
+@permission_classes([permissions.AllowAny])
+@llm_rate_limit(cost=_analysis_cost, gate=False)
+def analysis_jobs(request):
+    """
+    API endpoint to submit a project analysis as a background job (POST), or list
+    the jobs of the authenticated user (GET; admins see every job)
+    
+    POST accepts the same request body as analyze_project and answers right away
+    with 202 and the queued job. Poll analysis_job_detail until its status is
+    "succeeded" or "failed".
+    
+    GET query parameters:
+    - status (optional): Only list jobs with this status (queued, running, succeeded, failed)
+    - page (optional): Page number
+    
+    Returns (POST):
+    {
+        "details": "Analysis job queued successfully",
+        "data": {"id": "...", "project_name": "Shop", "status": "queued", ...},
+        "poll_url": "/api/agent/analyze-project/jobs/<id>/"
+    }
+    """
+    user = _request_user(request)
+    
+    if request.method == 'POST':
+        analysis_kwargs, error = _parse_analysis_request(request.data, request.FILES)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+        
+        job = submit_analysis_job(analysis_kwargs, user=user)
+        return Response({
+            "details": "Analysis job queued successfully",
+            "data": AnalysisJobListSerializer(job).data,
+            "poll_url": reverse('agent:analysis_job_detail', args=[job.id])
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    if user is None:
+        return Response({"details": "Authentication is required to list analysis jobs"}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    jobs = AnalysisJob.objects.all() if user.role == 'admin' else AnalysisJob.objects.filter(user=user)
+    if request.GET.get('status'):
+        jobs = jobs.filter(status=request.GET['status'])
+    
+    paginator = PageNumberPagination()
+    paginator.page_size = 10
+    paginated_jobs = paginator.paginate_queryset(jobs, request)
+    return Response({"details": "Analysis jobs fetched successfully", "data": AnalysisJobListSerializer(paginated_jobs, many=True).data, "pagination": {
+        "count": paginator.page.paginator.count,
+        "next": paginator.get_next_link(),
+        "previous": paginator.get_previous_link(),
+        "current_page": paginator.page.number,
+        "page_size": paginator.page_size
+    }}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([CustomTokenAuthentication])
+@permission_classes([permissions.AllowAny])
+def analysis_job_detail(request, job_id):
+    """
+    API endpoint to poll a background analysis job
+    
+    Jobs submitted by a user are only visible to that user and to admins.
+    
+    Returns:
+    {
+        "details": "Analysis job fetched successfully",
+        "data": {
+            "id": "...",
+            "status": "queued/running/succeeded/failed",
+            "queued_ms": 12.5,
+            "run_ms": 5400.0,
+            "analysis": "Detailed analysis and recommendations from Gemini",
+            "result": {"success": true, "total_developers_analyzed": 25, "local_scores": [...], ...},
+            "error": "Error message if the job failed",
+            ...
+        }
+    }
+    """
+    user = _request_user(request)
+    job = AnalysisJob.objects.filter(id=job_id).first()
+    if job is None or (job.user_id is not None and not (user and (user.role == 'admin' or user.id == job.user_id))):
+        return Response({"details": "Analysis job not found"}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({"details": "Analysis job fetched successfully", "data": AnalysisJobSerializer(job).data}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([CustomTokenAuthentication])
+@permission_classes([permissions.AllowAny])
+def analysis_runs(request):
+    """
+    API endpoint to list the recorded analysis runs of the authenticated user
+    (admins see every run)
+    
+    Every analysis generated by Gemini, or reused with reuse_run, is recorded
+    with its inputs, prompt hash, roster version, model, token usage, latency
+    and output.
+    
+    Query parameters:
+    - prompt_hash (optional): Only list runs of this prompt
+    - project_name (optional): Only list runs of projects whose name contains this text
+    - page (optional): Page number
+    
+    Returns:
+    {
+        "details": "Analysis runs fetched successfully",
+        "data": [{"id": "...", "project_name": "Shop", "prompt_hash": "...", "total_tokens": 5400, ...}],
+        "pagination": {...}
+    }
+    """
+    user = _request_user(request)
+    if user is None:
+        return Response({"details": "Authentication is required to list analysis runs"}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    runs = AnalysisRun.objects.all() if user.role == 'admin' else AnalysisRun.objects.filter(user=user)
+    if request.GET.get('prompt_hash'):
+        runs = runs.filter(prompt_hash=request.GET['prompt_hash'])
+    if request.GET.get('project_name'):
+        runs = runs.filter(project_name__icontains=request.GET['project_name'])
+    
+    paginator = PageNumberPagination()
+    paginator.page_size = 10
+    paginated_runs = paginator.paginate_queryset(runs, request)
+    return Response({"details": "Analysis runs fetched successfully", "data": AnalysisRunListSerializer(paginated_runs, many=True).data, "pagination": {
+        "count": paginator.page.paginator.count,
+        "next": paginator.get_next_link(),
+        "previous": paginator.get_previous_link(),
+        "current_page": paginator.page.number,
+        "page_size": paginator.page_size
+    }}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([CustomTokenAuthentication])
+@permission_classes([permissions.AllowAny])
+def analysis_run_detail(request, run_id):
+    """
+    API endpoint to fetch a recorded analysis run with its inputs and output
+    
+    Runs of a user are only visible to that user and to admins.
+    
+    Returns:
+    {
+        "details": "Analysis run fetched successfully",
+        "data": {
+            "id": "...",
+            "project_name": "Shop",
+            "prompt_hash": "...",
+            "roster_version": 42,
+            "model": "gemini-2.5-flash",
+            "prompt_tokens": 5000,
+            "response_tokens": 400,
+            "latency_ms": 5400.0,
+            "analysis": "Detailed analysis and recommendations from Gemini",
+            "result": {"success": true, "local_scores": [...], ...},
+            "reused_from": null,
+            ...
+        }
+    }
+    """
+    user = _request_user(request)
+    run = AnalysisRun.objects.filter(id=run_id).first()
+    if run is None or (run.user_id is not None and not (user and (user.role == 'admin' or user.id == run.user_id))):
+        return Response({"details": "Analysis run not found"}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({"details": "Analysis run fetched successfully", "data": AnalysisRunSerializer(run).data}, status=status.HTTP_200_OK)
+
+
+@csrf_exempt
+@require_POST
+async def query_gemini_async(request):
+    """
+    Async variant of query_gemini for ASGI deployments
+    
+    The Gemini round-trip does not hold a worker thread, so one ASGI worker can
+    serve many concurrent requests. Accepts the same request body and returns the
+    same response as query_gemini.
+    """
+    try:
+        error_response = await _aauthenticate(request)
+        if error_response:
+            return error_response
+        
+        try:
+            query = _request_data(request).get('query')
+        except json.JSONDecodeError:
+            query = None
+        
+        if not query:
+            return JsonResponse({
                 "success": False,
-                "error": "project_name is required",
+                "error": "Query is required in request body",
                 "model": "gemini-2.5-flash"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Validate that either description or file is provided
-        if not project_description and not project_file:
-            return Response({
+        slot, limit_response = await alimit(request)
+        if limit_response:
+            return limit_response
+        try:
+            gemini_service = GeminiService()
+            result = await gemini_service.agenerate_content(query)
+        finally:
+            await arelease(slot)
+        
+        if result["success"]:
+            return JsonResponse(result, status=status.HTTP_200_OK)
+        else:
+            return _failure_response(result, JsonResponse)
+    
+    except Exception as e:
+        logger.error(f"Unexpected error in query_gemini_async view: {str(e)}")
+        return JsonResponse({
+            "success": False,
+            "error": f"Internal server error: {str(e)}",
+            "model": "gemini-2.5-flash"
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@csrf_exempt
+@require_POST
+async def analyze_project_async(request):
+    """
+    Async variant of analyze_project for ASGI deployments
+    
+    The developer snapshot is loaded with the async ORM and Gemini is called with
+    the SDK's async client. Accepts the same request body (multipart/form-data or
+    JSON) and returns the same response as analyze_project.
+    """
+    try:
+        error_response = await _aauthenticate(request)
+        if error_response:
+            return error_response
+        
+        try:
+            data = _request_data(request)
+        except json.JSONDecodeError:
+            return JsonResponse({
                 "success": False,
-                "error": "Either project_description or project_file must be provided",
+                "error": "Request body is not valid JSON",
                 "model": "gemini-2.5-flash"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Initialize Gemini service and analyze project
-        gemini_service = GeminiService()
-        result = gemini_service.analyze_project_and_suggest_developers(
-            project_name=project_name,
-            project_description=project_description,
-            project_file=project_file,
-            required_skills=required_skills if required_skills else None,
-            project_categories=project_categories if project_categories else None
-        )
+        analysis_kwargs, error = _parse_analysis_request(data, request.FILES)
+        if error:
+            return JsonResponse(error, status=status.HTTP_400_BAD_REQUEST)
+        
+        slot, limit_response = await alimit(request, cost=0 if analysis_kwargs["engine"] == ENGINE_LOCAL else 1)
+        if limit_response:
+            return limit_response
+        try:
+            gemini_service = GeminiService(user=request.user if getattr(request, 'auth', None) is not None else None)
+            result = await gemini_service.aanalyze_project_and_suggest_developers(**analysis_kwargs)
+        finally:
+            await arelease(slot)
         
-        # Return appropriate response based on success/failure
         if result["success"]:
-            return Response(result, status=status.HTTP_200_OK)
+            return JsonResponse(result, status=status.HTTP_200_OK)
         else:
-            return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
+            return _failure_response(result, JsonResponse)
+    
     except Exception as e:
-        logger.error(f"Unexpected error in analyze_project view: {str(e)}")
-        return Response({
+        logger.error(f"Unexpected error in analyze_project_async view: {str(e)}")
+        return JsonResponse({
             "success": False,
             "error": f"Internal server error: {str(e)}",
             "model": "gemini-2.5-flash"
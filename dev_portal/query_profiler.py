@@ -0,0 +1,196 @@
+import logging
+import re
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+# Lists of placeholders, e.g. the `IN (%s, %s, %s)` of a prefetch, differ only by their length
+PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+NUMBER = re.compile(r"\b\d+\b")
+WHITESPACE = re.compile(r"\s+")
+
+
+def sql_shape(sql):
+    """
+    Reduce an SQL statement to its shape: the statement with its parameter lists
+    and inlined numbers (e.g. LIMIT 21) collapsed, so the queries of an N+1 loop
+    all have the same shape.
+    """
+    shape = PLACEHOLDER_LIST.sub("(%s...)", sql)
+    shape = NUMBER.sub("N", shape)
+    return WHITESPACE.sub(" ", shape).strip()
+
+
+def _app_stack(limit):
+    """
+    Frames of the current stack inside the project (not in Django, libraries or
+    this module), innermost last
+    """
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and "site-packages" not in frame.filename
+        and frame.filename != __file__
+    ]
+    return [f"{frame.filename[len(base_dir) + 1:]}:{frame.lineno} in {frame.name}" for frame in frames[-limit:]]
+
+
+class QueryProfile:
+    """
+    Profile of the database queries run while capturing: their number, their
+    time and how often each SQL shape repeats.
+
+    The stack leading to a shape is recorded once it repeats `stack_threshold`
+    times, so an N+1 loop can be traced back to the code running it without
+    paying for a stack walk on every query.
+    """
+
+    def __init__(self, stack_threshold=None, stack_depth=None):
+        options = settings.QUERY_PROFILER
+        self.stack_threshold = stack_threshold or options['DUPLICATE_THRESHOLD']
+        self.stack_depth = stack_depth or options['STACK_DEPTH']
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = {}
+        self.stacks = {}
+
+    def _execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            shape = sql_shape(sql)
+            entry = self.shapes.setdefault(shape, {"count": 0, "duration": 0.0, "sql": sql})
+            entry["count"] += 1
+            entry["duration"] += time.perf_counter() - started
+            if entry["count"] == self.stack_threshold:
+                self.stacks[shape] = _app_stack(self.stack_depth)
+
+    @contextmanager
+    def capture(self):
+        """
+        Profile the queries run on every database connection of this thread.
+        """
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self._execute))
+            yield self
+
+    def repeated(self, threshold=None):
+        """
+        Shapes run at least `threshold` times (DUPLICATE_THRESHOLD by default), likely N+1 queries.
+
+        Returns:
+            list: Dicts with the "shape", its "count", "duration_ms", an example
+            "sql" and the "stack" that ran it, most repeated first
+        """
+        threshold = threshold or self.stack_threshold
+        repeated = [
+            {
+                "shape": shape,
+                "count": entry["count"],
+                "duration_ms": round(entry["duration"] * 1000, 1),
+                "sql": entry["sql"],
+                "stack": self.stacks.get(shape, []),
+            }
+            for shape, entry in self.shapes.items() if entry["count"] >= threshold
+        ]
+        return sorted(repeated, key=lambda item: -item["count"])
+
+    def summary(self):
+        """
+        Returns:
+            dict: Number of "queries", their "duration_ms" and the "repeated" shapes
+        """
+        return {
+            "queries": self.count,
+            "duration_ms": round(self.duration * 1000, 1),
+            "repeated": self.repeated(),
+        }
+
+
+class QueryProfilerMiddleware:
+    """
+    Middleware profiling the database queries of every request when
+    QUERY_PROFILER['ENABLED'] is set.
+
+    Responses get a Server-Timing header with the database time and query count
+    (`db;dur=12.5;desc="14 queries"`) and the total time of the request. SQL
+    shapes repeated at least DUPLICATE_THRESHOLD times are logged as a warning
+    with the project frames running them. Queries run while a streaming response
+    is consumed are not included.
+
+    The middleware is async capable, so async views served under ASGI are not
+    moved to a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.QUERY_PROFILER['ENABLED']:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        profile = QueryProfile()
+        with profile.capture():
+            response = self.get_response(request)
+        return self._add_timings(request, response, profile, started)
+
+    async def __acall__(self, request):
+        if not settings.QUERY_PROFILER['ENABLED']:
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        profile = QueryProfile()
+        # Queries of async requests run on their thread sensitive sync thread, so
+        # wrap the connections of that thread
+        capture = profile.capture()
+        await sync_to_async(capture.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(capture.__exit__)(None, None, None)
+        return self._add_timings(request, response, profile, started)
+
+    def _add_timings(self, request, response, profile, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        timings = [
+            f'db;dur={profile.duration * 1000:.1f};desc="{profile.count} queries"',
+            f"total;dur={total_ms:.1f}",
+        ]
+        repeated = profile.repeated()
+        if repeated:
+            timings.insert(1, f'n1;desc="{len(repeated)} repeated queries"')
+            self._log_repeated(request, profile, repeated)
+        existing = response.get('Server-Timing')
+        response['Server-Timing'] = ", ".join(([existing] if existing else []) + timings)
+        return response
+
+    @staticmethod
+    def _log_repeated(request, profile, repeated):
+        lines = [
+            f"Likely N+1 queries on {request.method} {request.path}: "
+            f"{profile.count} queries in {profile.duration * 1000:.1f} ms"
+        ]
+        for item in repeated:
+            lines.append(f"  {item['count']}x ({item['duration_ms']} ms) {item['shape'][:300]}")
+            lines.extend(f"      {frame}" for frame in item["stack"])
+        logger.warning("\n".join(lines), extra={"query_profile": profile.summary(), "path": request.path})
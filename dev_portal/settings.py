@@ -51,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'dev_portal.query_profiler.QueryProfilerMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -61,6 +62,16 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Query profiler (dev_portal/query_profiler.py): when enabled, every response gets
+# a Server-Timing header with its database time and query count, and SQL repeated
+# at least DUPLICATE_THRESHOLD times in a request (likely N+1 queries) is logged
+# with the STACK_DEPTH innermost project frames running it
+QUERY_PROFILER = {
+    'ENABLED': os.getenv('QUERY_PROFILER', 'false').lower() == 'true',
+    'DUPLICATE_THRESHOLD': int(os.getenv('QUERY_PROFILER_DUPLICATE_THRESHOLD', 5)),
+    'STACK_DEPTH': int(os.getenv('QUERY_PROFILER_STACK_DEPTH', 5)),
+}
+
 ROOT_URLCONF = "dev_portal.urls"
 
 TEMPLATES = [
@@ -96,6 +107,29 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The default cache holds the roster and profile versions, the rate limits and
+# the Gemini concurrency slots, so it has to be shared by all processes: set
+# REDIS_URL (e.g. redis://localhost:6379/0) whenever more than one process
+# serves the app. Without it each process keeps its own local memory cache, which
+# only suits a single development server (see the agent.W001 system check).
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -149,3 +183,141 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
 }
+
+
+# Developers
+
+# Seconds after which each process rebuilds its in-memory skill -> developer index
+SKILL_INDEX_MAX_AGE = int(os.getenv('SKILL_INDEX_MAX_AGE', 300))
+
+# TF-IDF index of developer projects scoring how similar they are to a project
+# brief (needs NumPy). Terms are hashed into SEMANTIC_INDEX_DIMENSIONS buckets (a
+# power of two); each process keeps a float32 row of that size per project
+SEMANTIC_INDEX_ENABLED = os.getenv('SEMANTIC_INDEX_ENABLED', 'True') == 'True'
+SEMANTIC_INDEX_DIMENSIONS = int(os.getenv('SEMANTIC_INDEX_DIMENSIONS', 2048))
+SEMANTIC_INDEX_MAX_AGE = int(os.getenv('SEMANTIC_INDEX_MAX_AGE', 3600))
+
+
+# AI agent
+
+# Number of locally ranked developers sent to Gemini for analysis
+AGENT_SHORTLIST_SIZE = int(os.getenv('AGENT_SHORTLIST_SIZE', 15))
+
+# Cache of /agent/analyze-project results. BACKEND is "locmem" (per process, LRU
+# bounded by MAX_ENTRIES) or "django" (the CACHES alias given by ALIAS)
+AGENT_RESPONSE_CACHE = {
+    'BACKEND': os.getenv('AGENT_RESPONSE_CACHE_BACKEND', 'locmem'),
+    'TTL': int(os.getenv('AGENT_RESPONSE_CACHE_TTL', 3600)),
+}
+if AGENT_RESPONSE_CACHE['BACKEND'] == 'locmem':
+    AGENT_RESPONSE_CACHE['MAX_ENTRIES'] = int(os.getenv('AGENT_RESPONSE_CACHE_MAX_ENTRIES', 256))
+else:
+    AGENT_RESPONSE_CACHE['ALIAS'] = os.getenv('AGENT_RESPONSE_CACHE_ALIAS', 'default')
+
+# Budget for text extracted from uploaded project documents: pages parsed from a
+# PDF and characters kept from any document (0 disables a limit)
+AGENT_DOCUMENT_MAX_PAGES = int(os.getenv('AGENT_DOCUMENT_MAX_PAGES', 50))
+AGENT_DOCUMENT_MAX_CHARS = int(os.getenv('AGENT_DOCUMENT_MAX_CHARS', 40000))
+
+# Characters of extracted document text kept in the database so repeat uploads of
+# the same file skip parsing; least recently used entries beyond it are evicted (0 disables)
+AGENT_DOCUMENT_CACHE_MAX_CHARS = int(os.getenv('AGENT_DOCUMENT_CACHE_MAX_CHARS', 20_000_000))
+
+# PDFs with at least AGENT_PDF_PARALLEL_MIN_PAGES pages to read are extracted by a
+# pool of AGENT_PDF_WORKERS processes (0 pages or 1 worker keeps extraction serial)
+AGENT_PDF_PARALLEL_MIN_PAGES = int(os.getenv('AGENT_PDF_PARALLEL_MIN_PAGES', 40))
+AGENT_PDF_WORKERS = int(os.getenv('AGENT_PDF_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Estimated tokens of developer data packed into the analysis prompt: developers
+# beyond it lose projects, then are left out. Project descriptions are cut to
+# AGENT_PROMPT_DESCRIPTION_CHARS characters (0 keeps them whole)
+AGENT_PROMPT_TOKEN_BUDGET = int(os.getenv('AGENT_PROMPT_TOKEN_BUDGET', 8000))
+AGENT_PROMPT_DESCRIPTION_CHARS = int(os.getenv('AGENT_PROMPT_DESCRIPTION_CHARS', 300))
+AGENT_PROMPT_CHARS_PER_TOKEN = float(os.getenv('AGENT_PROMPT_CHARS_PER_TOKEN', 4))
+
+# Rendered developer profile cards are kept in this CACHES alias, which should be
+# shared between processes like the roster version, for up to TTL seconds
+AGENT_PROFILE_CARDS = {
+    'ALIAS': os.getenv('AGENT_PROFILE_CARDS_ALIAS', 'default'),
+    'TTL': int(os.getenv('AGENT_PROFILE_CARDS_TTL', 86400)),
+}
+
+# Analyses requested with reuse_run reuse an AnalysisRun of the same prompt for up
+# to AGENT_RUN_REUSE_MAX_AGE seconds
+AGENT_RUN_REUSE_MAX_AGE = int(os.getenv('AGENT_RUN_REUSE_MAX_AGE', 7 * 24 * 3600))
+
+# Gemini endpoints are rate limited with token buckets kept in the CACHES alias
+# given by ALIAS, which has to be shared by all processes (Redis, Memcached or the
+# database cache) for the limits to hold across them. Per role, each user
+# (anonymous clients: each IP address) gets RATE requests per minute in bursts of
+# up to BURST, and all users of the role together ROLE_RATE in bursts of
+# ROLE_BURST. At most CONCURRENCY Gemini requests run at once across processes;
+# the slot of a crashed request is freed after SLOT_TIMEOUT seconds.
+AGENT_RATE_LIMIT = {
+    'ENABLED': os.getenv('AGENT_RATE_LIMIT_ENABLED', 'true').lower() == 'true',
+    'ALIAS': os.getenv('AGENT_RATE_LIMIT_ALIAS', 'default'),
+    'ROLES': {
+        'admin': {'RATE': 60, 'BURST': 30, 'ROLE_RATE': 600, 'ROLE_BURST': 120},
+        'developer': {'RATE': 30, 'BURST': 20, 'ROLE_RATE': 300, 'ROLE_BURST': 60},
+        'anonymous': {'RATE': 10, 'BURST': 20, 'ROLE_RATE': 60, 'ROLE_BURST': 40},
+    },
+    'CONCURRENCY': int(os.getenv('AGENT_LLM_CONCURRENCY', 16)),
+    'SLOT_TIMEOUT': int(os.getenv('AGENT_LLM_SLOT_TIMEOUT', 600)),
+    'BUSY_RETRY_AFTER': int(os.getenv('AGENT_LLM_BUSY_RETRY_AFTER', 5)),
+}
+
+# When Gemini fails (outage, quota, circuit breaker open), analyses are answered
+# with the local recommender's recommendations instead of an error
+AGENT_LOCAL_FALLBACK = os.getenv('AGENT_LOCAL_FALLBACK', 'true').lower() == 'true'
+
+# Batch analyses accept up to AGENT_BATCH_MAX_ITEMS projects and keep at most
+# AGENT_BATCH_CONCURRENCY Gemini calls in flight (keep it within GEMINI_POOL_SIZE);
+# a call taking longer than AGENT_BATCH_ITEM_TIMEOUT seconds fails its project only
+AGENT_BATCH_MAX_ITEMS = int(os.getenv('AGENT_BATCH_MAX_ITEMS', 50))
+AGENT_BATCH_CONCURRENCY = int(os.getenv('AGENT_BATCH_CONCURRENCY', 8))
+AGENT_BATCH_ITEM_TIMEOUT = float(os.getenv('AGENT_BATCH_ITEM_TIMEOUT', 90))
+
+# Background analysis jobs run on AGENT_JOB_WORKERS threads of each web process
+# (0 leaves them to the run_analysis_worker command). Jobs running for longer than
+# AGENT_JOB_TIMEOUT seconds are retried, up to AGENT_JOB_MAX_ATTEMPTS times. A job
+# waits at most AGENT_JOB_SLOT_WAIT seconds (keep it well under AGENT_JOB_TIMEOUT)
+# for a Gemini concurrency slot, then goes back to the queue
+AGENT_JOB_WORKERS = int(os.getenv('AGENT_JOB_WORKERS', 2))
+AGENT_JOB_TIMEOUT = int(os.getenv('AGENT_JOB_TIMEOUT', 900))
+AGENT_JOB_MAX_ATTEMPTS = int(os.getenv('AGENT_JOB_MAX_ATTEMPTS', 3))
+AGENT_JOB_SLOT_WAIT = int(os.getenv('AGENT_JOB_SLOT_WAIT', 60))
+
+# Alternative Gemini API endpoint (e.g. a proxy, or a fake server in load tests)
+GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL')
+
+# HTTP settings of the Gemini client shared by each process. TIMEOUT bounds each
+# attempt and DEADLINE a whole call including retries, in seconds. Timeouts,
+# connection errors, 408, 429 and 5xx responses are retried by GeminiService (see
+# agent/resilience.py) with exponential backoff from RETRY_INITIAL_DELAY up to
+# RETRY_MAX_DELAY seconds, randomized; RETRY_ATTEMPTS includes the first call, so
+# 1 disables retries
+GEMINI_CLIENT = {
+    'POOL_SIZE': int(os.getenv('GEMINI_POOL_SIZE', 20)),
+    'KEEPALIVE_EXPIRY': float(os.getenv('GEMINI_KEEPALIVE_EXPIRY', 60)),
+    'TIMEOUT': float(os.getenv('GEMINI_TIMEOUT', 120)),
+    'RETRY_ATTEMPTS': int(os.getenv('GEMINI_RETRY_ATTEMPTS', 3)),
+    'RETRY_INITIAL_DELAY': float(os.getenv('GEMINI_RETRY_INITIAL_DELAY', 1)),
+    'RETRY_MAX_DELAY': float(os.getenv('GEMINI_RETRY_MAX_DELAY', 30)),
+    'DEADLINE': float(os.getenv('GEMINI_DEADLINE', 180)),
+}
+
+# Gemini calls fail fast for COOLDOWN seconds once at least FAILURE_RATE of the
+# last WINDOW calls of a process (and at least MIN_CALLS) failed transiently
+GEMINI_CIRCUIT_BREAKER = {
+    'WINDOW': int(os.getenv('GEMINI_BREAKER_WINDOW', 20)),
+    'MIN_CALLS': int(os.getenv('GEMINI_BREAKER_MIN_CALLS', 10)),
+    'FAILURE_RATE': float(os.getenv('GEMINI_BREAKER_FAILURE_RATE', 0.5)),
+    'COOLDOWN': float(os.getenv('GEMINI_BREAKER_COOLDOWN', 30)),
+}
+
+# USD per million prompt (input) and response (output) tokens, used to estimate
+# the cost of Gemini calls in the metrics and analysis logs (GET /api/agent/metrics/)
+GEMINI_PRICING = {
+    'INPUT_PER_MILLION': float(os.getenv('GEMINI_PRICE_INPUT_PER_MILLION', 0.30)),
+    'OUTPUT_PER_MILLION': float(os.getenv('GEMINI_PRICE_OUTPUT_PER_MILLION', 2.50)),
+}
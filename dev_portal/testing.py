@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+
+from .query_profiler import QueryProfile
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin asserting the query budget of the code run in a block, e.g.
+    an endpoint:
+
+        with self.assertQueryBudget(4):
+            self.client.get('/api/developers/1/')
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries, max_repeats=1):
+        """
+        Fail unless the block runs at most `max_queries` queries and no SQL
+        shape more than `max_repeats` times (a query per row, i.e. N+1).
+
+        Yields:
+            QueryProfile: The profile of the block
+        """
+        profile = QueryProfile(stack_threshold=max_repeats + 1)
+        with profile.capture():
+            yield profile
+
+        queries = "\n".join(
+            f"  {entry['count']}x {shape}" for shape, entry in profile.shapes.items()
+        )
+        self.assertLessEqual(
+            profile.count, max_queries,
+            f"{profile.count} queries run, the budget is {max_queries}:\n{queries}"
+        )
+        repeated = profile.repeated(max_repeats + 1)
+        self.assertFalse(repeated, "Queries repeated more than {} times:\n{}".format(max_repeats, "\n".join(
+            f"  {item['count']}x {item['shape']}\n" + "\n".join(f"      {frame}" for frame in item["stack"])
+            for item in repeated
+        )))
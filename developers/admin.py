@@ -5,8 +5,8 @@ from .models import Developers, SkillAreas, Skills, DeveloperSkills, DeveloperPr
 
 @admin.register(Developers)
 class DevelopersAdmin(admin.ModelAdmin):
-    list_display = ['name', 'email', 'role', 'industry_experience', 'is_available']
-    list_filter = ['role', 'is_available']
+    list_display = ['name', 'email', 'role', 'industry_experience', 'overall_level_name', 'is_available']
+    list_filter = ['role', 'is_available', 'overall_level']
     search_fields = ['name', 'email']
 
 @admin.register(SkillAreas)
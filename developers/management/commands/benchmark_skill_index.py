@@ -0,0 +1,105 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from developers.models import Developers, SkillAreas, Skills, DeveloperSkills, DeveloperSkillLevel
+from developers.skill_index import SkillIndex
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark skill -> developer candidate lookups through the in-memory skill index '
+        'against the ORM path, on synthetic data that is rolled back afterwards'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--developers', type=int, default=10000, help='Number of synthetic developers')
+        parser.add_argument('--skills', type=int, default=300, help='Number of synthetic skills')
+        parser.add_argument('--skills-per-developer', type=int, default=10, help='Skills claimed by each developer')
+        parser.add_argument('--queries', type=int, default=200, help='Number of lookups per method')
+        parser.add_argument('--query-size', type=int, default=3, help='Skills per lookup')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        with transaction.atomic():
+            skill_names = self._create_data(rng, options)
+            queries = [rng.sample(skill_names, options['query_size']) for _ in range(options['queries'])]
+
+            index = SkillIndex(max_age=float('inf'))
+            started = time.perf_counter()
+            index.rebuild()
+            self.stdout.write(f'Index build: {(time.perf_counter() - started) * 1000:.1f} ms')
+
+            orm_timings = [self._time(lambda names=names: self._orm_lookup(names)) for names in queries]
+            index_timings = [self._time(lambda names=names: index.any_of(names)) for names in queries]
+
+            # Both paths must return the same candidates
+            for names in queries[:10]:
+                assert set(self._orm_lookup(names)) == {developer_id for developer_id, _ in index.any_of(names)}
+
+            self._report('ORM', orm_timings)
+            self._report('Index', index_timings)
+            self.stdout.write(self.style.SUCCESS(
+                f'Index is {statistics.median(orm_timings) / statistics.median(index_timings):.1f}x faster (median)'
+            ))
+
+            transaction.set_rollback(True)
+
+    def _create_data(self, rng, options):
+        self.stdout.write(
+            f"Creating {options['developers']} developers with {options['skills_per_developer']} "
+            f"of {options['skills']} skills each..."
+        )
+        run_id = uuid.uuid4().hex[:8]
+        skill_area = SkillAreas.objects.create(name=f'benchmark-{run_id}')
+        skills = Skills.objects.bulk_create([
+            Skills(name=f'Skill {run_id} {index}', skill_area=skill_area) for index in range(options['skills'])
+        ])
+        developers = Developers.objects.bulk_create([
+            Developers(
+                name=f'Developer {index}',
+                email=f'benchmark-{run_id}-{index}@example.com',
+                role='Developer',
+                graduation_date='2020-01-01',
+                industry_experience=rng.randint(0, 10),
+                employment_start_date='2020-01-01',
+            )
+            for index in range(options['developers'])
+        ], batch_size=1000)
+
+        developer_skills = []
+        skill_levels = []
+        for developer in developers:
+            for skill in rng.sample(skills, options['skills_per_developer']):
+                developer_skills.append(DeveloperSkills(developer=developer, skill=skill))
+                skill_levels.append(DeveloperSkillLevel(developer=developer, skill=skill, level=rng.randint(0, 3)))
+        DeveloperSkills.objects.bulk_create(developer_skills, batch_size=5000)
+        DeveloperSkillLevel.objects.bulk_create(skill_levels, batch_size=5000)
+
+        return [skill.name for skill in skills]
+
+    @staticmethod
+    def _orm_lookup(skill_names):
+        skill_ids = Skills.objects.filter(name__in=skill_names).values_list('id', flat=True)
+        return list(
+            DeveloperSkills.objects.filter(skill_id__in=skill_ids).values_list('developer_id', flat=True).distinct()
+        )
+
+    @staticmethod
+    def _time(func):
+        started = time.perf_counter()
+        func()
+        return (time.perf_counter() - started) * 1000
+
+    def _report(self, label, timings):
+        timings = sorted(timings)
+        self.stdout.write(
+            f'{label}: median {statistics.median(timings):.3f} ms, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.3f} ms, max {timings[-1]:.3f} ms'
+        )
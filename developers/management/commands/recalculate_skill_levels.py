@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from developers.services import SkillLevelService
+
+
+class Command(BaseCommand):
+    help = 'Recalculate skill levels for all or selected developers with the bulk engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--developer',
+            type=int,
+            action='append',
+            dest='developer_ids',
+            help='Only recalculate this developer id (can be repeated)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show the skill level changes without writing them',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of skill level rows written per query',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Recalculating skill levels...')
+        
+        try:
+            summary = SkillLevelService.bulk_update_skill_levels(
+                developer_ids=options['developer_ids'],
+                dry_run=options['dry_run'],
+                chunk_size=options['chunk_size'],
+            )
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'Error recalculating skill levels: {str(e)}')
+            )
+            return
+        
+        if options['dry_run']:
+            for change in summary['changes']:
+                old_level = 'new' if change['old_level'] is None else change['old_level']
+                self.stdout.write(
+                    f"developer {change['developer_id']} skill {change['skill_id']}: "
+                    f"level {old_level} -> {change['new_level']}, "
+                    f"projects {change['old_project_count']} -> {change['new_project_count']}"
+                )
+        
+        prefix = 'Dry run: would have' if options['dry_run'] else 'Successfully'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix} created {summary['created']} and updated {summary['updated']} skill levels "
+                f"({summary['unchanged']} unchanged)"
+            )
+        )
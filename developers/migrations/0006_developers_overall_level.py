@@ -0,0 +1,101 @@
+# Generated manually for the materialized overall level columns on Developers
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# Frozen copy of SkillLevelService.get_overall_level_fields as of this migration,
+# so later changes to the service do not change what the migration does
+LEVEL_NAMES = {0: 'Basic Knowledge', 1: 'Beginner', 2: 'Advanced', 3: 'Expert'}
+LEVEL_DESCRIPTIONS = {0: 'Basic knowledge in', 1: 'Beginner in', 2: 'Advanced in', 3: 'Expert in'}
+
+
+def overall_level_fields(level_counts):
+    total_skills = sum(level_counts.values())
+    if not total_skills:
+        overall_level, description = 0, 'No skill levels available'
+    else:
+        # Majority level, the lower level winning ties
+        if all(level_counts[3] > level_counts[level] for level in (0, 1, 2)):
+            overall_level = 3
+        elif level_counts[2] > level_counts[1] and level_counts[2] > level_counts[0]:
+            overall_level = 2
+        elif level_counts[1] > level_counts[0]:
+            overall_level = 1
+        else:
+            overall_level = 0
+        description = f'{LEVEL_DESCRIPTIONS[overall_level]} {level_counts[overall_level]} out of {total_skills} skills'
+    return {
+        'overall_level': overall_level,
+        'overall_level_name': LEVEL_NAMES[overall_level],
+        'overall_level_description': description,
+        'expert_skills_count': level_counts[3],
+        'advanced_skills_count': level_counts[2],
+        'beginner_skills_count': level_counts[1],
+        'basic_knowledge_skills_count': level_counts[0],
+        'total_skills_count': total_skills,
+    }
+
+
+def backfill_overall_levels(apps, schema_editor):
+    Developers = apps.get_model('developers', 'Developers')
+    DeveloperSkillLevel = apps.get_model('developers', 'DeveloperSkillLevel')
+
+    counts_by_developer = {}
+    for row in DeveloperSkillLevel.objects.values('developer_id', 'level').annotate(count=Count('id')):
+        level_counts = counts_by_developer.setdefault(row['developer_id'], {0: 0, 1: 0, 2: 0, 3: 0})
+        level_counts[row['level']] = row['count']
+
+    for developer_id, level_counts in counts_by_developer.items():
+        Developers.objects.filter(id=developer_id).update(**overall_level_fields(level_counts))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('developers', '0005_developerskilllevel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='developers',
+            name='overall_level',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='developers',
+            name='overall_level_name',
+            field=models.CharField(default='Basic Knowledge', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='developers',
+            name='overall_level_description',
+            field=models.CharField(default='No skill levels available', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='developers',
+            name='expert_skills_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='developers',
+            name='advanced_skills_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='developers',
+            name='beginner_skills_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='developers',
+            name='basic_knowledge_skills_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='developers',
+            name='total_skills_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_overall_levels, migrations.RunPython.noop),
+    ]
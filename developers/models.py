@@ -13,7 +13,18 @@ class Developers(models.Model):
     employment_start_date = models.DateField()
     
     is_available = models.BooleanField(default=True)
-    
+
+    # Overall level materialized from DeveloperSkillLevel rows, kept current by
+    # SkillLevelService so list pages can read, sort and filter it in SQL
+    overall_level = models.IntegerField(default=0, db_index=True)
+    overall_level_name = models.CharField(max_length=50, default='Basic Knowledge')
+    overall_level_description = models.CharField(max_length=200, default='No skill levels available')
+    expert_skills_count = models.IntegerField(default=0)
+    advanced_skills_count = models.IntegerField(default=0)
+    beginner_skills_count = models.IntegerField(default=0)
+    basic_knowledge_skills_count = models.IntegerField(default=0)
+    total_skills_count = models.IntegerField(default=0)
+
     last_updated = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
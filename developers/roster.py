@@ -0,0 +1,213 @@
+import threading
+import time
+from collections import deque
+
+from django.core.cache import cache
+from django.db import transaction
+
+ROSTER_VERSION_KEY = 'developers:roster_version'
+PROFILE_GENERATION_KEY = 'developers:profile_generation'
+
+# Roster versions produced by the bumps of this process, most recent last
+LOCAL_ROSTER_VERSIONS = 1024
+_local_roster_versions = deque(maxlen=LOCAL_ROSTER_VERSIONS)
+_local_roster_versions_lock = threading.Lock()
+
+
+def _initial_version():
+    # Seed from the clock so a version recreated after eviction does not repeat an old one
+    return int(time.time() * 1000)
+
+
+def get_roster_version():
+    """
+    Get the current roster version.
+
+    The version is bumped whenever developers, skills, skill levels, projects or
+    project categories change, so anything derived from the roster (such as cached
+    analyses) can include it in its cache key. It lives in the Django cache, which
+    must be shared between processes (e.g. Redis or Memcached) for the version to
+    be consistent across workers.
+
+    Returns:
+        int: Roster version
+    """
+    version = cache.get(ROSTER_VERSION_KEY)
+    if version is None:
+        cache.add(ROSTER_VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(ROSTER_VERSION_KEY)
+    return version
+
+
+def _bump(key):
+    """
+    Returns:
+        int: The new version
+    """
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The key is missing (first use or evicted)
+        initial = _initial_version()
+        if cache.add(key, initial, timeout=None):
+            return initial
+        return cache.incr(key)
+
+
+def bump_roster_version():
+    """
+    Bump the roster version after a change to the roster.
+    """
+    version = _bump(ROSTER_VERSION_KEY)
+    with _local_roster_versions_lock:
+        _local_roster_versions.append(version)
+
+
+def roster_changed_elsewhere(since_version, version):
+    """
+    Whether other processes changed the roster between two roster versions.
+
+    Process-local structures derived from the roster (such as the skill index)
+    apply the changes committed by their own process as they happen, and only
+    need a rebuild when a version in between was produced by another process, or
+    the version was recreated after eviction.
+
+    Args:
+        since_version (int): Roster version the structure was built at
+        version (int): Current roster version
+
+    Returns:
+        bool: True unless every bump in between was made by this process
+    """
+    if version == since_version:
+        return False
+    if since_version is None or version < since_version or version - since_version > LOCAL_ROSTER_VERSIONS:
+        return True
+    with _local_roster_versions_lock:
+        local_versions = set(_local_roster_versions)
+    return any(bumped not in local_versions for bumped in range(since_version + 1, version + 1))
+
+
+def _profile_version_key(developer_id):
+    return f'developers:profile_version:{developer_id}'
+
+
+def get_profile_versions(developer_ids):
+    """
+    Get the profile versions of developers.
+
+    A developer's profile version changes whenever the developer, their skills,
+    skill levels or projects change, and for every developer whenever a skill,
+    skill area or project category they may show is renamed or deleted (the
+    profile generation). Anything rendered from a developer's profile can be
+    cached under it. Like the roster version, it lives in the Django cache.
+
+    Args:
+        developer_ids (list): Developer ids
+
+    Returns:
+        dict: Developer id -> version string
+    """
+    keys = {developer_id: _profile_version_key(developer_id) for developer_id in developer_ids}
+    all_keys = [PROFILE_GENERATION_KEY, *keys.values()]
+    versions = cache.get_many(all_keys)
+    missing = [key for key in all_keys if key not in versions]
+    if missing:
+        initial = _initial_version()
+        for key in missing:
+            cache.add(key, initial, timeout=None)
+        fetched = cache.get_many(missing)
+        for key in missing:
+            versions[key] = fetched.get(key, initial)
+
+    generation = versions[PROFILE_GENERATION_KEY]
+    return {developer_id: f"{generation}.{versions[key]}" for developer_id, key in keys.items()}
+
+
+def bump_profile_versions(developer_ids):
+    """
+    Bump the profile versions of developers after a change to their profiles.
+    """
+    for developer_id in set(developer_ids):
+        _bump(_profile_version_key(developer_id))
+
+
+def bump_profile_generation():
+    """
+    Bump the profile version of every developer, after a change to names shown in all profiles.
+    """
+    _bump(PROFILE_GENERATION_KEY)
+
+
+class RosterChangeQueue:
+    """
+    Collects the roster and profile changes of a transaction and bumps the
+    versions once when it commits.
+
+    Every other process treats each new roster version it did not make as a
+    foreign change and rebuilds its indexes, so a request saving many rows must
+    bump the roster version once, not once per row. Outside of a transaction the
+    versions are bumped immediately.
+    """
+
+    _local = threading.local()
+
+    @classmethod
+    def _pending(cls):
+        if not hasattr(cls._local, 'pending'):
+            cls._local.pending = {'roster': False, 'generation': False, 'developer_ids': set()}
+        return cls._local.pending
+
+    @classmethod
+    def _schedule(cls):
+        # Every mark registers a callback; the first one to run flushes everything
+        # and the rest find the queue empty. Marks left behind by a rolled back
+        # transaction are flushed with the next one, which only costs a bump.
+        transaction.on_commit(cls.flush)
+
+    @classmethod
+    def mark_roster_changed(cls):
+        """
+        Record a change to anything analyses are based on.
+        """
+        cls._pending()['roster'] = True
+        cls._schedule()
+
+    @classmethod
+    def mark_profiles_changed(cls, developer_ids):
+        """
+        Record changes to the profiles of developers.
+
+        Args:
+            developer_ids (iterable): Developer ids
+        """
+        developer_ids = set(developer_ids)
+        if not developer_ids:
+            return
+        cls._pending()['developer_ids'].update(developer_ids)
+        cls._schedule()
+
+    @classmethod
+    def mark_profile_generation_changed(cls):
+        """
+        Record a change to names shown in every profile.
+        """
+        cls._pending()['generation'] = True
+        cls._schedule()
+
+    @classmethod
+    def flush(cls):
+        """
+        Bump the versions of all pending changes.
+        """
+        pending = cls._pending()
+        roster, generation, developer_ids = pending['roster'], pending['generation'], pending['developer_ids']
+        pending.update(roster=False, generation=False, developer_ids=set())
+
+        if roster:
+            bump_roster_version()
+        if generation:
+            # A new generation changes the profile version of every developer
+            bump_profile_generation()
+        elif developer_ids:
+            bump_profile_versions(developer_ids)
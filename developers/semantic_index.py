@@ -0,0 +1,352 @@
+import math
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from projects.models import ProjectCategory
+from .models import Skills, DeveloperProjects
+from .roster import get_roster_version, roster_changed_elsewhere
+
+# Optional dependency: without NumPy, project descriptions are not matched
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+STOP_WORDS = frozenset("""
+    a about after all also an and any are as at be been but by can could do does each for from has have
+    how i if in into is it its may more most must need needs new no not of on one or other our out over
+    project projects should so some such than that the their them then there these they this those to
+    up use used uses using via was we were what when where which while who will with within would you your
+""".split())
+
+
+def tokenize(text):
+    """
+    Split a text into normalized terms, leaving out stop words and single characters.
+
+    Terms keep the characters of technology names such as "c++", "c#" or "node.js".
+    """
+    return [
+        term for term in TOKEN_PATTERN.findall(str(text).casefold())
+        if len(term) > 1 and term not in STOP_WORDS
+    ]
+
+
+class SemanticProjectIndex:
+    """
+    In-process TF-IDF index of developer projects, scoring developers by how
+    similar their projects are to a project brief.
+
+    A project's document is its name, description, tech stack, skills and its
+    categories with their use cases. Terms are hashed into SEMANTIC_INDEX_DIMENSIONS
+    buckets (with a hashed sign, so colliding terms tend to cancel out instead of
+    adding up), weighted by sublinear term frequency and inverse document
+    frequency, and each project is stored as an L2-normalized float32 row of one
+    matrix. Scoring a brief is a single matrix-vector product giving the cosine
+    similarity of every project.
+
+    Like the skill index, it is built lazily on first use in each process and
+    rebuilt when older than SEMANTIC_INDEX_MAX_AGE seconds or when another
+    process changed the roster (every change to projects, skills and categories
+    bumps the roster version). The signals in developers/signals.py mark
+    developers dirty when their projects change in this process, and only their
+    rows are re-encoded on the next lookup; renamed skills and edited categories
+    mark the whole index stale. Rows keep the inverse document frequencies they
+    were encoded with until the next rebuild.
+    """
+
+    def __init__(self, max_age=None, dimensions=None):
+        self.max_age = max_age
+        self.dimensions = dimensions
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._roster_version = None
+        self._dirty_developers = set()
+        self._stale = False
+        self._matrix = None
+        # Per row: developer id (0 for free rows) and project id
+        self._row_developers = None
+        self._row_projects = None
+        # Per row: the buckets of its document, to update the document frequencies
+        self._row_buckets = {}
+        self._rows_by_developer = {}
+        self._free_rows = []
+        self._size = 0
+        self._document_frequencies = None
+        self._document_count = 0
+
+    @property
+    def available(self):
+        return NUMPY_AVAILABLE and settings.SEMANTIC_INDEX_ENABLED
+
+    def _dimensions(self):
+        return self.dimensions or settings.SEMANTIC_INDEX_DIMENSIONS
+
+    # Encoding
+
+    @staticmethod
+    def _load_projects(developer_ids=None):
+        """
+        Load the projects to index, of the given developers or of everyone
+        """
+        projects = DeveloperProjects.objects.only(
+            'id', 'developer_id', 'name', 'description', 'tech_stack'
+        ).prefetch_related(
+            Prefetch('skills', queryset=Skills.objects.only('id', 'name')),
+            Prefetch('project_categories', queryset=ProjectCategory.objects.only('id', 'name', 'use_cases')),
+        ).order_by('id')
+        if developer_ids is not None:
+            projects = projects.filter(developer_id__in=developer_ids)
+        return projects
+
+    @staticmethod
+    def project_document(project):
+        """
+        Text of a project as indexed
+        """
+        parts = [project.name, project.description or ""]
+        parts.extend(str(technology) for technology in project.tech_stack or [])
+        parts.extend(skill.name for skill in project.skills.all())
+        for category in project.project_categories.all():
+            parts.append(category.name)
+            parts.extend(str(use_case) for use_case in category.use_cases or [])
+        return "\n".join(parts)
+
+    def _hash_terms(self, text):
+        """
+        Hash a text's terms into buckets with sublinear term frequency weights
+
+        Returns:
+            tuple: Sorted bucket indices and their signed weights, or None without any term
+        """
+        mask = self._dimensions() - 1
+        weights = {}
+        for term, count in Counter(tokenize(text)).items():
+            hashed = zlib.crc32(term.encode())
+            bucket = hashed & mask
+            sign = -1.0 if hashed & 0x80000000 else 1.0
+            weights[bucket] = weights.get(bucket, 0.0) + sign * (1 + math.log(count))
+        if not weights:
+            return None
+        buckets = np.fromiter(sorted(weights), dtype=np.int64, count=len(weights))
+        return buckets, np.array([weights[bucket] for bucket in buckets.tolist()], dtype=np.float32)
+
+    def _idf(self):
+        return (
+            np.log((1 + self._document_count) / (1 + self._document_frequencies)) + 1
+        ).astype(np.float32)
+
+    @staticmethod
+    def _weighted_vector(dimensions, hashed, idf):
+        """
+        Build the L2-normalized TF-IDF vector of hashed terms, or None when it is zero
+        """
+        buckets, weights = hashed
+        values = weights * idf[buckets]
+        norm = float(np.linalg.norm(values))
+        if norm == 0:
+            return None
+        vector = np.zeros(dimensions, dtype=np.float32)
+        vector[buckets] = values / norm
+        return vector
+
+    # Maintenance
+
+    def rebuild(self):
+        """
+        Rebuild the whole index from the database.
+        """
+        if not self.available:
+            return
+
+        dimensions = self._dimensions()
+        if dimensions & (dimensions - 1):
+            raise ValueError("SEMANTIC_INDEX_DIMENSIONS must be a power of two")
+
+        # Read before loading, so a change committed meanwhile triggers another rebuild
+        roster_version = get_roster_version()
+        documents = []
+        for project in self._load_projects():
+            hashed = self._hash_terms(self.project_document(project))
+            if hashed is not None:
+                documents.append((project.developer_id, project.id, hashed))
+
+        document_frequencies = np.zeros(dimensions, dtype=np.int64)
+        for _, _, (buckets, _) in documents:
+            document_frequencies[buckets] += 1
+
+        capacity = max(len(documents), 64)
+        matrix = np.zeros((capacity, dimensions), dtype=np.float32)
+        row_developers = np.zeros(capacity, dtype=np.int64)
+        row_projects = np.zeros(capacity, dtype=np.int64)
+        row_buckets = {}
+        rows_by_developer = {}
+
+        with self._lock:
+            self._document_frequencies = document_frequencies
+            self._document_count = len(documents)
+            idf = self._idf()
+
+        for row, (developer_id, project_id, hashed) in enumerate(documents):
+            matrix[row] = self._weighted_vector(dimensions, hashed, idf)
+            row_developers[row] = developer_id
+            row_projects[row] = project_id
+            row_buckets[row] = hashed[0]
+            rows_by_developer.setdefault(developer_id, []).append(row)
+
+        with self._lock:
+            self._matrix = matrix
+            self._row_developers = row_developers
+            self._row_projects = row_projects
+            self._row_buckets = row_buckets
+            self._rows_by_developer = rows_by_developer
+            self._free_rows = []
+            self._size = len(documents)
+            self._dirty_developers = set()
+            self._stale = False
+            self._built_at = time.monotonic()
+            self._roster_version = roster_version
+
+    def mark_developers_dirty(self, developer_ids):
+        """
+        Mark developers whose projects changed.
+
+        Args:
+            developer_ids (iterable): Developer ids
+        """
+        with self._lock:
+            self._dirty_developers.update(developer_ids)
+
+    def mark_stale(self):
+        """
+        Mark the whole index as outdated (a skill or project category shown in
+        project documents changed).
+        """
+        with self._lock:
+            self._stale = True
+
+    def _refresh_developers(self, developer_ids):
+        dimensions = self._dimensions()
+        documents = {developer_id: [] for developer_id in developer_ids}
+        for project in self._load_projects(developer_ids):
+            hashed = self._hash_terms(self.project_document(project))
+            if hashed is not None:
+                documents[project.developer_id].append((project.id, hashed))
+
+        with self._lock:
+            for developer_id in developer_ids:
+                for row in self._rows_by_developer.pop(developer_id, []):
+                    self._remove_row(row)
+            for projects in documents.values():
+                for _, (buckets, _) in projects:
+                    self._document_frequencies[buckets] += 1
+                self._document_count += len(projects)
+
+            idf = self._idf()
+            for developer_id, projects in documents.items():
+                for project_id, hashed in projects:
+                    row = self._allocate_row()
+                    self._matrix[row] = self._weighted_vector(dimensions, hashed, idf)
+                    self._row_developers[row] = developer_id
+                    self._row_projects[row] = project_id
+                    self._row_buckets[row] = hashed[0]
+                    self._rows_by_developer.setdefault(developer_id, []).append(row)
+
+    def _remove_row(self, row):
+        self._document_frequencies[self._row_buckets.pop(row)] -= 1
+        self._document_count -= 1
+        self._matrix[row] = 0
+        self._row_developers[row] = 0
+        self._row_projects[row] = 0
+        self._free_rows.append(row)
+
+    def _allocate_row(self):
+        if self._free_rows:
+            return self._free_rows.pop()
+        if self._size == len(self._matrix):
+            # Grow by doubling, so appending projects one by one stays cheap
+            capacity = len(self._matrix) * 2
+            self._matrix = np.concatenate([self._matrix, np.zeros_like(self._matrix)])
+            self._row_developers = np.resize(self._row_developers, capacity)
+            self._row_developers[self._size:] = 0
+            self._row_projects = np.resize(self._row_projects, capacity)
+            self._row_projects[self._size:] = 0
+        self._size += 1
+        return self._size - 1
+
+    def _ensure_current(self):
+        max_age = self.max_age if self.max_age is not None else settings.SEMANTIC_INDEX_MAX_AGE
+        roster_version = get_roster_version()
+        if (
+            self._built_at is None
+            or self._stale
+            or time.monotonic() - self._built_at > max_age
+            or roster_changed_elsewhere(self._roster_version, roster_version)
+        ):
+            self.rebuild()
+            return
+
+        with self._lock:
+            self._roster_version = roster_version
+            dirty_developers = self._dirty_developers
+            self._dirty_developers = set()
+
+        if dirty_developers:
+            self._refresh_developers(dirty_developers)
+
+    # Lookups
+
+    def score(self, text, developer_ids=None):
+        """
+        Score developers by the cosine similarity of their most similar project to a text.
+
+        Args:
+            text (str): Project brief
+            developer_ids (iterable): Only score these developers
+
+        Returns:
+            dict: Developer id -> (similarity between 0 and 1, id of their most
+            similar project), for developers with a similarity above 0. Empty when
+            NumPy is not installed or the index is disabled.
+        """
+        if not self.available:
+            return {}
+        self._ensure_current()
+
+        with self._lock:
+            if not self._size:
+                return {}
+            hashed = self._hash_terms(text)
+            query = hashed and self._weighted_vector(self._dimensions(), hashed, self._idf())
+            if query is None:
+                return {}
+            similarities = self._matrix[:self._size] @ query
+            row_developers = self._row_developers[:self._size]
+            row_projects = self._row_projects[:self._size]
+
+        rows = np.flatnonzero((similarities > 0) & (row_developers != 0))
+        if developer_ids is not None:
+            rows = rows[np.isin(row_developers[rows], np.fromiter(developer_ids, dtype=np.int64))]
+        # Each developer's most similar project comes first after sorting by developer, then similarity
+        rows = rows[np.lexsort((-similarities[rows], row_developers[rows]))]
+        developers = row_developers[rows]
+        best = rows[np.concatenate(([True], developers[1:] != developers[:-1]))] if len(rows) else rows
+        return {
+            developer_id: (min(similarity, 1.0), project_id)
+            for developer_id, similarity, project_id in zip(
+                row_developers[best].tolist(), similarities[best].tolist(), row_projects[best].tolist()
+            )
+        }
+
+
+semantic_index = SemanticProjectIndex()
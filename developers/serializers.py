@@ -15,8 +15,8 @@ class DeveloperListSerializer(serializers.Serializer):
     overall_level = serializers.SerializerMethodField()
     
     def get_overall_level(self, obj):
-        """Get the overall developer level based on skill levels."""
-        return SkillLevelService.get_developer_overall_level(obj)
+        """Get the overall developer level from the materialized level columns."""
+        return SkillLevelService.get_stored_overall_level(obj)
     
 
 class DeveloperSerializer(serializers.ModelSerializer):
@@ -30,8 +30,8 @@ class DeveloperSerializer(serializers.ModelSerializer):
         }
     
     def get_overall_level(self, obj):
-        """Get the overall developer level based on skill levels."""
-        return SkillLevelService.get_developer_overall_level(obj)
+        """Get the overall developer level from the materialized level columns."""
+        return SkillLevelService.get_stored_overall_level(obj)
         
         
 class SkillAreaSerializer(serializers.ModelSerializer):
@@ -42,6 +42,9 @@ class SkillAreaSerializer(serializers.ModelSerializer):
         fields = '__all__'
         
     def get_skills_count(self, obj):
+        # Lists annotate the count to avoid a query per skill area
+        if hasattr(obj, 'annotated_skills_count'):
+            return obj.annotated_skills_count
         from .models import Skills
         skills = Skills.objects.filter(skill_area=obj)
         return skills.count()
@@ -1,5 +1,11 @@
+import threading
+from functools import partial
+
 from django.db import transaction
+from django.db.models import Count
 from .models import Developers, DeveloperSkills, DeveloperProjects, DeveloperSkillLevel, Skills
+from .roster import RosterChangeQueue
+from .skill_index import skill_index
 
 
 class SkillLevelService:
@@ -54,67 +60,152 @@ class SkillLevelService:
         Args:
             developer (Developers): Developer instance
         """
-        # Get all skills that the developer has claimed
-        developer_skills = DeveloperSkills.objects.filter(developer=developer)
-        
-        for dev_skill in developer_skills:
-            skill = dev_skill.skill
-            
-            # Count projects that use this skill
-            project_count = DeveloperProjects.objects.filter(
-                developer=developer,
-                skills=skill
-            ).count()
-            
-            # Calculate the new level
-            new_level = SkillLevelService.calculate_skill_level(project_count)
-            
-            # Update or create the skill level record
-            skill_level, created = DeveloperSkillLevel.objects.update_or_create(
-                developer=developer,
-                skill=skill,
-                defaults={
-                    'level': new_level,
-                    'project_count': project_count
-                }
-            )
+        SkillLevelService.bulk_update_skill_levels(developer_ids=[developer.id])
     
     @staticmethod
     def update_all_developers_skill_levels():
         """
         Update skill levels for all developers.
+        
+        Returns:
+            dict: Summary of created, updated and unchanged skill levels
         """
-        developers = Developers.objects.all()
-        for developer in developers:
-            SkillLevelService.update_developer_skill_levels(developer)
+        return SkillLevelService.bulk_update_skill_levels()
     
     @staticmethod
-    def get_developer_overall_level(developer):
+    def bulk_update_skill_levels(developer_ids=None, pairs=None, dry_run=False, chunk_size=1000):
         """
-        Determine the overall developer level based on their skill levels.
+        Recalculate skill levels with a fixed number of set-based queries.
+        
+        Project counts for every claimed (developer, skill) pair come from one
+        aggregate query over the DeveloperProjects.skills through table. Only rows
+        whose level or project count changed are written, in chunks, using
+        bulk_create with update_conflicts.
         
         Args:
-            developer (Developers): Developer instance
+            developer_ids (iterable): Developer ids to recalculate, all developers if None
+            pairs (iterable): (developer id, skill id) pairs to recalculate, restricts
+                the recalculation to these skills only
+            dry_run (bool): Compute the changes without writing them
+            chunk_size (int): Number of rows written per insert query
+            
+        Returns:
+            dict: Summary of created, updated and unchanged skill levels, and the
+            list of changes when dry_run is set
+        """
+        developer_skills = DeveloperSkills.objects.all()
+        project_skills = DeveloperProjects.skills.through.objects.all()
+        skill_levels = DeveloperSkillLevel.objects.all()
+        if pairs is not None:
+            pairs = set(pairs)
+            skill_ids = {skill_id for _, skill_id in pairs}
+            developer_ids = {developer_id for developer_id, _ in pairs}
+            developer_skills = developer_skills.filter(skill_id__in=skill_ids)
+            project_skills = project_skills.filter(skills_id__in=skill_ids)
+            skill_levels = skill_levels.filter(skill_id__in=skill_ids)
+        if developer_ids is not None:
+            developer_ids = list(developer_ids)
+            developer_skills = developer_skills.filter(developer_id__in=developer_ids)
+            project_skills = project_skills.filter(developerprojects__developer_id__in=developer_ids)
+            skill_levels = skill_levels.filter(developer_id__in=developer_ids)
+        
+        # Skills claimed by the developers
+        claimed = set(developer_skills.values_list('developer_id', 'skill_id'))
+        if pairs is not None:
+            claimed &= pairs
+        
+        # Number of projects per (developer, skill)
+        project_counts = {
+            (row['developerprojects__developer_id'], row['skills_id']): row['project_count']
+            for row in project_skills.values('developerprojects__developer_id', 'skills_id').annotate(
+                project_count=Count('developerprojects_id', distinct=True)
+            )
+        }
+        
+        # Current skill levels
+        current = {
+            (developer_id, skill_id): (level, project_count)
+            for developer_id, skill_id, level, project_count in skill_levels.values_list(
+                'developer_id', 'skill_id', 'level', 'project_count'
+            )
+        }
+        
+        changes = []
+        to_write = []
+        unchanged = 0
+        for developer_id, skill_id in sorted(claimed):
+            project_count = project_counts.get((developer_id, skill_id), 0)
+            new_level = SkillLevelService.calculate_skill_level(project_count)
+            old_level, old_project_count = current.get((developer_id, skill_id), (None, None))
+            
+            if old_level == new_level and old_project_count == project_count:
+                unchanged += 1
+                continue
+            
+            changes.append({
+                'developer_id': developer_id,
+                'skill_id': skill_id,
+                'old_level': old_level,
+                'new_level': new_level,
+                'old_project_count': old_project_count,
+                'new_project_count': project_count,
+            })
+            to_write.append(DeveloperSkillLevel(
+                developer_id=developer_id,
+                skill_id=skill_id,
+                level=new_level,
+                project_count=project_count,
+            ))
+        
+        summary = {
+            'created': sum(1 for change in changes if change['old_level'] is None),
+            'updated': sum(1 for change in changes if change['old_level'] is not None),
+            'unchanged': unchanged,
+        }
+        
+        if dry_run:
+            summary['changes'] = changes
+            return summary
+        
+        if to_write:
+            with transaction.atomic():
+                DeveloperSkillLevel.objects.bulk_create(
+                    to_write,
+                    batch_size=chunk_size,
+                    update_conflicts=True,
+                    unique_fields=['developer', 'skill'],
+                    update_fields=['level', 'project_count', 'last_updated'],
+                )
+                # bulk_create bypasses the signals that maintain the overall level, the skill
+                # index, the roster version and the profile versions
+                changed_developer_ids = {change['developer_id'] for change in changes}
+                SkillLevelService.refresh_overall_levels(changed_developer_ids)
+                transaction.on_commit(partial(skill_index.mark_developers_dirty, changed_developer_ids))
+                RosterChangeQueue.mark_roster_changed()
+                RosterChangeQueue.mark_profiles_changed(changed_developer_ids)
+        
+        return summary
+    
+    @staticmethod
+    def summarize_level_counts(level_counts):
+        """
+        Determine the overall level from the number of skills at each level.
+        
+        Args:
+            level_counts (dict): Number of skills per level (0-3)
             
         Returns:
             dict: Overall level information
         """
-        skill_levels = DeveloperSkillLevel.objects.filter(developer=developer)
+        total_skills = sum(level_counts.values())
         
-        if not skill_levels.exists():
+        if not total_skills:
             return {
                 'level': 0,
                 'level_name': 'Basic Knowledge',
                 'description': 'No skill levels available'
             }
         
-        # Count skills by level
-        level_counts = {0: 0, 1: 0, 2: 0, 3: 0}
-        for skill_level in skill_levels:
-            level_counts[skill_level.level] += 1
-        
-        total_skills = len(skill_levels)
-        
         # Determine overall level based on majority
         if level_counts[3] > level_counts[2] and level_counts[3] > level_counts[1] and level_counts[3] > level_counts[0]:
             overall_level = 3
@@ -146,6 +237,142 @@ class SkillLevelService:
             }
         }
     
+    @staticmethod
+    def get_developer_overall_level(developer):
+        """
+        Determine the overall developer level based on their skill levels.
+        
+        Args:
+            developer (Developers): Developer instance
+            
+        Returns:
+            dict: Overall level information
+        """
+        level_counts = {0: 0, 1: 0, 2: 0, 3: 0}
+        for level in DeveloperSkillLevel.objects.filter(developer=developer).values_list('level', flat=True):
+            level_counts[level] += 1
+        
+        return SkillLevelService.summarize_level_counts(level_counts)
+    
+    @staticmethod
+    def get_stored_overall_level(developer):
+        """
+        Get the overall developer level from the materialized columns on the developer.
+        
+        Unlike get_developer_overall_level this does not query the database, so it
+        is safe to call for every row of a list page.
+        
+        Args:
+            developer (Developers): Developer instance
+            
+        Returns:
+            dict: Overall level information
+        """
+        if not developer.total_skills_count:
+            return {
+                'level': developer.overall_level,
+                'level_name': developer.overall_level_name,
+                'description': developer.overall_level_description
+            }
+        
+        return {
+            'level': developer.overall_level,
+            'level_name': developer.overall_level_name,
+            'description': developer.overall_level_description,
+            'skill_breakdown': {
+                'expert': developer.expert_skills_count,
+                'advanced': developer.advanced_skills_count,
+                'beginner': developer.beginner_skills_count,
+                'basic_knowledge': developer.basic_knowledge_skills_count,
+                'total_skills': developer.total_skills_count
+            }
+        }
+    
+    @staticmethod
+    def get_overall_level_fields(level_counts):
+        """
+        Map level counts to the materialized overall level columns of Developers.
+        """
+        summary = SkillLevelService.summarize_level_counts(level_counts)
+        return {
+            'overall_level': summary['level'],
+            'overall_level_name': summary['level_name'],
+            'overall_level_description': summary['description'],
+            'expert_skills_count': level_counts[3],
+            'advanced_skills_count': level_counts[2],
+            'beginner_skills_count': level_counts[1],
+            'basic_knowledge_skills_count': level_counts[0],
+            'total_skills_count': sum(level_counts.values()),
+        }
+    
+    @staticmethod
+    def apply_overall_level_change(developer_id, old_level=None, new_level=None):
+        """
+        Incrementally update the materialized overall level of a developer after a
+        single DeveloperSkillLevel row was created, changed or deleted.
+        
+        Args:
+            developer_id (int): Developer id
+            old_level (int): Previous level of the skill, None if the row was created
+            new_level (int): New level of the skill, None if the row was deleted
+        """
+        if old_level == new_level:
+            return
+        
+        with transaction.atomic():
+            developer = Developers.objects.select_for_update().filter(id=developer_id).only(
+                'expert_skills_count', 'advanced_skills_count', 'beginner_skills_count', 'basic_knowledge_skills_count'
+            ).first()
+            if not developer:
+                return
+            
+            level_counts = {
+                0: developer.basic_knowledge_skills_count,
+                1: developer.beginner_skills_count,
+                2: developer.advanced_skills_count,
+                3: developer.expert_skills_count,
+            }
+            if old_level is not None:
+                level_counts[old_level] = max(level_counts[old_level] - 1, 0)
+            if new_level is not None:
+                level_counts[new_level] += 1
+            
+            Developers.objects.filter(id=developer_id).update(**SkillLevelService.get_overall_level_fields(level_counts))
+    
+    @staticmethod
+    def refresh_overall_levels(developer_ids=None, batch_size=500):
+        """
+        Recompute the materialized overall level from DeveloperSkillLevel rows.
+        
+        Used after bulk writes that bypass model signals. Runs one aggregate query
+        plus batched updates.
+        
+        Args:
+            developer_ids (iterable): Developer ids to refresh, all developers if None
+            batch_size (int): Number of developers written per update query
+        """
+        skill_levels = DeveloperSkillLevel.objects.all()
+        developers = Developers.objects.all()
+        if developer_ids is not None:
+            developer_ids = list(developer_ids)
+            skill_levels = skill_levels.filter(developer_id__in=developer_ids)
+            developers = developers.filter(id__in=developer_ids)
+        
+        counts_by_developer = {}
+        for row in skill_levels.values('developer_id', 'level').annotate(count=Count('id')):
+            level_counts = counts_by_developer.setdefault(row['developer_id'], {0: 0, 1: 0, 2: 0, 3: 0})
+            level_counts[row['level']] = row['count']
+        
+        fields = list(SkillLevelService.get_overall_level_fields({0: 0, 1: 0, 2: 0, 3: 0}).keys())
+        to_update = []
+        for developer in developers.only('id'):
+            level_counts = counts_by_developer.get(developer.id, {0: 0, 1: 0, 2: 0, 3: 0})
+            for field, value in SkillLevelService.get_overall_level_fields(level_counts).items():
+                setattr(developer, field, value)
+            to_update.append(developer)
+        
+        Developers.objects.bulk_update(to_update, fields, batch_size=batch_size)
+    
     @staticmethod
     def get_developer_skill_levels_with_details(developer):
         """
@@ -182,3 +409,54 @@ class SkillLevelService:
             })
         
         return list(skill_areas_dict.values())
+
+
+class SkillLevelRecalculationQueue:
+    """
+    Collects the developers and skills whose levels are out of date and recalculates
+    each of them exactly once when the surrounding transaction commits.
+    
+    Outside of a transaction the recalculation runs immediately. Inside one, every
+    signal only records the affected (developer, skill) pairs, so a request that
+    creates a project and attaches several skills triggers a single bulk update.
+    """
+    
+    _local = threading.local()
+    
+    @classmethod
+    def _pending(cls):
+        if not hasattr(cls._local, 'pending'):
+            cls._local.pending = {}
+        return cls._local.pending
+    
+    @classmethod
+    def mark_dirty(cls, developer_id, skill_ids):
+        """
+        Record skills of a developer whose level must be recalculated.
+        
+        Args:
+            developer_id (int): Developer id
+            skill_ids (iterable): Ids of the skills whose project count may have changed
+        """
+        skill_ids = set(skill_ids)
+        if not skill_ids:
+            return
+        
+        cls._pending().setdefault(developer_id, set()).update(skill_ids)
+        # Every mark registers a callback; the first one to run flushes everything
+        # and the rest find the queue empty. Entries left behind by a rolled back
+        # transaction are recalculated by the next flush, which is harmless.
+        transaction.on_commit(cls.flush)
+    
+    @classmethod
+    def flush(cls):
+        """
+        Recalculate all pending skill levels with one bulk update.
+        """
+        pending = cls._pending()
+        if not pending:
+            return
+        
+        pairs = {(developer_id, skill_id) for developer_id, skill_ids in pending.items() for skill_id in skill_ids}
+        pending.clear()
+        SkillLevelService.bulk_update_skill_levels(pairs=pairs)
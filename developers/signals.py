@@ -1,15 +1,73 @@
-from django.db.models.signals import post_save, post_delete, m2m_changed
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import DeveloperProjects, DeveloperSkills
-from .services import SkillLevelService
+from projects.models import ProjectCategory, ProjectCategorySkills
+from .models import Developers, SkillAreas, Skills, DeveloperSkills, DeveloperProjects, DeveloperSkillLevel
+from .roster import RosterChangeQueue
+from .semantic_index import semantic_index
+from .services import SkillLevelService, SkillLevelRecalculationQueue
+from .skill_index import skill_index
+
+
+@receiver(post_init, sender=DeveloperProjects)
+def remember_loaded_project_developer(sender, instance, **kwargs):
+    """
+    Remember the developer a project was loaded with, to detect reassignments.
+    """
+    instance._loaded_developer_id = instance.developer_id if instance.pk else None
+
+
+# Connected before update_skill_levels_on_project_save, which moves _loaded_developer_id on
+@receiver(post_save, sender=DeveloperProjects)
+def bump_profile_versions_on_project_save(sender, instance, **kwargs):
+    """
+    Bump the profile version of a project's developer, and of its previous developer when it was moved.
+    """
+    developer_ids = [instance.developer_id]
+    if instance._loaded_developer_id is not None:
+        developer_ids.append(instance._loaded_developer_id)
+    RosterChangeQueue.mark_profiles_changed(developer_ids)
+
+
+# Connected before update_skill_levels_on_project_save, which moves _loaded_developer_id on
+@receiver(post_save, sender=DeveloperProjects)
+def update_semantic_index_on_project_save(sender, instance, **kwargs):
+    """
+    Re-encode the projects of a project's developer, and of its previous developer when it was moved.
+    """
+    developer_ids = [instance.developer_id]
+    if instance._loaded_developer_id is not None:
+        developer_ids.append(instance._loaded_developer_id)
+    transaction.on_commit(partial(semantic_index.mark_developers_dirty, developer_ids))
 
 
 @receiver(post_save, sender=DeveloperProjects)
 def update_skill_levels_on_project_save(sender, instance, created, **kwargs):
     """
-    Update skill levels when a developer project is saved.
+    Update skill levels when a project is moved to another developer.
+    
+    A newly created project has no skills yet (they are added through
+    m2m_changed), and editing other fields does not change any project count.
+    """
+    old_developer_id = instance._loaded_developer_id
+    instance._loaded_developer_id = instance.developer_id
+    if created or old_developer_id == instance.developer_id:
+        return
+    
+    skill_ids = list(instance.skills.values_list('id', flat=True))
+    if old_developer_id is not None:
+        SkillLevelRecalculationQueue.mark_dirty(old_developer_id, skill_ids)
+    SkillLevelRecalculationQueue.mark_dirty(instance.developer_id, skill_ids)
+
+
+@receiver(pre_delete, sender=DeveloperProjects)
+def remember_skills_on_project_delete(sender, instance, **kwargs):
+    """
+    Remember the skills of a project before its skill links are deleted with it.
     """
-    SkillLevelService.update_developer_skill_levels(instance.developer)
+    instance._skill_ids_before_delete = list(instance.skills.values_list('id', flat=True))
 
 
 @receiver(post_delete, sender=DeveloperProjects)
@@ -17,30 +75,190 @@ def update_skill_levels_on_project_delete(sender, instance, **kwargs):
     """
     Update skill levels when a developer project is deleted.
     """
-    SkillLevelService.update_developer_skill_levels(instance.developer)
+    SkillLevelRecalculationQueue.mark_dirty(instance.developer_id, getattr(instance, '_skill_ids_before_delete', []))
 
 
 @receiver(m2m_changed, sender=DeveloperProjects.skills.through)
-def update_skill_levels_on_project_skills_change(sender, instance, action, pk_set, **kwargs):
+def update_skill_levels_on_project_skills_change(sender, instance, action, reverse, pk_set, **kwargs):
     """
     Update skill levels when skills are added or removed from a project.
     """
-    if action in ['post_add', 'post_remove', 'post_clear']:
-        SkillLevelService.update_developer_skill_levels(instance.developer)
+    if not reverse:
+        # instance is a project and pk_set holds skill ids
+        if action == 'pre_clear':
+            instance._skill_ids_before_clear = list(instance.skills.values_list('id', flat=True))
+        elif action in ['post_add', 'post_remove']:
+            SkillLevelRecalculationQueue.mark_dirty(instance.developer_id, pk_set)
+        elif action == 'post_clear':
+            SkillLevelRecalculationQueue.mark_dirty(instance.developer_id, getattr(instance, '_skill_ids_before_clear', []))
+        return
+    
+    # instance is a skill and pk_set holds project ids
+    if action == 'pre_clear':
+        instance._developer_ids_before_clear = set(instance.developer_projects.values_list('developer_id', flat=True))
+    elif action in ['post_add', 'post_remove']:
+        for developer_id in set(DeveloperProjects.objects.filter(id__in=pk_set).values_list('developer_id', flat=True)):
+            SkillLevelRecalculationQueue.mark_dirty(developer_id, [instance.id])
+    elif action == 'post_clear':
+        for developer_id in getattr(instance, '_developer_ids_before_clear', set()):
+            SkillLevelRecalculationQueue.mark_dirty(developer_id, [instance.id])
 
 
 @receiver(post_save, sender=DeveloperSkills)
 def update_skill_levels_on_skill_add(sender, instance, created, **kwargs):
     """
-    Update skill levels when a developer skill is added.
+    Update skill levels and the skill index when a developer skill is added.
     """
     if created:
-        SkillLevelService.update_developer_skill_levels(instance.developer)
+        SkillLevelRecalculationQueue.mark_dirty(instance.developer_id, [instance.skill_id])
+    transaction.on_commit(partial(skill_index.mark_developers_dirty, [instance.developer_id]))
 
 
 @receiver(post_delete, sender=DeveloperSkills)
 def update_skill_levels_on_skill_remove(sender, instance, **kwargs):
     """
-    Update skill levels when a developer skill is removed.
+    Update skill levels and the skill index when a developer skill is removed.
+    """
+    SkillLevelRecalculationQueue.mark_dirty(instance.developer_id, [instance.skill_id])
+    transaction.on_commit(partial(skill_index.mark_developers_dirty, [instance.developer_id]))
+
+
+@receiver(post_init, sender=DeveloperSkillLevel)
+def remember_loaded_skill_level(sender, instance, **kwargs):
+    """
+    Remember the level a skill level row was loaded with, so saves can be applied as deltas.
+    """
+    instance._loaded_level = instance.level if instance.pk else None
+
+
+@receiver(post_save, sender=DeveloperSkillLevel)
+def update_overall_level_on_skill_level_save(sender, instance, created, **kwargs):
+    """
+    Update the developer's materialized overall level when a skill level changes.
+    """
+    old_level = None if created else instance._loaded_level
+    SkillLevelService.apply_overall_level_change(instance.developer_id, old_level, instance.level)
+    instance._loaded_level = instance.level
+    transaction.on_commit(partial(skill_index.mark_developers_dirty, [instance.developer_id]))
+
+
+@receiver(post_delete, sender=DeveloperSkillLevel)
+def update_overall_level_on_skill_level_delete(sender, instance, **kwargs):
+    """
+    Update the developer's materialized overall level when a skill level is removed.
+    """
+    SkillLevelService.apply_overall_level_change(instance.developer_id, instance._loaded_level, None)
+    transaction.on_commit(partial(skill_index.mark_developers_dirty, [instance.developer_id]))
+
+
+@receiver(post_save, sender=Skills)
+@receiver(post_delete, sender=Skills)
+def update_skill_index_on_skill_change(sender, instance, **kwargs):
+    """
+    Reload the skill names of the skill index when a skill is created, renamed or deleted.
+    """
+    transaction.on_commit(skill_index.mark_skills_dirty)
+
+
+def bump_roster_version_on_change(sender, **kwargs):
+    """
+    Bump the roster version when anything an analysis is based on changes.
+    """
+    if kwargs.get('action', 'post_').startswith('post_'):
+        RosterChangeQueue.mark_roster_changed()
+
+
+for roster_model in [Developers, SkillAreas, Skills, DeveloperSkills, DeveloperProjects, DeveloperSkillLevel, ProjectCategory, ProjectCategorySkills]:
+    post_save.connect(bump_roster_version_on_change, sender=roster_model, dispatch_uid=f'roster_version_save_{roster_model.__name__}')
+    post_delete.connect(bump_roster_version_on_change, sender=roster_model, dispatch_uid=f'roster_version_delete_{roster_model.__name__}')
+
+for roster_through in [DeveloperProjects.skills.through, DeveloperProjects.project_categories.through]:
+    m2m_changed.connect(bump_roster_version_on_change, sender=roster_through, dispatch_uid=f'roster_version_m2m_{roster_through.__name__}')
+
+
+@receiver(post_save, sender=Developers)
+@receiver(post_delete, sender=Developers)
+def bump_profile_version_on_developer_change(sender, instance, **kwargs):
+    """
+    Bump the profile version of a developer when it is saved or deleted.
+    """
+    RosterChangeQueue.mark_profiles_changed([instance.id])
+
+
+@receiver(post_delete, sender=DeveloperProjects)
+@receiver(post_save, sender=DeveloperSkills)
+@receiver(post_delete, sender=DeveloperSkills)
+@receiver(post_save, sender=DeveloperSkillLevel)
+@receiver(post_delete, sender=DeveloperSkillLevel)
+def bump_profile_version_on_profile_change(sender, instance, **kwargs):
+    """
+    Bump the profile version of a developer when one of their projects, skills or skill levels changes.
+    """
+    RosterChangeQueue.mark_profiles_changed([instance.developer_id])
+
+
+@receiver(m2m_changed, sender=DeveloperProjects.skills.through)
+@receiver(m2m_changed, sender=DeveloperProjects.project_categories.through)
+def bump_profile_version_on_project_links_change(sender, instance, action, reverse, **kwargs):
+    """
+    Bump the profile version of a developer when the skills or categories of their project change.
+    
+    Changes made from the skill or category side may touch projects of any
+    developer, so they bump every profile.
+    """
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        RosterChangeQueue.mark_profile_generation_changed()
+    else:
+        RosterChangeQueue.mark_profiles_changed([instance.developer_id])
+
+
+@receiver(post_save, sender=Skills)
+@receiver(post_save, sender=SkillAreas)
+@receiver(post_save, sender=ProjectCategory)
+@receiver(post_delete, sender=Skills)
+@receiver(post_delete, sender=SkillAreas)
+@receiver(post_delete, sender=ProjectCategory)
+def bump_profile_generation_on_name_change(sender, instance, created=False, **kwargs):
+    """
+    Bump every profile version when a skill, skill area or project category shown
+    in profiles is renamed or deleted; a new one is not shown anywhere yet.
+    """
+    if not created:
+        RosterChangeQueue.mark_profile_generation_changed()
+
+
+@receiver(post_delete, sender=DeveloperProjects)
+def update_semantic_index_on_project_delete(sender, instance, **kwargs):
+    """
+    Drop a deleted project from the semantic index.
+    """
+    transaction.on_commit(partial(semantic_index.mark_developers_dirty, [instance.developer_id]))
+
+
+@receiver(m2m_changed, sender=DeveloperProjects.skills.through)
+@receiver(m2m_changed, sender=DeveloperProjects.project_categories.through)
+def update_semantic_index_on_project_links_change(sender, instance, action, reverse, **kwargs):
+    """
+    Re-encode a project whose skills or categories changed, or every project for changes made from the other side.
+    """
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        transaction.on_commit(semantic_index.mark_stale)
+    else:
+        transaction.on_commit(partial(semantic_index.mark_developers_dirty, [instance.developer_id]))
+
+
+@receiver(post_save, sender=Skills)
+@receiver(post_save, sender=ProjectCategory)
+@receiver(post_delete, sender=Skills)
+@receiver(post_delete, sender=ProjectCategory)
+def update_semantic_index_on_name_change(sender, instance, created=False, **kwargs):
+    """
+    Rebuild the semantic index when a skill or project category that project
+    documents include is renamed, edited or deleted.
     """
-    SkillLevelService.update_developer_skill_levels(instance.developer)
+    if not created:
+        transaction.on_commit(semantic_index.mark_stale)
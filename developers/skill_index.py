@@ -0,0 +1,245 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+
+from .models import Skills, DeveloperSkills, DeveloperSkillLevel
+from .roster import get_roster_version, roster_changed_elsewhere
+
+
+def normalize_skill_name(name):
+    """
+    Normalize a skill name for case and whitespace insensitive matching.
+    """
+    return " ".join(str(name).split()).casefold()
+
+
+class SkillIndex:
+    """
+    In-process inverted index from skill to the developers who claimed it.
+
+    Every skill id maps to a sorted array of developer ids with a parallel array of
+    their skill levels, so candidate lookups are merges over compact arrays instead
+    of database queries. Skill names are normalized, and a name shared by several
+    skill areas matches all of them.
+
+    The index is built lazily on first use in each process and rebuilt when older
+    than SKILL_INDEX_MAX_AGE seconds. The signals in developers/signals.py mark
+    developers and skills dirty after each commit of this process; dirty entries
+    are reloaded with a fixed number of queries on the next lookup. Changes
+    committed by other processes are detected from the roster version, and
+    rebuild the index on the next lookup.
+    """
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._roster_version = None
+        self._dirty_developers = set()
+        self._skills_dirty = False
+        self._skill_ids_by_name = {}
+        # skill id -> (sorted developer ids, levels aligned with the developer ids)
+        self._postings = {}
+        # developer id -> {skill id: level}
+        self._developer_skills = {}
+
+    # Maintenance
+
+    def rebuild(self):
+        """
+        Rebuild the whole index from the database.
+        """
+        # Read before loading, so a change committed meanwhile triggers another rebuild
+        roster_version = get_roster_version()
+        levels = {
+            (developer_id, skill_id): level
+            for developer_id, skill_id, level in DeveloperSkillLevel.objects.values_list('developer_id', 'skill_id', 'level')
+        }
+        developer_skills = {}
+        for developer_id, skill_id in DeveloperSkills.objects.values_list('developer_id', 'skill_id'):
+            developer_skills.setdefault(developer_id, {})[skill_id] = levels.get((developer_id, skill_id), 0)
+
+        postings = {}
+        for developer_id in sorted(developer_skills):
+            for skill_id, level in developer_skills[developer_id].items():
+                developer_ids, skill_levels = postings.setdefault(skill_id, (array('q'), array('b')))
+                developer_ids.append(developer_id)
+                skill_levels.append(level)
+
+        skill_ids_by_name = self._load_skill_names()
+
+        with self._lock:
+            self._developer_skills = developer_skills
+            self._postings = postings
+            self._skill_ids_by_name = skill_ids_by_name
+            self._dirty_developers = set()
+            self._skills_dirty = False
+            self._built_at = time.monotonic()
+            self._roster_version = roster_version
+
+    @staticmethod
+    def _load_skill_names():
+        skill_ids_by_name = {}
+        for skill_id, name in Skills.objects.values_list('id', 'name'):
+            skill_ids_by_name.setdefault(normalize_skill_name(name), set()).add(skill_id)
+        return skill_ids_by_name
+
+    def mark_developers_dirty(self, developer_ids):
+        """
+        Mark developers whose skills or skill levels changed.
+
+        Args:
+            developer_ids (iterable): Developer ids
+        """
+        with self._lock:
+            self._dirty_developers.update(developer_ids)
+
+    def mark_skills_dirty(self):
+        """
+        Mark the skill names as changed (a skill was created, renamed or deleted).
+        """
+        with self._lock:
+            self._skills_dirty = True
+
+    def _refresh_developers(self, developer_ids):
+        levels = {
+            (developer_id, skill_id): level
+            for developer_id, skill_id, level in DeveloperSkillLevel.objects.filter(
+                developer_id__in=developer_ids
+            ).values_list('developer_id', 'skill_id', 'level')
+        }
+        fresh = {developer_id: {} for developer_id in developer_ids}
+        for developer_id, skill_id in DeveloperSkills.objects.filter(
+            developer_id__in=developer_ids
+        ).values_list('developer_id', 'skill_id'):
+            fresh[developer_id][skill_id] = levels.get((developer_id, skill_id), 0)
+
+        with self._lock:
+            for developer_id, skills in fresh.items():
+                for skill_id in self._developer_skills.pop(developer_id, {}):
+                    self._remove_posting(skill_id, developer_id)
+                for skill_id, level in skills.items():
+                    self._add_posting(skill_id, developer_id, level)
+                if skills:
+                    self._developer_skills[developer_id] = skills
+
+    def _remove_posting(self, skill_id, developer_id):
+        developer_ids, levels = self._postings[skill_id]
+        position = bisect_left(developer_ids, developer_id)
+        if position < len(developer_ids) and developer_ids[position] == developer_id:
+            del developer_ids[position]
+            del levels[position]
+        if not developer_ids:
+            del self._postings[skill_id]
+
+    def _add_posting(self, skill_id, developer_id, level):
+        developer_ids, levels = self._postings.setdefault(skill_id, (array('q'), array('b')))
+        position = bisect_left(developer_ids, developer_id)
+        developer_ids.insert(position, developer_id)
+        levels.insert(position, level)
+
+    def _ensure_current(self):
+        max_age = self.max_age if self.max_age is not None else settings.SKILL_INDEX_MAX_AGE
+        roster_version = get_roster_version()
+        if (
+            self._built_at is None
+            or time.monotonic() - self._built_at > max_age
+            or roster_changed_elsewhere(self._roster_version, roster_version)
+        ):
+            self.rebuild()
+            return
+
+        with self._lock:
+            self._roster_version = roster_version
+            dirty_developers = self._dirty_developers
+            self._dirty_developers = set()
+            skills_dirty = self._skills_dirty
+            self._skills_dirty = False
+
+        if dirty_developers:
+            self._refresh_developers(dirty_developers)
+        if skills_dirty:
+            skill_ids_by_name = self._load_skill_names()
+            with self._lock:
+                self._skill_ids_by_name = skill_ids_by_name
+
+    # Lookups
+
+    def _resolve(self, skill_names):
+        """
+        Map each distinct normalized skill name to the skill ids sharing that name.
+        """
+        resolved = {}
+        for name in skill_names:
+            normalized = normalize_skill_name(name)
+            resolved[normalized] = self._skill_ids_by_name.get(normalized, set())
+        return resolved
+
+    def match(self, skill_names, min_matches=1):
+        """
+        Find developers having at least `min_matches` of the given skills.
+
+        Each matched skill contributes its level + 1 to the developer's score, so
+        an expert counts four times as much as someone with basic knowledge.
+
+        Args:
+            skill_names (iterable): Skill names
+            min_matches (int): Minimum number of distinct skill names a developer must have
+
+        Returns:
+            list: (developer id, score) tuples sorted by score, then developer id
+        """
+        self._ensure_current()
+
+        with self._lock:
+            resolved = self._resolve(skill_names)
+            matches = {}
+            scores = {}
+            for skill_ids in resolved.values():
+                if len(skill_ids) == 1:
+                    (skill_id,) = skill_ids
+                    developer_ids, levels = self._postings.get(skill_id, ((), ()))
+                    best_levels = zip(developer_ids, levels)
+                else:
+                    # A name may exist in several skill areas, count it once per developer
+                    best_levels = {}
+                    for skill_id in skill_ids:
+                        developer_ids, levels = self._postings.get(skill_id, ((), ()))
+                        for developer_id, level in zip(developer_ids, levels):
+                            if level >= best_levels.get(developer_id, -1):
+                                best_levels[developer_id] = level
+                    best_levels = best_levels.items()
+                for developer_id, level in best_levels:
+                    matches[developer_id] = matches.get(developer_id, 0) + 1
+                    scores[developer_id] = scores.get(developer_id, 0) + level + 1
+
+        results = [(developer_id, scores[developer_id]) for developer_id, count in matches.items() if count >= min_matches]
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results
+
+    def any_of(self, skill_names):
+        """
+        Find developers having any of the given skills (OR query).
+        """
+        return self.match(skill_names, min_matches=1)
+
+    def all_of(self, skill_names):
+        """
+        Find developers having all of the given skills (AND query).
+        """
+        distinct_names = {normalize_skill_name(name) for name in skill_names}
+        if not distinct_names:
+            return []
+        return self.match(distinct_names, min_matches=len(distinct_names))
+
+    def at_least(self, skill_names, count):
+        """
+        Find developers having at least `count` of the given skills.
+        """
+        return self.match(skill_names, min_matches=max(count, 1))
+
+
+skill_index = SkillIndex()
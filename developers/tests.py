@@ -1,7 +1,20 @@
-from django.test import TestCase
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.db import transaction
+from django.test import TestCase, override_settings
+from dev_portal.testing import QueryBudgetMixin
+from projects.models import ProjectCategory
 from django.contrib.auth.models import User
 from .models import Developers, SkillAreas, Skills, DeveloperSkills, DeveloperProjects, DeveloperSkillLevel
+from . import roster
+from .roster import ROSTER_VERSION_KEY, bump_roster_version
+from .semantic_index import SemanticProjectIndex, semantic_index
 from .services import SkillLevelService
+from .skill_index import SkillIndex, skill_index
+from user_auth.authentication import generate_token
+from user_auth.models import UserAuth
 
 
 class SkillLevelTestCase(TestCase):
@@ -68,7 +81,8 @@ class SkillLevelTestCase(TestCase):
     
     def test_overall_developer_level(self):
         """Test overall developer level calculation."""
-        # Create skill levels
+        # Skill levels are no longer created with the developer's skills, so create them all
+        skill3 = Skills.objects.create(name="Django", skill_area=self.skill_area)
         DeveloperSkillLevel.objects.create(
             developer=self.developer,
             skill=self.skill1,
@@ -81,8 +95,512 @@ class SkillLevelTestCase(TestCase):
             level=2,
             project_count=3
         )
+        DeveloperSkillLevel.objects.create(
+            developer=self.developer,
+            skill=skill3,
+            level=2,
+            project_count=2
+        )
         
         overall_level = SkillLevelService.get_developer_overall_level(self.developer)
         
         self.assertEqual(overall_level['level'], 2)  # Advanced (majority)
         self.assertEqual(overall_level['level_name'], 'Advanced')
+        
+        # A tie goes to the lower level
+        DeveloperSkillLevel.objects.filter(skill=skill3).delete()
+        self.assertEqual(SkillLevelService.get_developer_overall_level(self.developer)['level'], 1)
+
+
+class OverallLevelMaterializationTestCase(TestCase):
+    def setUp(self):
+        self.skill_area = SkillAreas.objects.create(name="Programming")
+        self.skills = [
+            Skills.objects.create(name=f"Skill {index}", skill_area=self.skill_area) for index in range(3)
+        ]
+        self.developer = Developers.objects.create(
+            name="Test Developer",
+            email="test@example.com",
+            role="Developer",
+            graduation_date="2020-01-01",
+            industry_experience=2,
+            employment_start_date="2020-01-01"
+        )
+        self.admin = UserAuth.objects.create(email="admin@example.com", password="unused", role="admin")
+        self.client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {generate_token(self.admin)}"
+
+    def set_skill_level(self, skill, level):
+        DeveloperSkillLevel.objects.update_or_create(
+            developer=self.developer, skill=skill, defaults={'level': level, 'project_count': level}
+        )
+
+    def test_overall_level_is_updated_incrementally(self):
+        """Test the stored overall level follows skill level changes and deletes."""
+        self.set_skill_level(self.skills[0], 3)
+        self.set_skill_level(self.skills[1], 3)
+        self.set_skill_level(self.skills[2], 1)
+        self.developer.refresh_from_db()
+        self.assertEqual(self.developer.overall_level, 3)
+        self.assertEqual(self.developer.expert_skills_count, 2)
+        self.assertEqual(self.developer.total_skills_count, 3)
+
+        self.set_skill_level(self.skills[1], 1)
+        self.developer.refresh_from_db()
+        self.assertEqual(self.developer.overall_level, 1)
+        self.assertEqual(self.developer.overall_level_description, 'Beginner in 2 out of 3 skills')
+
+        DeveloperSkillLevel.objects.filter(developer=self.developer).delete()
+        self.developer.refresh_from_db()
+        self.assertEqual(self.developer.total_skills_count, 0)
+        self.assertEqual(
+            SkillLevelService.get_stored_overall_level(self.developer),
+            SkillLevelService.get_developer_overall_level(self.developer)
+        )
+
+    def test_refresh_overall_levels_matches_stored_level(self):
+        """Test the bulk refresh rebuilds levels written without signals."""
+        DeveloperSkillLevel.objects.bulk_create([
+            DeveloperSkillLevel(developer=self.developer, skill=skill, level=2, project_count=2)
+            for skill in self.skills
+        ])
+        SkillLevelService.refresh_overall_levels([self.developer.id])
+
+        self.developer.refresh_from_db()
+        self.assertEqual(
+            SkillLevelService.get_stored_overall_level(self.developer),
+            SkillLevelService.get_developer_overall_level(self.developer)
+        )
+
+    def test_list_filters_and_sorts_by_overall_level_without_per_row_queries(self):
+        """Test the developer list is served without per-developer queries."""
+        self.set_skill_level(self.skills[0], 2)
+        for index in range(5):
+            Developers.objects.create(
+                name=f"Developer {index}",
+                email=f"developer{index}@example.com",
+                role="Developer",
+                graduation_date="2020-01-01",
+                industry_experience=1,
+                employment_start_date="2020-01-01"
+            )
+
+        # authentication, count and page queries
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/developers/', {'ordering': '-overall_level'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data'][0]['id'], self.developer.id)
+        self.assertEqual(response.data['data'][0]['overall_level']['level_name'], 'Advanced')
+
+        response = self.client.get('/api/developers/', {'overall_level': 2})
+        self.assertEqual([row['id'] for row in response.data['data']], [self.developer.id])
+
+        for invalid in ('7', '99', '-1', 'expert'):
+            self.assertEqual(self.client.get('/api/developers/', {'overall_level': invalid}).status_code, 400)
+
+
+class BulkSkillLevelUpdateTestCase(TestCase):
+    def setUp(self):
+        self.skill_area = SkillAreas.objects.create(name="Programming")
+        self.python = Skills.objects.create(name="Python", skill_area=self.skill_area)
+        self.django = Skills.objects.create(name="Django", skill_area=self.skill_area)
+        self.developers = []
+        for index in range(3):
+            developer = Developers.objects.create(
+                name=f"Developer {index}",
+                email=f"developer{index}@example.com",
+                role="Developer",
+                graduation_date="2020-01-01",
+                industry_experience=2,
+                employment_start_date="2020-01-01"
+            )
+            DeveloperSkills.objects.create(developer=developer, skill=self.python)
+            DeveloperSkills.objects.create(developer=developer, skill=self.django)
+            for project_index in range(index + 1):
+                project = DeveloperProjects.objects.create(
+                    developer=developer,
+                    name=f"Project {project_index}",
+                    project_origin="Personal"
+                )
+                project.skills.add(self.python)
+            self.developers.append(developer)
+        SkillLevelService.bulk_update_skill_levels()
+
+    def test_bulk_update_matches_project_counts(self):
+        """Test the bulk engine writes the same levels as the project counts imply."""
+        DeveloperSkillLevel.objects.all().delete()
+
+        summary = SkillLevelService.bulk_update_skill_levels()
+
+        self.assertEqual(summary, {'created': 6, 'updated': 0, 'unchanged': 0})
+        for index, developer in enumerate(self.developers):
+            python_level = DeveloperSkillLevel.objects.get(developer=developer, skill=self.python)
+            self.assertEqual(python_level.project_count, index + 1)
+            self.assertEqual(python_level.level, SkillLevelService.calculate_skill_level(index + 1))
+            self.assertEqual(DeveloperSkillLevel.objects.get(developer=developer, skill=self.django).level, 0)
+        self.developers[2].refresh_from_db()
+        self.assertEqual(self.developers[2].advanced_skills_count, 1)
+
+    def test_bulk_update_dry_run_reports_changes_without_writing(self):
+        """Test the dry run returns the diff and leaves the table untouched."""
+        DeveloperSkillLevel.objects.filter(developer=self.developers[0], skill=self.python).update(level=3, project_count=9)
+
+        summary = SkillLevelService.bulk_update_skill_levels(dry_run=True)
+
+        self.assertEqual(summary['updated'], 1)
+        self.assertEqual(summary['changes'], [{
+            'developer_id': self.developers[0].id,
+            'skill_id': self.python.id,
+            'old_level': 3,
+            'new_level': 1,
+            'old_project_count': 9,
+            'new_project_count': 1,
+        }])
+        self.assertEqual(
+            DeveloperSkillLevel.objects.get(developer=self.developers[0], skill=self.python).project_count, 9
+        )
+
+    def test_bulk_update_query_count_is_constant(self):
+        """Test the number of queries does not depend on developers or skills."""
+        DeveloperSkillLevel.objects.all().delete()
+
+        # claimed skills, project counts, current levels, savepoint, insert,
+        # level aggregate, developers, overall level update, release savepoint
+        with self.assertNumQueries(9):
+            SkillLevelService.bulk_update_skill_levels()
+        with self.assertNumQueries(3):
+            SkillLevelService.bulk_update_skill_levels()
+
+
+class SkillLevelRecalculationQueueTestCase(TestCase):
+    def setUp(self):
+        self.skill_area = SkillAreas.objects.create(name="Programming")
+        self.skills = [
+            Skills.objects.create(name=f"Skill {index}", skill_area=self.skill_area) for index in range(8)
+        ]
+        self.developer = Developers.objects.create(
+            name="Test Developer",
+            email="test@example.com",
+            role="Developer",
+            graduation_date="2020-01-01",
+            industry_experience=2,
+            employment_start_date="2020-01-01"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            for skill in self.skills:
+                DeveloperSkills.objects.create(developer=self.developer, skill=skill)
+
+    def test_project_create_recalculates_once_on_commit(self):
+        """Test a project with several skills triggers a single recalculation of those skills."""
+        bulk_update = SkillLevelService.bulk_update_skill_levels
+        with patch.object(SkillLevelService, 'bulk_update_skill_levels', side_effect=bulk_update) as mock_update:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    project = DeveloperProjects.objects.create(
+                        developer=self.developer, name="Project", project_origin="Personal"
+                    )
+                    project.skills.add(*self.skills[:3])
+                    project.skills.remove(self.skills[2])
+                self.assertEqual(mock_update.call_count, 0)
+
+        mock_update.assert_called_once_with(
+            pairs={(self.developer.id, skill.id) for skill in self.skills[:3]}
+        )
+        levels = dict(DeveloperSkillLevel.objects.filter(developer=self.developer).values_list('skill_id', 'project_count'))
+        self.assertEqual(levels[self.skills[0].id], 1)
+        self.assertEqual(levels[self.skills[2].id], 0)
+
+    def test_project_delete_recalculates_its_skills(self):
+        """Test deleting a project lowers the levels of the skills it used."""
+        with self.captureOnCommitCallbacks(execute=True):
+            project = DeveloperProjects.objects.create(
+                developer=self.developer, name="Project", project_origin="Personal"
+            )
+            project.skills.add(self.skills[0])
+        self.assertEqual(DeveloperSkillLevel.objects.get(developer=self.developer, skill=self.skills[0]).level, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            project.delete()
+        self.assertEqual(DeveloperSkillLevel.objects.get(developer=self.developer, skill=self.skills[0]).level, 0)
+
+
+class RosterChangeQueueTestCase(TestCase):
+    def setUp(self):
+        self.developers = [
+            Developers.objects.create(
+                name=f"Developer {index}",
+                email=f"developer{index}@example.com",
+                role="Developer",
+                graduation_date="2020-01-01",
+                industry_experience=2,
+                employment_start_date="2020-01-01"
+            )
+            for index in range(2)
+        ]
+
+    def test_transaction_bumps_versions_once_on_commit(self):
+        """Test a transaction saving several rows bumps the roster and the profile versions once."""
+        with patch.object(roster, 'bump_roster_version', wraps=roster.bump_roster_version) as mock_roster, \
+                patch.object(roster, 'bump_profile_versions', wraps=roster.bump_profile_versions) as mock_profiles:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for developer in self.developers:
+                        developer.save()
+                        for index in range(3):
+                            DeveloperProjects.objects.create(
+                                developer=developer, name=f"Project {index}", project_origin="Personal"
+                            )
+                self.assertEqual(mock_roster.call_count, 0)
+
+        mock_roster.assert_called_once_with()
+        mock_profiles.assert_called_once_with({developer.id for developer in self.developers})
+
+    def test_profile_generation_replaces_profile_bumps(self):
+        """Test a transaction that also changes every profile bumps the generation instead of single profiles."""
+        skill_area = SkillAreas.objects.create(name="Programming")
+        with patch.object(roster, 'bump_profile_generation') as mock_generation, \
+                patch.object(roster, 'bump_profile_versions') as mock_profiles:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    self.developers[0].save()
+                    skill_area.name = "Software"
+                    skill_area.save()
+
+        mock_generation.assert_called_once_with()
+        mock_profiles.assert_not_called()
+
+
+class SkillIndexTestCase(TestCase):
+    def setUp(self):
+        self.skill_area = SkillAreas.objects.create(name="Programming")
+        self.other_area = SkillAreas.objects.create(name="Data")
+        self.python = Skills.objects.create(name="Python", skill_area=self.skill_area)
+        self.data_python = Skills.objects.create(name="python", skill_area=self.other_area)
+        self.django = Skills.objects.create(name="Django", skill_area=self.skill_area)
+        self.developers = []
+        for index, (skills, level) in enumerate([
+            ([self.python, self.django], 3),
+            ([self.data_python], 1),
+            ([self.django], 0),
+        ]):
+            developer = Developers.objects.create(
+                name=f"Developer {index}",
+                email=f"developer{index}@example.com",
+                role="Developer",
+                graduation_date="2020-01-01",
+                industry_experience=2,
+                employment_start_date="2020-01-01"
+            )
+            for skill in skills:
+                DeveloperSkills.objects.create(developer=developer, skill=skill)
+                DeveloperSkillLevel.objects.create(developer=developer, skill=skill, level=level)
+            self.developers.append(developer)
+        self.index = SkillIndex(max_age=3600)
+        self.index.rebuild()
+
+    def test_queries_are_weighted_by_level(self):
+        """Test OR, AND and at-least-N lookups with normalized names and level weights."""
+        first, second, third = [developer.id for developer in self.developers]
+
+        self.assertEqual(self.index.any_of([" PYTHON ", "django"]), [(first, 8), (second, 2), (third, 1)])
+        self.assertEqual(self.index.all_of(["python", "Django"]), [(first, 8)])
+        self.assertEqual(self.index.at_least(["python", "django", "rust"], 1), self.index.any_of(["python", "django"]))
+        self.assertEqual(self.index.any_of(["rust"]), [])
+
+    def test_index_follows_committed_changes(self):
+        """Test the signals keep the index current after commits."""
+        skill_index.rebuild()
+        developer = self.developers[2]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DeveloperSkills.objects.create(developer=developer, skill=self.python)
+            self.django.name = "Django REST"
+            self.django.save()
+
+        # dirty developer's levels and skills, then the skill names
+        with self.assertNumQueries(3):
+            self.assertIn(developer.id, [developer_id for developer_id, _ in skill_index.any_of(["python"])])
+        self.assertEqual(skill_index.any_of(["django"]), [])
+        self.assertEqual(len(skill_index.any_of(["django rest"])), 2)
+
+    def test_index_rebuilds_after_changes_of_other_processes(self):
+        """Test only a roster version bumped by another process rebuilds the index."""
+        developer = self.developers[2]
+        # Committed by another process: this one gets no signals, only the shared roster version
+        DeveloperSkills.objects.bulk_create([DeveloperSkills(developer=developer, skill=self.python)])
+
+        bump_roster_version()
+        with self.assertNumQueries(0):
+            self.assertNotIn(developer.id, [developer_id for developer_id, _ in self.index.any_of(["python"])])
+
+        cache.incr(ROSTER_VERSION_KEY)
+        with self.assertNumQueries(3):
+            self.assertIn(developer.id, [developer_id for developer_id, _ in self.index.any_of(["python"])])
+        with self.assertNumQueries(0):
+            self.index.any_of(["python"])
+
+
+class SemanticProjectIndexTestCase(TestCase):
+    def setUp(self):
+        self.healthcare = ProjectCategory.objects.create(name="Healthcare", use_cases=["Telemedicine", "Patient portals"])
+        self.developers = []
+        self.projects = []
+        for index, (name, description, tech_stack) in enumerate([
+            ("Storefront", "Online shop with a shopping cart, checkout and payments", ["React", "Stripe"]),
+            ("Fraud detection", "Machine learning pipeline scoring card transactions", ["Python", "TensorFlow"]),
+            ("Clinic records", "Records of appointments and prescriptions", ["Django"]),
+        ]):
+            developer = Developers.objects.create(
+                name=f"Developer {index}",
+                email=f"developer{index}@example.com",
+                role="Developer",
+                graduation_date="2020-01-01",
+                industry_experience=2,
+                employment_start_date="2020-01-01"
+            )
+            self.projects.append(DeveloperProjects.objects.create(
+                developer=developer, name=name, description=description, tech_stack=tech_stack, project_origin="Client"
+            ))
+            self.developers.append(developer)
+        self.projects[2].project_categories.add(self.healthcare)
+        self.index = SemanticProjectIndex(max_age=3600)
+        self.index.rebuild()
+
+    def test_developers_are_scored_by_most_similar_project(self):
+        """Test briefs match descriptions, tech stacks and category use cases."""
+        shop, fraud, clinic = [developer.id for developer in self.developers]
+
+        scores = self.index.score("We need an online shop with a checkout")
+        self.assertEqual(max(scores, key=lambda developer_id: scores[developer_id][0]), shop)
+        self.assertEqual(scores[shop][1], self.projects[0].id)
+        self.assertNotIn(clinic, scores)
+
+        self.assertEqual(list(self.index.score("Telemedicine app for a clinic")), [clinic])
+        self.assertEqual(list(self.index.score("TensorFlow model", developer_ids=[shop, clinic])), [])
+        self.assertEqual(self.index.score("the and of"), {})
+
+    def test_index_follows_committed_changes(self):
+        """Test the signals re-encode changed developers and rebuild on category edits."""
+        semantic_index.rebuild()
+        shop, fraud, clinic = [developer.id for developer in self.developers]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.projects[1].description = "Recommendation engine for an online shop"
+            self.projects[1].save()
+            DeveloperProjects.objects.bulk_create([
+                DeveloperProjects(developer_id=clinic, name=f"Portal {index}", description="Booking portal", project_origin="Client")
+                for index in range(70)
+            ])
+            semantic_index.mark_developers_dirty([clinic])
+
+        # The dirty developers' projects, their skills and their categories
+        with self.assertNumQueries(3):
+            scores = semantic_index.score("online shop")
+        self.assertEqual(set(scores), {shop, fraud})
+        self.assertNotIn(fraud, semantic_index.score("machine learning pipeline"))
+        portals = DeveloperProjects.objects.filter(developer_id=clinic, name__startswith="Portal")
+        self.assertIn(semantic_index.score("booking portal")[clinic][1], set(portals.values_list('id', flat=True)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.healthcare.use_cases = ["Hospital logistics"]
+            self.healthcare.save()
+        self.assertIn(clinic, semantic_index.score("hospital logistics"))
+        self.assertEqual(semantic_index.score("telemedicine"), {})
+
+    def test_index_rebuilds_after_changes_of_other_processes(self):
+        """Test only a roster version bumped by another process rebuilds the index."""
+        fraud = self.developers[1].id
+        # Committed by another process: this one gets no signals, only the shared roster version
+        DeveloperProjects.objects.filter(id=self.projects[1].id).update(description="Telemedicine for rural clinics")
+
+        bump_roster_version()
+        self.assertNotIn(fraud, self.index.score("telemedicine"))
+
+        cache.incr(ROSTER_VERSION_KEY)
+        self.assertIn(fraud, self.index.score("telemedicine"))
+
+
+class QueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.category = ProjectCategory.objects.create(name="Web Development")
+        self.skills = []
+        for area_index in range(3):
+            skill_area = SkillAreas.objects.create(name=f"Area {area_index}")
+            self.skills.extend(
+                Skills.objects.create(name=f"Skill {area_index}-{index}", skill_area=skill_area) for index in range(2)
+            )
+        self.developer = Developers.objects.create(
+            name="Test Developer",
+            email="test@example.com",
+            role="Developer",
+            graduation_date="2020-01-01",
+            industry_experience=2,
+            employment_start_date="2020-01-01"
+        )
+        for skill in self.skills:
+            DeveloperSkills.objects.create(developer=self.developer, skill=skill)
+        self.project = DeveloperProjects.objects.create(
+            developer=self.developer, name="Shop", description="An online shop", tech_stack=["Python"], project_origin="Personal"
+        )
+        self.project.project_categories.add(self.category)
+        self.project.skills.add(*self.skills)
+        SkillLevelService.update_developer_skill_levels(self.developer)
+        self.admin = UserAuth.objects.create(email="admin@example.com", password="unused", role="admin")
+        self.client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {generate_token(self.admin)}"
+
+    def test_developer_detail_query_budget(self):
+        """Test a developer's skills and skill levels are loaded without a query per skill."""
+        with self.assertQueryBudget(5):
+            response = self.client.get(f'/api/developers/{self.developer.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["data"]["skills"]), 3)
+
+    def test_developer_project_detail_query_budget(self):
+        """Test a project's developer, categories and skills are loaded without a query per skill."""
+        with self.assertQueryBudget(4):
+            response = self.client.get(f'/api/developer-projects/{self.project.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["data"]["developer_name"], "Test Developer")
+        self.assertEqual(len(response.data["data"]["skills"]), 3)
+        self.assertEqual(sorted(response.data["data"]["skills"][0]), ["skill_area_id", "skill_area_name", "skills"])
+
+    def test_skill_area_list_query_budget(self):
+        """Test skill areas are counted with their skills in one query, not one per area."""
+        with self.assertQueryBudget(2):
+            response = self.client.get('/api/skill-areas/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([area["skills_count"] for area in response.data["data"]], [2, 2, 2])
+
+    @override_settings(QUERY_PROFILER={"ENABLED": True, "DUPLICATE_THRESHOLD": 3, "STACK_DEPTH": 3})
+    def test_profiler_middleware_reports_timing_and_repeated_queries(self):
+        """Test the profiler adds Server-Timing and logs SQL repeated per row with the code running it."""
+        response = self.client.get(f'/api/developers/{self.developer.id}/')
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+$')
+
+        with self.assertLogs('dev_portal.query_profiler', level='WARNING') as logs:
+            response = self.client.post(
+                '/api/developers/add_dev_skills/',
+                {"dev_id": self.developer.id, "skill_ids": [skill.id for skill in self.skills]},
+                content_type="application/json"
+            )
+        self.assertIn('n1;desc="', response["Server-Timing"])
+        message = logs.records[0].getMessage()
+        self.assertIn("Likely N+1 queries on POST /api/developers/add_dev_skills/", message)
+        self.assertIn("6x", message)
+        self.assertIn("developers/views.py:", message)
+        self.assertEqual(logs.records[0].query_profile["repeated"][0]["count"], 6)
+
+    @override_settings(DEBUG=True)
+    def test_profiler_middleware_keeps_asgi_requests_async(self):
+        """Test the profiler does not move async requests to a thread under ASGI."""
+        # Handlers log every middleware they adapt in debug mode
+        with self.assertNoLogs('django.request', level='DEBUG'):
+            ASGIHandler()
+
+    @override_settings(QUERY_PROFILER={"ENABLED": True, "DUPLICATE_THRESHOLD": 3, "STACK_DEPTH": 3})
+    async def test_profiler_middleware_profiles_async_requests(self):
+        """Test async requests get the Server-Timing header with their queries."""
+        response = await self.async_client.get(
+            f'/api/developers/{self.developer.id}/', headers={"Authorization": self.client.defaults['HTTP_AUTHORIZATION']}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="[1-9]\d* queries", total;dur=[\d.]+$')
@@ -1,3 +1,5 @@
+from django.db import transaction
+from django.db.models import Count, Prefetch
 from rest_framework import status, viewsets
 from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
@@ -14,16 +16,32 @@ class DeveloperViewSet(viewsets.ViewSet):
     authentication_classes = [CustomTokenAuthentication]
     permission_classes = [RoleBasedPermission]
     
+    # Orderings accepted by the list endpoint through the `ordering` query parameter
+    LIST_ORDERINGS = ['name', '-name', 'overall_level', '-overall_level', 'industry_experience', '-industry_experience']
+    
     def list(self, request):
-        developers = Developers.objects.all()
+        developers = Developers.objects.all().order_by('id')
+        
+        # Filter and sort by the materialized overall level
+        overall_level = request.GET.get('overall_level', None)
+        if overall_level is not None:
+            if overall_level not in ('0', '1', '2', '3'):
+                return Response({"details": "overall_level must be a number between 0 and 3"}, status=status.HTTP_400_BAD_REQUEST)
+            developers = developers.filter(overall_level=int(overall_level))
+        
+        ordering = request.GET.get('ordering', None)
+        if ordering:
+            if ordering not in self.LIST_ORDERINGS:
+                return Response({"details": f"ordering must be one of: {', '.join(self.LIST_ORDERINGS)}"}, status=status.HTTP_400_BAD_REQUEST)
+            developers = developers.order_by(ordering, 'id')
         
         # Initialize pagination
         paginator = PageNumberPagination()
         paginator.page_size = 10  # Set page size to 10 items per page
         
         # Paginate the queryset
-        if developers and developers.count() > 0:
-            paginated_developers = paginator.paginate_queryset(developers, request)
+        paginated_developers = paginator.paginate_queryset(developers, request)
+        if paginated_developers:
             serializer = DeveloperListSerializer(paginated_developers, many=True)
         
             # Get pagination metadata
@@ -80,7 +98,7 @@ class DeveloperViewSet(viewsets.ViewSet):
         if not developer:
             return Response({"details": "Developer not found"}, status=status.HTTP_404_NOT_FOUND)
         
-        skills = DeveloperSkills.objects.filter(developer=developer)
+        skills = DeveloperSkills.objects.filter(developer=developer).select_related('skill__skill_area')
         developer_projects = DeveloperProjects.objects.filter(developer=developer)
         # Group skills by skill area
         skill_areas_dict = {}
@@ -154,18 +172,20 @@ class DeveloperViewSet(viewsets.ViewSet):
             skill_ids = request.data.get('skill_ids')
             if not skill_ids:
                 return Response({"details": "Skill ids are required"}, status=status.HTTP_400_BAD_REQUEST)
-            for skill_id in skill_ids:
-                skill = Skills.objects.filter(id=skill_id).first()
-                if not skill:
-                    return Response({"details": "Skill not found"}, status=status.HTTP_404_NOT_FOUND)
-                skill_obj = DeveloperSkills.objects.filter(developer=developer, skill=skill).first()
-                if skill_obj:
-                    print("skill already exists: ", skill_obj)
-                    #skill already exists
-                    continue
-                else:
-                    #skill does not exist, create it
-                    DeveloperSkills.objects.create(developer=developer, skill=skill)
+            # Skill levels are recalculated once by the signals when the transaction commits
+            with transaction.atomic():
+                for skill_id in skill_ids:
+                    skill = Skills.objects.filter(id=skill_id).first()
+                    if not skill:
+                        return Response({"details": "Skill not found"}, status=status.HTTP_404_NOT_FOUND)
+                    skill_obj = DeveloperSkills.objects.filter(developer=developer, skill=skill).first()
+                    if skill_obj:
+                        print("skill already exists: ", skill_obj)
+                        #skill already exists
+                        continue
+                    else:
+                        #skill does not exist, create it
+                        DeveloperSkills.objects.create(developer=developer, skill=skill)
             return Response({"details": "Skills added successfully"}, status=status.HTTP_200_OK)
         else:
             return Response({"details": "Developer id is required"}, status=status.HTTP_400_BAD_REQUEST)
@@ -185,15 +205,16 @@ class DeveloperViewSet(viewsets.ViewSet):
             return Response({"details": f"Skill levels updated for developer {developer.name}"}, status=status.HTTP_200_OK)
         else:
             # Update skill levels for all developers
-            SkillLevelService.update_all_developers_skill_levels()
-            return Response({"details": "Skill levels updated for all developers"}, status=status.HTTP_200_OK)
+            summary = SkillLevelService.update_all_developers_skill_levels()
+            return Response({"details": "Skill levels updated for all developers", "data": summary}, status=status.HTTP_200_OK)
         
 class SkillAreaViewSet(viewsets.ViewSet):
     authentication_classes = [CustomTokenAuthentication]
     permission_classes = [RoleBasedPermission]
     
     def list(self, request):
-        skill_areas = SkillAreas.objects.all()
+        # Count the skills of every area in the same query (see SkillAreaSerializer.get_skills_count)
+        skill_areas = SkillAreas.objects.annotate(annotated_skills_count=Count('skills')).order_by('id')
         paginator = PageNumberPagination()
         paginator.page_size = 12
         if skill_areas and skill_areas.count() > 0:
@@ -326,16 +347,18 @@ class DeveloperProjectsViewSet(viewsets.ViewSet):
     def create(self, request):
         serializer = DeveloperProjectsSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        project = serializer.save()
         
-        # Update skill levels for the developer (this will also be triggered by signals)
-        SkillLevelService.update_developer_skill_levels(project.developer)
+        # Skill levels are recalculated once by the signals when the transaction commits
+        with transaction.atomic():
+            serializer.save()
         
         return Response({"details": "Developer project created successfully", "data": serializer.data}, status=status.HTTP_201_CREATED)
     
     
     def retrieve(self, request, pk=None):
-        developer_project = DeveloperProjects.objects.filter(id=pk).first()
+        developer_project = DeveloperProjects.objects.filter(id=pk).select_related('developer').prefetch_related(
+            'project_categories', Prefetch('skills', queryset=Skills.objects.select_related('skill_area'))
+        ).first()
         if not developer_project:
             return Response({"details": "Developer project not found"}, status=status.HTTP_404_NOT_FOUND)
         
@@ -386,7 +409,8 @@ class DeveloperProjectsViewSet(viewsets.ViewSet):
         
         serializer = DeveloperProjectsSerializer(developer_project, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
         return Response({"details": "Developer project updated successfully", "data": serializer.data}, status=status.HTTP_200_OK)
     
     
\ No newline at end of file
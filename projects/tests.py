@@ -1,3 +1,29 @@
 from django.test import TestCase
 
-# Create your tests here.
+from dev_portal.testing import QueryBudgetMixin
+from developers.models import SkillAreas, Skills
+from user_auth.authentication import generate_token
+from user_auth.models import UserAuth
+from .models import ProjectCategory, ProjectCategorySkills
+
+
+class ProjectCategoryQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.category = ProjectCategory.objects.create(name="Web Development", description="Websites")
+        for area_index in range(3):
+            skill_area = SkillAreas.objects.create(name=f"Area {area_index}")
+            for index in range(2):
+                skill = Skills.objects.create(name=f"Skill {area_index}-{index}", skill_area=skill_area)
+                ProjectCategorySkills.objects.create(project_category=self.category, skill=skill)
+        admin = UserAuth.objects.create(email="admin@example.com", password="unused", role="admin")
+        self.client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {generate_token(admin)}"
+
+    def test_category_detail_query_budget(self):
+        """Test a category's skills are grouped by skill area without a query per skill."""
+        with self.assertQueryBudget(3):
+            response = self.client.get(f'/api/projects/{self.category.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        skills = response.data["data"]["skills"]
+        self.assertEqual([len(area["skills"]) for area in skills], [2, 2, 2])
+        self.assertEqual(skills[0]["skills"][0]["skill_name"], "Skill 0-0")
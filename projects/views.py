@@ -55,7 +55,7 @@ class ProjectCategoryViewSet(viewsets.ViewSet):
         project_category = ProjectCategory.objects.filter(id=pk).first()
         if not project_category:
             return Response({"details": "Project category not found"}, status=status.HTTP_404_NOT_FOUND)
-        skills = ProjectCategorySkills.objects.filter(project_category=project_category)
+        skills = ProjectCategorySkills.objects.filter(project_category=project_category).select_related('skill__skill_area')
         # group skills by skill area
         skill_areas_dict = {}
         for skill in skills:
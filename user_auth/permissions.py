@@ -46,3 +46,12 @@ class RoleBasedPermission(permissions.BasePermission):
         
         # Deny access for any other roles
         return False
+
+
+class IsAdminRole(permissions.BasePermission):
+    """
+    Permission class allowing only users with the admin role, for any method.
+    """
+    
+    def has_permission(self, request, view):
+        return bool(request.user and getattr(request.user, 'role', None) == 'admin')